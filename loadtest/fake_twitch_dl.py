@@ -0,0 +1,40 @@
+"""Stand-in for the `twitch-dl` CLI used by the load test.
+
+Only `download` is supported: the sample video is copied to the output
+path after a simulated delay. Behaviour is set by environment variables
+written by `main.py`.
+"""
+
+import os
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+
+SAMPLE_VARIABLE = "FAKE_TWITCH_DL_SAMPLE"
+LATENCY_VARIABLE = "FAKE_TWITCH_DL_LATENCY"
+ERROR_RATE_VARIABLE = "FAKE_TWITCH_DL_ERROR_RATE"
+
+
+def main(arguments: list[str]) -> int:
+    if not arguments or arguments[0] != "download" or "-o" not in arguments:
+        print(f"Unsupported command: {' '.join(arguments)}", file=sys.stderr)
+        return 2
+    output_path = Path(arguments[arguments.index("-o") + 1])
+    latency = float(os.environ.get(LATENCY_VARIABLE, "0"))
+    if latency > 0:
+        time.sleep(random.expovariate(1 / latency))
+    if random.random() < float(os.environ.get(ERROR_RATE_VARIABLE, "0")):
+        # Reported like a network error, so the pipeline retries it
+        print("Fake download failed: connection reset", file=sys.stderr)
+        return 1
+    # twitch-dl writes to `<path>.tmp` and renames it when done
+    temporary_path = Path(f"{output_path}.tmp")
+    shutil.copyfile(os.environ[SAMPLE_VARIABLE], temporary_path)
+    temporary_path.replace(output_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from metrics import LoadTestMetrics, ResourceMonitor
+from stand_ins import FakeTwitchCatalog, FakeUploader
+
+import fake_twitch_dl
+from twitch_clips import (
+    Logger,
+    MultiTenantRunner,
+    PeriodEnum,
+    TenantConfig,
+    TwitchClipsToYoutube,
+    TwitchData,
+)
+
+CHANNELS = 2000
+
+CHANNELS_PER_TENANT = 100
+
+MAX_VIDEOS_PER_TENANT = 5
+
+CLIPS_PER_CHANNEL = 100
+
+MAX_PARALLEL_TENANTS = 8
+
+MAX_PARALLEL_DOWNLOADS = 8
+
+MAX_PARALLEL_CONVERSIONS = 2
+
+GQL_LATENCY_SECONDS = 0.05
+
+GQL_ERROR_RATE = 0.01
+
+DOWNLOAD_LATENCY_SECONDS = 0.2
+
+DOWNLOAD_ERROR_RATE = 0.02
+
+UPLOAD_LATENCY_SECONDS = 0.5
+
+UPLOAD_ERROR_RATE = 0.01
+
+UPLOAD_DAILY_LIMIT = None
+
+UPLOAD_BYTES_PER_SECOND = 10_000_000
+
+SAMPLE_VIDEO_SECONDS = 5
+
+DEBUG_MODE = False
+
+WORK_FOLDER_PATH = Path(f"{Path.cwd()}/work/")
+
+
+def create_sample_video(sample_path: Path) -> None:
+    """Generate a small test video, or random bytes without ffmpeg.
+
+    Without ffmpeg the vertical conversion of every clip fails and the
+    clips are uploaded as they are.
+    """
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg not found, using random bytes as sample video")
+        sample_path.write_bytes(os.urandom(SAMPLE_VIDEO_SECONDS * 200_000))
+        return
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc=size=640x360:rate=30:duration={SAMPLE_VIDEO_SECONDS}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=duration={SAMPLE_VIDEO_SECONDS}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-c:a",
+            "aac",
+            str(sample_path),
+        ],
+        check=True,
+    )
+
+
+def install_fake_twitch_dl(bin_folder_path: Path, sample_path: Path) -> None:
+    """Put the `twitch-dl` stand-in first on PATH of child processes."""
+    bin_folder_path.mkdir(parents=True, exist_ok=True)
+    shim_path = bin_folder_path / "twitch-dl"
+    shim_path.write_text(
+        f'#!/bin/sh\nexec "{sys.executable}" '
+        f'"{Path(fake_twitch_dl.__file__).resolve()}" "$@"\n',
+        encoding="utf-8",
+    )
+    shim_path.chmod(0o755)
+    os.environ["PATH"] = f"{bin_folder_path}{os.pathsep}{os.environ['PATH']}"
+    os.environ[fake_twitch_dl.SAMPLE_VARIABLE] = str(sample_path)
+    os.environ[fake_twitch_dl.LATENCY_VARIABLE] = str(
+        DOWNLOAD_LATENCY_SECONDS,
+    )
+    os.environ[fake_twitch_dl.ERROR_RATE_VARIABLE] = str(DOWNLOAD_ERROR_RATE)
+
+
+class LoadTestRunner(MultiTenantRunner):
+    """Runner timing every clip published by the tenant pipelines."""
+
+    def __init__(
+        self,
+        tenants: list[TenantConfig],
+        metrics: LoadTestMetrics,
+        **kwargs: object,
+    ) -> None:
+        super().__init__(tenants, **kwargs)
+        self.metrics = metrics
+
+    def _create_pipeline(self, tenant: TenantConfig) -> TwitchClipsToYoutube:
+        pipeline = super()._create_pipeline(tenant)
+        publish_clip = pipeline._publish_clip
+
+        def timed_publish_clip(*args: object, **kwargs: object) -> bool:
+            with self.metrics.time_clip() as record:
+                success = publish_clip(*args, **kwargs)
+                record["outcome"] = "published" if success else "skipped"
+            return success
+
+        pipeline._publish_clip = timed_publish_clip
+        return pipeline
+
+
+def create_tenants(
+    work_folder_path: Path,
+    metrics: LoadTestMetrics,
+) -> list[TenantConfig]:
+    channels = [f"loadtest_channel_{index}" for index in range(CHANNELS)]
+    tenants = []
+    for tenant_index, first_channel in enumerate(
+        range(0, CHANNELS, CHANNELS_PER_TENANT),
+    ):
+        tenant_channels = channels[
+            first_channel : first_channel + CHANNELS_PER_TENANT
+        ]
+        tenants.append(
+            TenantConfig(
+                name=f"tenant-{tenant_index}",
+                max_videos_to_upload=MAX_VIDEOS_PER_TENANT,
+                twitch_data=TwitchData(
+                    channels_urls=[
+                        f"https://www.twitch.tv/{channel}"
+                        for channel in tenant_channels
+                    ],
+                    clips_folder_path=Path(
+                        f"{work_folder_path}/tenant-{tenant_index}/clips/",
+                    ),
+                    clips_period=PeriodEnum.LAST_DAY,
+                ),
+                uploader=FakeUploader(
+                    latency_seconds=UPLOAD_LATENCY_SECONDS,
+                    error_rate=UPLOAD_ERROR_RATE,
+                    daily_limit=UPLOAD_DAILY_LIMIT,
+                    bytes_per_second=UPLOAD_BYTES_PER_SECOND,
+                    seed=tenant_index,
+                    metrics=metrics,
+                ),
+            ),
+        )
+    return tenants
+
+
+if __name__ == "__main__":
+    WORK_FOLDER_PATH.mkdir(parents=True, exist_ok=True)
+    run_folder_path = Path(
+        tempfile.mkdtemp(
+            prefix=f"{time.strftime('%Y%m%d-%H%M%S')}-",
+            dir=WORK_FOLDER_PATH,
+        ),
+    )
+    sample_path = run_folder_path / "sample.mp4"
+    create_sample_video(sample_path)
+    install_fake_twitch_dl(run_folder_path / "bin", sample_path)
+
+    metrics = LoadTestMetrics()
+    catalog = FakeTwitchCatalog(
+        clips_per_channel=CLIPS_PER_CHANNEL,
+        latency_seconds=GQL_LATENCY_SECONDS,
+        error_rate=GQL_ERROR_RATE,
+        metrics=metrics,
+    )
+    runner = LoadTestRunner(
+        tenants=create_tenants(run_folder_path, metrics),
+        metrics=metrics,
+        max_parallel_tenants=MAX_PARALLEL_TENANTS,
+        max_parallel_downloads=MAX_PARALLEL_DOWNLOADS,
+        max_parallel_conversions=MAX_PARALLEL_CONVERSIONS,
+        logger=Logger(debug_mode=DEBUG_MODE),
+    )
+
+    resource_monitor = ResourceMonitor()
+    resource_monitor.start()
+    started_at = time.perf_counter()
+    with catalog.installed():
+        results = runner.run()
+    elapsed_seconds = time.perf_counter() - started_at
+    resource_usage = resource_monitor.stop()
+
+    report = {
+        "channels": CHANNELS,
+        "tenants": len(results),
+        "posted_videos": sum(result.posted_videos for result in results),
+        "failed_tenants": sum(result.error is not None for result in results),
+        **metrics.summary(elapsed_seconds),
+        "resources": resource_usage.__dict__,
+    }
+    with Path.open(
+        run_folder_path / "report.json",
+        "w",
+        encoding="utf-8",
+    ) as report_file:
+        json.dump(report, report_file, indent=4)
+    print(json.dumps(report, indent=4))
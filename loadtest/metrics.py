@@ -0,0 +1,172 @@
+import math
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+@dataclass
+class LatencySummary:
+    count: int
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_latencies(cls, latencies: list[float]) -> "LatencySummary":
+        if not latencies:
+            return cls(count=0, p50=0, p90=0, p99=0, max=0)
+        sorted_latencies = sorted(latencies)
+
+        def percentile(rank: float) -> float:
+            index = math.ceil(rank * len(sorted_latencies)) - 1
+            return round(sorted_latencies[max(index, 0)], 4)
+
+        return cls(
+            count=len(sorted_latencies),
+            p50=percentile(0.5),
+            p90=percentile(0.9),
+            p99=percentile(0.99),
+            max=round(sorted_latencies[-1], 4),
+        )
+
+
+@dataclass
+class ResourceUsage:
+    peak_rss_bytes: int
+    peak_children_rss_bytes: int
+    peak_threads: int
+    peak_open_files: int
+    user_cpu_seconds: float
+    system_cpu_seconds: float
+    children_cpu_seconds: float
+
+
+class LoadTestMetrics:
+    """Thread-safe latencies of clips and stand-in requests."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clip_latencies: dict[str, list[float]] = defaultdict(list)
+        self._request_latencies: dict[str, list[float]] = defaultdict(list)
+        self._request_errors: dict[str, int] = defaultdict(int)
+
+    def record_request(
+        self,
+        kind: str,
+        latency: float,
+        is_failed: bool | None = None,
+    ) -> None:
+        with self._lock:
+            self._request_latencies[kind].append(latency)
+            if is_failed:
+                self._request_errors[kind] += 1
+
+    @contextmanager
+    def time_clip(self) -> Iterator[dict]:
+        """Time a published clip, the caller sets the "outcome" key."""
+        record = {"outcome": "failed"}
+        started_at = time.perf_counter()
+        try:
+            yield record
+        finally:
+            with self._lock:
+                self._clip_latencies[record["outcome"]].append(
+                    time.perf_counter() - started_at,
+                )
+
+    def summary(self, elapsed_seconds: float) -> dict:
+        with self._lock:
+            published_clips = len(self._clip_latencies["published"])
+            return {
+                "elapsed_seconds": round(elapsed_seconds, 3),
+                "published_per_second": round(
+                    published_clips / elapsed_seconds,
+                    3,
+                ),
+                "clips": {
+                    outcome: asdict(LatencySummary.from_latencies(latencies))
+                    for outcome, latencies in self._clip_latencies.items()
+                },
+                "requests": {
+                    kind: {
+                        **asdict(LatencySummary.from_latencies(latencies)),
+                        "errors": self._request_errors[kind],
+                    }
+                    for kind, latencies in self._request_latencies.items()
+                },
+            }
+
+
+class ResourceMonitor:
+    """Sample memory, threads and open files of the process."""
+
+    def __init__(self, interval_seconds: float | None = None) -> None:
+        self.interval_seconds = interval_seconds or 0.5
+        self._stopped = threading.Event()
+        self._peak_threads = 0
+        self._peak_open_files = 0
+        self._started_times = os.times()
+        self._sampler = threading.Thread(
+            target=self._sample_loop,
+            name="ResourceMonitor",
+            daemon=True,
+        )
+
+    def _sample(self) -> None:
+        self._peak_threads = max(
+            self._peak_threads,
+            threading.active_count(),
+        )
+        fd_folder = Path("/proc/self/fd")
+        if fd_folder.is_dir():
+            self._peak_open_files = max(
+                self._peak_open_files,
+                len(os.listdir(fd_folder)),
+            )
+
+    def _sample_loop(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            self._sample()
+
+    def start(self) -> None:
+        self._started_times = os.times()
+        self._sample()
+        self._sampler.start()
+
+    def stop(self) -> ResourceUsage:
+        self._stopped.set()
+        self._sampler.join()
+        self._sample()
+        times = os.times()
+        # ru_maxrss is in kilobytes on Linux
+        return ResourceUsage(
+            peak_rss_bytes=resource.getrusage(
+                resource.RUSAGE_SELF,
+            ).ru_maxrss
+            * 1024,
+            peak_children_rss_bytes=resource.getrusage(
+                resource.RUSAGE_CHILDREN,
+            ).ru_maxrss
+            * 1024,
+            peak_threads=self._peak_threads,
+            peak_open_files=self._peak_open_files,
+            user_cpu_seconds=round(times.user - self._started_times.user, 3),
+            system_cpu_seconds=round(
+                times.system - self._started_times.system,
+                3,
+            ),
+            children_cpu_seconds=round(
+                times.children_user
+                + times.children_system
+                - self._started_times.children_user
+                - self._started_times.children_system,
+                3,
+            ),
+        )
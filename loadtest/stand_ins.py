@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from twitchdl import twitch
+
+from metrics import LoadTestMetrics
+from twitch_clips import BaseUploader, VideoInfo
+
+
+class FakeTwitchCatalog:
+    """Synthetic clip listings served in place of the Twitch GQL API.
+
+    Clips are generated from the channel name and clip index, so every
+    run sees the same catalog. Listings are sorted by views and paged
+    by cursor like `twitch.get_channel_clips`.
+    """
+
+    def __init__(
+        self,
+        clips_per_channel: int | None = None,
+        latency_seconds: float | None = None,
+        error_rate: float | None = None,
+        seed: int | None = None,
+        metrics: LoadTestMetrics | None = None,
+    ) -> None:
+        self.clips_per_channel = clips_per_channel or 100
+        self.latency_seconds = latency_seconds or 0
+        self.error_rate = error_rate or 0
+        self.seed = seed or 0
+        self.metrics = metrics
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def _generate_clip(self, channel: str, index: int) -> dict:
+        clip_random = random.Random(f"{self.seed}:{channel}:{index}")
+        channel_views = random.Random(f"{self.seed}:{channel}").randint(
+            1_000,
+            1_000_000,
+        )
+        return {
+            "id": f"{channel}-{index}",
+            "slug": f"{channel}-clip-{index}",
+            "title": f"{channel} clip {index} #{clip_random.randint(0, 999)}",
+            "viewCount": channel_views // (index + 1),
+            "durationSeconds": clip_random.randint(5, 90),
+            "videoQualities": [
+                {"quality": "1080", "frameRate": 60},
+                {"quality": "720", "frameRate": 30},
+                {"quality": "480", "frameRate": 30},
+            ],
+            "broadcaster": {"login": channel},
+        }
+
+    def get_channel_clips(
+        self,
+        channel_id: str,
+        period: str,  # noqa: ARG002
+        limit: int,
+        after: str | None = None,
+    ) -> dict:
+        started_at = time.perf_counter()
+        with self._lock:
+            delay = (
+                self._random.expovariate(1 / self.latency_seconds)
+                if self.latency_seconds
+                else 0
+            )
+            is_failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if self.metrics is not None:
+            self.metrics.record_request(
+                "gql",
+                time.perf_counter() - started_at,
+                is_failed=is_failed,
+            )
+        if is_failed:
+            request_error = "Fake GQL request failed"
+            raise ConnectionError(request_error)
+        start = int(after) if after else 0
+        end = min(start + limit, self.clips_per_channel)
+        return {
+            "pageInfo": {"hasNextPage": end < self.clips_per_channel},
+            "edges": [
+                {
+                    "cursor": str(index + 1),
+                    "node": self._generate_clip(channel_id, index),
+                }
+                for index in range(start, end)
+            ],
+        }
+
+    @contextmanager
+    def installed(self) -> Iterator[None]:
+        """Serve clip listings of `twitchdl.twitch` from the catalog."""
+        get_channel_clips = twitch.get_channel_clips
+        twitch.get_channel_clips = self.get_channel_clips
+        try:
+            yield
+        finally:
+            twitch.get_channel_clips = get_channel_clips
+
+
+class FakeUploader(BaseUploader):
+    """Uploader simulating YouTube latency, errors and daily limits.
+
+    Like the real uploaders it raises RuntimeError on failures, which
+    stops the pipeline run.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float | None = None,
+        error_rate: float | None = None,
+        daily_limit: int | None = None,
+        bytes_per_second: int | None = None,
+        seed: int | None = None,
+        metrics: LoadTestMetrics | None = None,
+    ) -> None:
+        self.latency_seconds = latency_seconds or 0
+        self.error_rate = error_rate or 0
+        self.daily_limit = daily_limit
+        self.bytes_per_second = bytes_per_second
+        self.metrics = metrics
+        self.uploaded_videos = 0
+        self._random = random.Random(seed)
+
+    def upload(self, video_info: VideoInfo) -> None:
+        if (
+            self.daily_limit is not None
+            and self.uploaded_videos >= self.daily_limit
+        ):
+            daily_limit_error = "Daily limit of uploads exceeded"
+            raise RuntimeError(daily_limit_error)
+        started_at = time.perf_counter()
+        delay = (
+            self._random.expovariate(1 / self.latency_seconds)
+            if self.latency_seconds
+            else 0
+        )
+        if self.bytes_per_second:
+            delay += (
+                Path(video_info.video_path).stat().st_size
+                / self.bytes_per_second
+            )
+        time.sleep(delay)
+        is_failed = self._random.random() < self.error_rate
+        if self.metrics is not None:
+            self.metrics.record_request(
+                "upload",
+                time.perf_counter() - started_at,
+                is_failed=is_failed,
+            )
+        if is_failed:
+            upload_error = f"Fake upload failed: {video_info.title}"
+            raise RuntimeError(upload_error)
+        self.uploaded_videos += 1
+
+    def close_session(self) -> None:
+        pass
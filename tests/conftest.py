@@ -0,0 +1,73 @@
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from twitch_clips import (
+    BaseUploader,
+    TwitchClipsToYoutube,
+    TwitchData,
+    VideoInfo,
+)
+from twitch_clips.TwitchClipsDownloader import ClipInfo
+
+
+class StubUploader(BaseUploader):
+    """Uploader recording videos instead of uploading them."""
+
+    def __init__(self) -> None:
+        self.uploaded_videos: list[VideoInfo] = []
+
+    def upload(self, video_info: VideoInfo) -> None:
+        self.uploaded_videos.append(video_info)
+
+    def close_session(self) -> None:
+        pass
+
+
+def make_clip_info(
+    clip_id: str,
+    title: str | None = None,
+    view_count: int = 100,
+    broadcaster: str = "streamer",
+    duration_seconds: int = 30,
+) -> ClipInfo:
+    return ClipInfo(
+        id=clip_id,
+        slug=f"{clip_id}-slug",
+        title=title or f"Clip {clip_id}",
+        view_count=view_count,
+        duration_seconds=duration_seconds,
+        broadcaster=broadcaster,
+        quality="1080",
+        framerate=60,
+    )
+
+
+@pytest.fixture
+def make_pipeline(
+    tmp_path: Path,
+) -> Iterator[Callable[..., TwitchClipsToYoutube]]:
+    pipelines = []
+
+    def make(
+        max_videos_to_upload: int = 1,
+        twitch_data: TwitchData | None = None,
+        **kwargs: object,
+    ) -> TwitchClipsToYoutube:
+        pipeline = TwitchClipsToYoutube(
+            max_videos_to_upload=max_videos_to_upload,
+            twitch_data=twitch_data
+            or TwitchData(
+                channels_urls=["https://www.twitch.tv/streamer"],
+                clips_folder_path=tmp_path / "clips",
+            ),
+            uploader=kwargs.pop("uploader", None) or StubUploader(),
+            **kwargs,
+        )
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield make
+    for pipeline in pipelines:
+        pipeline.folder_lock.release_run()
@@ -0,0 +1,149 @@
+import importlib
+import subprocess
+
+import httpx
+import pytest
+
+from twitch_clips import AdaptiveConcurrencyLimiter, ConcurrencySettings
+
+_WINDOW_SECONDS = 10
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    limiter_module = importlib.import_module(
+        "twitch_clips.AdaptiveConcurrencyLimiter",
+    )
+    monkeypatch.setattr(limiter_module, "time", clock)
+    return clock
+
+
+def _make_limiter(**settings: float) -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(
+        ConcurrencySettings(window_seconds=_WINDOW_SECONDS, **settings),
+    )
+
+
+def _run_window(
+    limiter: AdaptiveConcurrencyLimiter,
+    clock: _Clock,
+    error: BaseException | None = None,
+) -> None:
+    """Run as many tasks as the limit allows for one window."""
+    tasks = 0
+    while limiter.acquire(blocking=False):
+        tasks += 1
+    clock.now += _WINDOW_SECONDS
+    for _ in range(tasks):
+        limiter.record(error)
+        limiter.release()
+
+
+def test_saturated_limit_grows_by_one_per_window(clock: _Clock) -> None:
+    limiter = _make_limiter(max_limit=4, initial_limit=1)
+    limits = []
+    for _ in range(5):
+        _run_window(limiter, clock)
+        limits.append(limiter.limit)
+    assert limits == [2, 3, 4, 4, 4]
+    assert limiter.metrics().increases == 3
+
+
+def test_unsaturated_limit_stays(clock: _Clock) -> None:
+    limiter = _make_limiter(max_limit=4, initial_limit=2)
+    for _ in range(3):
+        with limiter:
+            clock.now += _WINDOW_SECONDS
+    assert limiter.limit == 2
+
+
+def test_overload_decreases_once_per_window(clock: _Clock) -> None:
+    limiter = _make_limiter(max_limit=8, initial_limit=8)
+    _run_window(limiter, clock, error=TimeoutError("timed out"))
+    assert limiter.limit == 4
+    metrics = limiter.metrics()
+    assert metrics.decreases == 1
+    assert metrics.overloads == 8
+    _run_window(limiter, clock, error=TimeoutError("timed out"))
+    assert limiter.limit == 2
+
+
+def test_decrease_stops_at_min_limit(clock: _Clock) -> None:
+    limiter = _make_limiter(max_limit=8, min_limit=3, initial_limit=4)
+    for _ in range(3):
+        _run_window(limiter, clock, error=TimeoutError("timed out"))
+    assert limiter.limit == 3
+
+
+def test_errors_stop_increases(clock: _Clock) -> None:
+    limiter = _make_limiter(max_limit=4, initial_limit=2)
+    for _ in range(3):
+        _run_window(limiter, clock, error=ValueError("bad clip"))
+    assert limiter.limit == 2
+    assert limiter.metrics().decreases == 0
+
+
+def test_throughput_drop_takes_increase_back(clock: _Clock) -> None:
+    limiter = _make_limiter(max_limit=4, initial_limit=1)
+    _run_window(limiter, clock)
+    _run_window(limiter, clock)
+    assert limiter.limit == 3
+    # Three slots in flight finishing slower than two did
+    for _ in range(3):
+        limiter.acquire(blocking=False)
+    clock.now += _WINDOW_SECONDS * 4
+    for _ in range(3):
+        limiter.record()
+        limiter.release()
+    assert limiter.limit == 2
+
+
+def test_overload_errors_ignore_messages() -> None:
+    command_error = subprocess.CalledProcessError(
+        1,
+        ["twitch-dl", "download", "RateLimitedClip-timed-out"],
+        stderr=b"Error: Clip not found",
+    )
+    assert not AdaptiveConcurrencyLimiter.is_overload_error(command_error)
+    assert not AdaptiveConcurrencyLimiter.is_overload_error(
+        RuntimeError("rate limit"),
+    )
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        TimeoutError(),
+        subprocess.TimeoutExpired(["twitch-dl"], 10),
+        subprocess.CalledProcessError(
+            1,
+            ["twitch-dl"],
+            stderr=b"HTTPStatusError: 429 Too Many Requests",
+        ),
+        httpx.HTTPStatusError(
+            "throttled",
+            request=httpx.Request("GET", "https://gql.twitch.tv"),
+            response=httpx.Response(503),
+        ),
+    ],
+)
+def test_overload_errors(error: BaseException) -> None:
+    assert AdaptiveConcurrencyLimiter.is_overload_error(error)
+
+
+def test_client_errors_are_not_overloads() -> None:
+    error = httpx.HTTPStatusError(
+        "missing",
+        request=httpx.Request("GET", "https://gql.twitch.tv"),
+        response=httpx.Response(404),
+    )
+    assert not AdaptiveConcurrencyLimiter.is_overload_error(error)
@@ -0,0 +1,145 @@
+import importlib
+
+import pytest
+
+from twitch_clips import BandwidthLimiter, BandwidthSettings
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+        # Concurrent callers only wake up after all of them consumed
+        self.advance_on_sleep = True
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        if self.advance_on_sleep:
+            self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    limiter_module = importlib.import_module("twitch_clips.BandwidthLimiter")
+    monkeypatch.setattr(limiter_module, "time", clock)
+    return clock
+
+
+def _limiter(
+    bytes_per_second: int | None,
+    burst_seconds: float | None = None,
+) -> BandwidthLimiter:
+    return BandwidthLimiter(
+        BandwidthSettings(
+            bytes_per_second=bytes_per_second,
+            burst_seconds=burst_seconds,
+        ),
+    )
+
+
+def test_bucket_refills_at_rate(clock: _Clock) -> None:
+    limiter = _limiter(1000)
+    # The bucket starts full
+    limiter.consume(1000)
+    assert clock.sleeps == []
+    limiter.consume(500)
+    assert clock.sleeps == [pytest.approx(0.5)]
+    # Sleeping paid the debt, tokens accrue again from zero
+    clock.now += 0.25
+    limiter.consume(250)
+    assert clock.sleeps == [pytest.approx(0.5)]
+    limiter.consume(100)
+    assert clock.sleeps[1:] == [pytest.approx(0.1)]
+    assert limiter.metrics().throttled_seconds == pytest.approx(0.6)
+
+
+@pytest.mark.parametrize("burst_seconds", [None, 0.5, 3])
+def test_idle_refill_is_capped_at_burst(
+    clock: _Clock,
+    burst_seconds: float | None,
+) -> None:
+    limiter = _limiter(1000, burst_seconds=burst_seconds)
+    burst_bytes = int(1000 * (burst_seconds or 1))
+    limiter.consume(burst_bytes)
+    clock.now += 3600
+    limiter.consume(burst_bytes)
+    assert clock.sleeps == []
+    limiter.consume(10)
+    assert clock.sleeps == [pytest.approx(0.01)]
+
+
+def test_throttled_stream_averages_the_rate(clock: _Clock) -> None:
+    limiter = _limiter(1000)
+    chunks = [b"\0" * 100] * 50
+    with limiter.transfer():
+        assert list(limiter.throttle(chunks)) == chunks
+    # The first second of the stream is paid by the full bucket
+    assert sum(clock.sleeps) == pytest.approx(4)
+    metrics = limiter.metrics()
+    assert metrics.transferred_bytes == 5000
+    assert metrics.active_seconds == pytest.approx(4)
+    assert metrics.bytes_per_second == pytest.approx(1250)
+
+
+def test_unlimited_rate_never_sleeps(clock: _Clock) -> None:
+    limiter = _limiter(None)
+    limiter.consume(10**9)
+    assert clock.sleeps == []
+    assert limiter.metrics().rate_limit is None
+
+
+def test_shared_limiter_splits_rate_between_transfers(clock: _Clock) -> None:
+    limiter = _limiter(1000)
+    limiter.consume(1000)
+    started_at = clock.now
+    transferred_bytes = {"first": 0, "second": 0}
+    waited_seconds = {"first": 0.0, "second": 0.0}
+    for _ in range(20):
+        for transfer, chunk_bytes in (("first", 100), ("second", 100)):
+            slept_before = sum(clock.sleeps)
+            limiter.consume(chunk_bytes)
+            transferred_bytes[transfer] += chunk_bytes
+            waited_seconds[transfer] += sum(clock.sleeps) - slept_before
+    assert transferred_bytes["first"] == transferred_bytes["second"]
+    assert waited_seconds["first"] == pytest.approx(waited_seconds["second"])
+    # Together the transfers don't go past the rate
+    assert clock.now - started_at == pytest.approx(4)
+
+
+def test_concurrent_chunks_queue_behind_each_other(clock: _Clock) -> None:
+    limiter = _limiter(1000)
+    limiter.consume(1000)
+    clock.advance_on_sleep = False
+    for _ in range(4):
+        limiter.consume(250)
+    # Each caller waits for its own chunk and the ones queued before it
+    assert clock.sleeps == [
+        pytest.approx(0.25),
+        pytest.approx(0.5),
+        pytest.approx(0.75),
+        pytest.approx(1),
+    ]
+    clock.now += 1
+    clock.advance_on_sleep = True
+    limiter.consume(250)
+    assert clock.sleeps[4:] == [pytest.approx(0.25)]
+
+
+def test_set_rate_overrides_and_restores_schedule(clock: _Clock) -> None:
+    limiter = _limiter(1000)
+    limiter.consume(1000)
+    limiter.set_rate(500)
+    limiter.consume(500)
+    assert clock.sleeps == [pytest.approx(1)]
+    # A lower rate also lowers the burst cap
+    clock.now += 3600
+    limiter.consume(500)
+    limiter.consume(500)
+    assert clock.sleeps[1:] == [pytest.approx(1)]
+    limiter.set_rate(None)
+    assert limiter.rate == 1000
+    assert limiter.metrics().rate_limit == 1000
@@ -0,0 +1,156 @@
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from twitch_clips import ChannelPollScheduler, TwitchClipsDownloader
+
+_HOUR = 3600
+
+
+@pytest.fixture
+def scheduler() -> ChannelPollScheduler:
+    return ChannelPollScheduler(
+        min_interval_seconds=_HOUR,
+        max_interval_seconds=24 * _HOUR,
+        min_clips_limit=5,
+        max_clips_limit=100,
+    )
+
+
+def _clip_ids(prefix: str, count: int) -> list[str]:
+    return [f"{prefix}{index}" for index in range(count)]
+
+
+def test_new_channels_are_due_with_max_limit(
+    scheduler: ChannelPollScheduler,
+) -> None:
+    assert scheduler.get_yield("https://www.twitch.tv/Streamer") is None
+    assert scheduler.get_interval("streamer") == 0
+    assert scheduler.plan_polls(["streamer"], now=0) == {"streamer": 100}
+
+
+def test_interval_scales_inversely_with_yield(
+    scheduler: ChannelPollScheduler,
+) -> None:
+    scheduler.record_polls({"streamer": (100, _clip_ids("a", 5))}, now=0)
+    scheduler.record_candidates(["Streamer", "streamer", "other"])
+    # 0.1 * 5 new clips + 0.5 * 2 candidates
+    assert scheduler.get_yield("streamer") == pytest.approx(1.5)
+    assert scheduler.get_interval("streamer") == _HOUR
+    scheduler.target_yield = 3
+    assert scheduler.get_interval("streamer") == pytest.approx(2 * _HOUR)
+    scheduler.target_yield = 100
+    assert scheduler.get_interval("streamer") == 24 * _HOUR
+
+
+def test_quiet_channels_wait_max_interval(
+    scheduler: ChannelPollScheduler,
+) -> None:
+    scheduler.record_polls({"streamer": (100, [])}, now=0)
+    scheduler.record_candidates([])
+    assert scheduler.get_interval("streamer") == 24 * _HOUR
+    assert scheduler.plan_polls(["streamer"], now=24 * _HOUR - 1) == {}
+    assert scheduler.plan_polls(["streamer"], now=24 * _HOUR) == {
+        "streamer": 5,
+    }
+
+
+def test_only_unseen_clips_count_as_new(
+    scheduler: ChannelPollScheduler,
+) -> None:
+    scheduler.record_polls({"streamer": (100, _clip_ids("a", 10))}, now=0)
+    scheduler.record_polls(
+        {"streamer": (20, [*_clip_ids("a", 10), *_clip_ids("b", 5)])},
+        now=_HOUR,
+    )
+    stats = scheduler.channels["streamer"]
+    assert stats.last_new_clips == 5
+    assert stats.total_new_clips == 15
+    # Moving average of 10 and 5 new clips
+    assert stats.new_clips_per_poll == pytest.approx(8.5)
+    assert scheduler.get_clips_limit("streamer") == 17
+
+
+def test_clips_limit_doubles_when_all_listed_clips_are_new(
+    scheduler: ChannelPollScheduler,
+) -> None:
+    scheduler.record_polls({"streamer": (20, _clip_ids("a", 20))}, now=0)
+    assert scheduler.get_clips_limit("streamer") == 40
+    scheduler.record_polls({"streamer": (80, _clip_ids("b", 80))}, now=1)
+    assert scheduler.get_clips_limit("streamer") == 100
+
+
+def test_clips_limit_has_a_floor(scheduler: ChannelPollScheduler) -> None:
+    scheduler.record_polls({"streamer": (100, _clip_ids("a", 1))}, now=0)
+    assert scheduler.get_clips_limit("streamer") == 5
+
+
+def test_uploads_are_credited_on_next_poll(
+    scheduler: ChannelPollScheduler,
+) -> None:
+    scheduler.record_polls({"streamer": (100, [])}, now=0)
+    scheduler.record_upload("streamer")
+    scheduler.record_upload("streamer")
+    assert scheduler.channels["streamer"].uploads_per_poll is None
+    scheduler.record_polls({"streamer": (100, [])}, now=_HOUR)
+    stats = scheduler.channels["streamer"]
+    assert stats.uploads_per_poll == 2
+    assert stats.uploads_since_poll == 0
+    assert scheduler.get_yield("streamer") == pytest.approx(2)
+
+
+def test_stats_survive_reload(tmp_path: Path) -> None:
+    stats_path = tmp_path / "polls.json"
+    scheduler = ChannelPollScheduler(stats_path=stats_path)
+    scheduler.record_polls({"streamer": (100, _clip_ids("a", 3))}, now=0)
+    reloaded_scheduler = ChannelPollScheduler(stats_path=stats_path)
+    assert reloaded_scheduler.channels == scheduler.channels
+
+
+def _listing(channel: str, count: int, views: int) -> list[dict]:
+    return [
+        {
+            "id": f"{channel}-{index}",
+            "slug": f"{channel}-{index}",
+            "title": f"Clip {index}",
+            "viewCount": views - index,
+            "durationSeconds": 30,
+            "broadcaster": {"login": channel},
+        }
+        for index in range(count)
+    ]
+
+
+def test_discovery_records_channels_listed_to_the_end(
+    tmp_path: Path,
+    scheduler: ChannelPollScheduler,
+) -> None:
+    listings = {
+        "exhausted": _listing("exhausted", 2, views=3000),
+        "limited": _listing("limited", 50, views=2000),
+        "cut": _listing("cut", 50, views=1000),
+    }
+    downloader = TwitchClipsDownloader(
+        twitch_urls=[f"https://www.twitch.tv/{name}" for name in listings],
+        clips_folder_path=tmp_path,
+        poll_scheduler=scheduler,
+    )
+
+    def iter_channel_clips(
+        channel: str,
+        clips_limit: int | None = None,
+        **_: object,
+    ) -> Iterator[dict]:
+        yield from listings[channel][:clips_limit]
+
+    downloader.iter_channel_clips = iter_channel_clips
+    clips = downloader.discover_clips(clips_limit=3)
+    # Lists both clips of the first channel, three of the second and
+    # only the first clip of the last one, whose yield stays unknown
+    assert len(list(islice(clips, 4))) == 4
+    clips.close()
+    assert set(scheduler.channels) == {"exhausted", "limited"}
+    assert scheduler.channels["limited"].last_new_clips == 3
+    assert scheduler.plan_polls(list(listings), now=0) == {"cut": 100}
@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+
+from twitch_clips import ChannelUploadsIndex, UploadedVideo
+
+
+@pytest.mark.parametrize(
+    ("duration", "seconds"),
+    [
+        ("PT45S", 45),
+        ("PT1M5S", 65),
+        ("PT1H", 3600),
+        ("PT1H2M3S", 3723),
+        ("P1DT1S", 86401),
+        ("P0D", 0),
+        ("PT1.5S", None),
+        ("1M5S", None),
+        ("", None),
+    ],
+)
+def test_parse_duration(duration: str, seconds: int | None) -> None:
+    assert ChannelUploadsIndex.parse_duration(duration) == seconds
+
+
+@pytest.mark.parametrize(
+    ("title", "base_title"),
+    [
+        ("Insane Clutch #shorts #twitch", "insane clutch"),
+        ("Insane Clutch #shorts  ", "insane clutch"),
+        ("  Insane Clutch  ", "insane clutch"),
+        ("Clip #1 of the day", "clip #1 of the day"),
+        ("C# in five minutes", "c# in five minutes"),
+    ],
+)
+def test_base_title(title: str, base_title: str) -> None:
+    assert ChannelUploadsIndex.base_title(title) == base_title
+
+
+def _local_video(
+    title: str = "Insane clutch #shorts",
+    duration_seconds: int | None = 30,
+    clip_id: str | None = "clip",
+) -> UploadedVideo:
+    return UploadedVideo(
+        video_id=None,
+        title=title,
+        duration_seconds=duration_seconds,
+        clip_id=clip_id,
+    )
+
+
+@pytest.mark.parametrize(
+    "synced_video",
+    [
+        UploadedVideo("video", "Renamed", 10, clip_id="clip"),
+        UploadedVideo("video", "Insane Clutch", 32),
+        UploadedVideo("video", "insane clutch #twitch", 28),
+        UploadedVideo("video", "Insane clutch", None),
+    ],
+)
+def test_synced_video_replaces_local_entry(
+    synced_video: UploadedVideo,
+) -> None:
+    index = ChannelUploadsIndex()
+    index.add([_local_video(), _local_video("Other clip", clip_id="other")])
+    index.add([synced_video])
+    assert len(index) == 2
+    assert index.videos["video"].clip_id == "clip"
+    assert index.has_clip("clip")
+    assert "local:clip" not in index.videos
+
+
+@pytest.mark.parametrize(
+    "synced_video",
+    [
+        UploadedVideo("video", "Insane clutch", 30, clip_id="other"),
+        UploadedVideo("video", "Insane clutch", 33),
+        UploadedVideo("video", "Insane clutch 2", 30),
+    ],
+)
+def test_other_synced_video_keeps_local_entry(
+    synced_video: UploadedVideo,
+) -> None:
+    index = ChannelUploadsIndex()
+    index.add([_local_video()])
+    index.add([synced_video])
+    assert len(index) == 2
+    assert "local:clip" in index.videos
+
+
+def test_local_entry_is_replaced_once() -> None:
+    index = ChannelUploadsIndex()
+    index.add(
+        [
+            _local_video(clip_id=None),
+            _local_video(clip_id=None, duration_seconds=31),
+        ],
+    )
+    index.add([UploadedVideo("first", "Insane clutch", 30)])
+    index.add([UploadedVideo("second", "Insane clutch", 30)])
+    assert sorted(index.videos) == ["first", "second"]
+
+
+def test_index_is_written_on_save(tmp_path: Path) -> None:
+    index_path = tmp_path / "uploads.json"
+    index = ChannelUploadsIndex(index_path)
+    index.add([_local_video()])
+    index.add(
+        [UploadedVideo("video", "Other clip", 12, clip_id="other")],
+        unsynced_video_ids=["unsynced"],
+    )
+    assert not index_path.exists()
+    index.save()
+
+    loaded_index = ChannelUploadsIndex(index_path)
+    assert loaded_index.videos == index.videos
+    assert loaded_index.unsynced_video_ids == ["unsynced"]
+    loaded_index.add([UploadedVideo("synced", "Insane clutch", 30)])
+    assert "local:clip" not in loaded_index.videos
@@ -0,0 +1,87 @@
+import math
+import random
+from itertools import combinations
+
+import pytest
+
+from twitch_clips import ClipCostModel
+
+
+def _brute_force_value(
+    weights: list[float],
+    values: list[float],
+    budget: float,
+    max_count: int,
+) -> float:
+    best_value = 0.0
+    for count in range(1, max_count + 1):
+        for indexes in combinations(range(len(weights)), count):
+            if sum(weights[index] for index in indexes) <= budget:
+                best_value = max(
+                    best_value,
+                    sum(values[index] for index in indexes),
+                )
+    return best_value
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_select_within_budget_matches_brute_force(seed: int) -> None:
+    rng = random.Random(seed)
+    item_count = rng.randint(1, 9)
+    costs = [float(rng.randint(1, 40)) for _ in range(item_count)]
+    values = [rng.uniform(0, 100) for _ in range(item_count)]
+    budget = rng.randint(1, 100)
+    max_count = rng.randint(1, item_count)
+    # One unit per second keeps the integer costs exact
+    picked = ClipCostModel.select_within_budget(
+        costs=costs,
+        values=values,
+        budget=budget,
+        max_count=max_count,
+        resolution=budget,
+    )
+    assert picked == sorted(set(picked))
+    assert len(picked) <= max_count
+    assert sum(costs[index] for index in picked) <= budget
+    assert sum(values[index] for index in picked) == pytest.approx(
+        _brute_force_value(costs, values, budget, max_count),
+    )
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_select_within_budget_rounds_costs_up(seed: int) -> None:
+    rng = random.Random(seed)
+    item_count = rng.randint(1, 9)
+    costs = [rng.uniform(0.1, 40) for _ in range(item_count)]
+    values = [rng.uniform(0, 100) for _ in range(item_count)]
+    budget = rng.uniform(1, 100)
+    max_count = rng.randint(1, item_count)
+    resolution = 50
+    picked = ClipCostModel.select_within_budget(
+        costs=costs,
+        values=values,
+        budget=budget,
+        max_count=max_count,
+        resolution=resolution,
+    )
+    unit = budget / resolution
+    rounded_costs = [math.ceil(cost / unit - 1e-9) for cost in costs]
+    picked_value = sum(values[index] for index in picked)
+    assert len(picked) <= max_count
+    assert sum(costs[index] for index in picked) <= budget
+    assert picked_value == pytest.approx(
+        _brute_force_value(rounded_costs, values, resolution, max_count),
+    )
+    assert picked_value <= _brute_force_value(
+        costs,
+        values,
+        budget,
+        max_count,
+    ) + 1e-9
+
+
+def test_select_within_budget_without_room() -> None:
+    assert ClipCostModel.select_within_budget([1.0], [1.0], 0, 1) == []
+    assert ClipCostModel.select_within_budget([1.0], [1.0], 10, 0) == []
+    assert ClipCostModel.select_within_budget([], [], 10, 1) == []
+    assert ClipCostModel.select_within_budget([11.0], [1.0], 10, 1) == []
@@ -0,0 +1,252 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+from conftest import make_clip_info
+
+from twitch_clips import ClipHistoryStore
+
+_HOUR = 3600
+_WINDOW_SECONDS = 10 * _HOUR
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ClipHistoryStore:
+    return ClipHistoryStore(
+        tmp_path / "history",
+        velocity_window_seconds=_WINDOW_SECONDS,
+        velocity_horizon_seconds=_HOUR,
+    )
+
+
+def _views_per_hour(store: ClipHistoryStore) -> dict[str, float]:
+    return {
+        clip_id.decode(): views_per_hour
+        for clip_id, views_per_hour in zip(
+            store.clip_stats()["clip_id"],
+            store.clip_stats()["views_per_hour"],
+        )
+    }
+
+
+def test_velocity_is_smoothed_over_window(store: ClipHistoryStore) -> None:
+    store.append([make_clip_info("clip", view_count=100)], observed_at=0)
+    assert _views_per_hour(store) == {"clip": 0}
+    # The first velocity is taken as is
+    store.append([make_clip_info("clip", view_count=200)], observed_at=_HOUR)
+    assert _views_per_hour(store)["clip"] == pytest.approx(100)
+    store.append(
+        [make_clip_info("clip", view_count=400)],
+        observed_at=2 * _HOUR,
+    )
+    weight = 1 - math.exp(-_HOUR / _WINDOW_SECONDS)
+    assert _views_per_hour(store)["clip"] == pytest.approx(
+        100 + weight * (200 - 100),
+    )
+    # Observations older than the latest one are ignored
+    store.append([make_clip_info("clip", view_count=0)], observed_at=_HOUR)
+    [stats] = store.clip_stats()
+    assert stats["view_count"] == 400
+    assert stats["last_seen_at"] == 2 * _HOUR
+
+
+def test_velocity_weight_grows_with_elapsed_time(
+    store: ClipHistoryStore,
+) -> None:
+    for clip_id, interval in (("often", 1), ("rarely", 5)):
+        store.append([make_clip_info(clip_id, view_count=0)], observed_at=0)
+        store.append(
+            [make_clip_info(clip_id, view_count=100)],
+            observed_at=_HOUR,
+        )
+        store.append(
+            [make_clip_info(clip_id, view_count=100 + 300 * interval)],
+            observed_at=(1 + interval) * _HOUR,
+        )
+    views_per_hour = _views_per_hour(store)
+    assert 100 < views_per_hour["often"] < views_per_hour["rarely"] < 300
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_within_groups(seed: int) -> None:
+    groups = np.random.default_rng(seed).integers(0, 5, size=50)
+    positions = ClipHistoryStore.rank_within_groups(groups)
+    expected = [
+        int(np.count_nonzero(groups[:index] == group))
+        for index, group in enumerate(groups)
+    ]
+    assert positions.tolist() == expected
+    assert ClipHistoryStore.rank_within_groups(
+        np.array([7, 3, 7, 7]),
+    ).tolist() == [0, 0, 1, 2]
+
+
+def _clip_ids(stats: np.ndarray) -> list[str]:
+    return [clip_id.decode() for clip_id in stats["clip_id"]]
+
+
+def test_query_filters_and_quotas(store: ClipHistoryStore) -> None:
+    store.append(
+        [
+            make_clip_info(
+                "a1",
+                view_count=500,
+                broadcaster="Alpha",
+                duration_seconds=20,
+            ),
+            make_clip_info(
+                "a2",
+                view_count=400,
+                broadcaster="alpha",
+                duration_seconds=40,
+            ),
+            make_clip_info(
+                "a3",
+                view_count=300,
+                broadcaster="alpha",
+                duration_seconds=60,
+            ),
+            make_clip_info(
+                "b1",
+                view_count=450,
+                broadcaster="beta",
+                duration_seconds=30,
+            ),
+            make_clip_info(
+                "b2",
+                view_count=100,
+                broadcaster="beta",
+                duration_seconds=30,
+            ),
+        ],
+        observed_at=0,
+    )
+    store.append(
+        [
+            make_clip_info(
+                "b2",
+                view_count=1100,
+                broadcaster="beta",
+                duration_seconds=30,
+            ),
+            make_clip_info(
+                "c1",
+                view_count=350,
+                broadcaster="gamma",
+                duration_seconds=10,
+            ),
+        ],
+        observed_at=_HOUR,
+    )
+    # b2 is projected an hour ahead at 1000 views per hour
+    assert _clip_ids(store.query()) == ["b2", "a1", "b1", "a2", "c1", "a3"]
+    assert _clip_ids(store.query(channels=["ALPHA", "unknown"])) == [
+        "a1",
+        "a2",
+        "a3",
+    ]
+    assert _clip_ids(store.query(min_duration=30, max_duration=60)) == [
+        "b2",
+        "b1",
+        "a2",
+    ]
+    assert _clip_ids(store.query(seen_since=_HOUR)) == ["b2", "c1"]
+    assert _clip_ids(store.query(max_clips_per_channel=1)) == [
+        "b2",
+        "a1",
+        "c1",
+    ]
+    assert _clip_ids(store.query(max_clips_per_channel=2, limit=4)) == [
+        "b2",
+        "a1",
+        "b1",
+        "a2",
+    ]
+
+
+def test_rank_defers_clips_past_channel_quota(tmp_path: Path) -> None:
+    store = ClipHistoryStore(tmp_path / "history", max_clips_per_channel=1)
+    clips = [
+        make_clip_info("a1", view_count=500, broadcaster="alpha"),
+        make_clip_info("a2", view_count=400, broadcaster="alpha"),
+        make_clip_info("b1", view_count=300, broadcaster="beta"),
+    ]
+    ranked_clips = store.rank(clips)
+    assert [clip.id for clip in ranked_clips] == ["a1", "b1", "a2"]
+
+
+def _assert_same_stats(stats: np.ndarray, other_stats: np.ndarray) -> None:
+    assert len(stats) == len(other_stats)
+    assert (stats == other_stats).all()
+
+
+def test_reload_equals_in_memory_stats(tmp_path: Path) -> None:
+    history_path = tmp_path / "history"
+    store = ClipHistoryStore(history_path, velocity_window_seconds=_HOUR)
+    rng = np.random.default_rng(0)
+    view_counts = rng.integers(0, 1000, size=20)
+    for observation in range(6):
+        view_counts = view_counts + rng.integers(0, 500, size=20)
+        clips = [
+            make_clip_info(
+                f"clip{index}",
+                view_count=int(view_count),
+                broadcaster=f"ch{index % 3}",
+            )
+            for index, view_count in enumerate(view_counts)
+            if rng.random() < 0.8
+        ]
+        store.append(clips, observed_at=observation * 600)
+    reloaded_store = ClipHistoryStore(
+        history_path,
+        velocity_window_seconds=_HOUR,
+    )
+    _assert_same_stats(reloaded_store.clip_stats(), store.clip_stats())
+    assert len(reloaded_store) == len(store)
+
+
+def test_compact_drops_old_rows_and_their_velocity(tmp_path: Path) -> None:
+    history_path = tmp_path / "history"
+    store = ClipHistoryStore(
+        history_path,
+        velocity_window_seconds=_HOUR,
+        retention_seconds=10 * _HOUR,
+        max_segments=3,
+    )
+    store.append(
+        [
+            make_clip_info("kept", view_count=0),
+            make_clip_info("dropped", view_count=0),
+        ],
+        observed_at=0,
+    )
+    store.append(
+        [make_clip_info("kept", view_count=1000)],
+        observed_at=11 * _HOUR,
+    )
+    store.append(
+        [make_clip_info("kept", view_count=1100)],
+        observed_at=12 * _HOUR,
+    )
+    assert len(list(history_path.glob("*.npy"))) == 3
+    # A fourth segment triggers compaction
+    store.append(
+        [make_clip_info("kept", view_count=1300)],
+        observed_at=13 * _HOUR,
+    )
+    assert len(list(history_path.glob("*.npy"))) == 1
+    assert len(store) == 3
+    assert _clip_ids(store.clip_stats()) == ["kept"]
+    [stats] = store.clip_stats()
+    assert stats["first_seen_at"] == 11 * _HOUR
+    # The 1000 views gained since the dropped row don't count
+    weight = 1 - math.exp(-1)
+    assert stats["views_per_hour"] == pytest.approx(100 + weight * 100)
+    _assert_same_stats(
+        ClipHistoryStore(
+            history_path,
+            velocity_window_seconds=_HOUR,
+        ).clip_stats(),
+        store.clip_stats(),
+    )
@@ -0,0 +1,112 @@
+import asyncio
+from collections import Counter
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator
+
+from conftest import make_clip_info
+
+from twitch_clips import (
+    MinHashTitleIndex,
+    TwitchClipsToYoutube,
+    TwitchData,
+)
+from twitch_clips.TwitchClipsDownloader import ClipInfo
+
+
+def _count_filtered_clips(pipeline: TwitchClipsToYoutube) -> Counter:
+    filtered_clip_ids: Counter = Counter()
+    demojize_clips = pipeline.twitch_downloader.demojize_clips
+
+    def count_clips(clips_info: list[ClipInfo]) -> list[ClipInfo]:
+        filtered_clip_ids.update(clip_info.id for clip_info in clips_info)
+        return demojize_clips(clips_info=clips_info)
+
+    pipeline.twitch_downloader.demojize_clips = count_clips
+    return filtered_clip_ids
+
+
+_TITLES = [
+    "insane clutch on dust two",
+    "streamer rage quits again",
+    "chat goes wild after the donation",
+    "worst landing ever seen",
+    "speedrun world record attempt",
+    "cat walks across the keyboard",
+    "unexpected jumpscare in the basement",
+    "team wipe at the final boss",
+    "funniest bug of the season",
+    "perfect headshot through smoke",
+    "mic left on during lunch",
+    "dancing victory royale emote",
+    "surprise raid from a friend",
+    "tournament winning play",
+    "how did that even happen",
+    "subscriber train goes crazy",
+    "pet parrot steals the show",
+    "ranked placement disaster",
+    "late night karaoke session",
+    "one hp comeback",
+]
+
+
+def _discovered_clips() -> list[ClipInfo]:
+    # Every fourth clip repeats the title of the clip before it
+    clips = []
+    for index in range(20):
+        title_number = index - index % 4 // 3
+        clips.append(
+            make_clip_info(
+                str(index),
+                title=_TITLES[title_number],
+                view_count=1000 - index,
+            ),
+        )
+    return clips
+
+
+def test_discovered_clips_are_filtered_once(
+    make_pipeline: Callable[..., TwitchClipsToYoutube],
+) -> None:
+    pipeline = make_pipeline(max_videos_to_upload=4, title_index=None)
+    discovered_clips = _discovered_clips()
+
+    def discover_clips(**_: object) -> Iterator[ClipInfo]:
+        yield from discovered_clips
+
+    pipeline.twitch_downloader.discover_clips = discover_clips
+    filtered_clip_ids = _count_filtered_clips(pipeline)
+    selected_clips = pipeline._select_clips()
+    assert set(filtered_clip_ids.values()) == {1}
+    assert len(filtered_clip_ids) == len(discovered_clips)
+    # Repeated titles are dropped across chunks too
+    assert len(selected_clips) == 15
+
+
+def test_selection_stops_once_enough_candidates_pass(
+    make_pipeline: Callable[..., TwitchClipsToYoutube],
+    tmp_path: Path,
+) -> None:
+    pipeline = make_pipeline(
+        max_videos_to_upload=2,
+        twitch_data=TwitchData(
+            channels_urls=["https://www.twitch.tv/streamer"],
+            clips_folder_path=tmp_path / "clips",
+            used_titles=[_TITLES[0]],
+        ),
+        title_index=MinHashTitleIndex(),
+    )
+    discovered_clips = _discovered_clips()
+    listed_clips = []
+
+    async def adiscover_clips(**_: object) -> AsyncIterator[ClipInfo]:
+        for clip_info in discovered_clips:
+            listed_clips.append(clip_info)
+            yield clip_info
+
+    pipeline.twitch_downloader.adiscover_clips = adiscover_clips
+    filtered_clip_ids = _count_filtered_clips(pipeline)
+    selected_clips = asyncio.run(pipeline._aselect_clips())
+    assert set(filtered_clip_ids.values()) == {1}
+    assert len(filtered_clip_ids) == len(listed_clips) == 12
+    assert len(selected_clips) >= 6
+    assert _TITLES[0] not in {clip.title for clip in selected_clips}
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from twitch_clips import ClipsDiskBudget, DiskBudgetExceededError
+
+
+def _write_file(path: Path, size: int, age_seconds: float = 0) -> Path:
+    path.write_bytes(b"\0" * size)
+    modified_at = time.time() - age_seconds
+    os.utime(path, (modified_at, modified_at))
+    return path
+
+
+def test_completed_files_are_evicted_before_oldest_orphans(
+    tmp_path: Path,
+) -> None:
+    budget = ClipsDiskBudget(
+        tmp_path,
+        budget_bytes=700,
+        orphan_grace_seconds=60,
+    )
+    orphans = [
+        _write_file(tmp_path / f"orphan{age}.mp4", 100, age_seconds=age)
+        for age in (120, 600, 300)
+    ]
+    recent_orphan = _write_file(tmp_path / "recent.mp4", 100)
+    reserved_path = tmp_path / "reserved.mp4"
+    with budget.reservation("reserved", reserved_path, 100):
+        _write_file(reserved_path, 100, age_seconds=900)
+    completed = [
+        _write_file(tmp_path / f"completed{index}.mp4", 100)
+        for index in range(2)
+    ]
+    for path in reversed(completed):
+        budget.mark_completed(path)
+
+    evicted_paths: list[Path] = []
+    for index in range(5):
+        # The folder is full, every new file evicts one file
+        new_path = tmp_path / f"new{index}.mp4"
+        with budget.reservation(f"new{index}", new_path, 100):
+            _write_file(new_path, 100)
+        evicted_paths.extend(
+            path
+            for path in completed + orphans
+            if not path.exists() and path not in evicted_paths
+        )
+        assert len(evicted_paths) == index + 1
+    assert evicted_paths == [
+        completed[1],
+        completed[0],
+        orphans[1],
+        orphans[2],
+        orphans[0],
+    ]
+    # Protected files and orphans within the grace period are kept
+    assert reserved_path.exists()
+    assert recent_orphan.exists()
+    with pytest.raises(DiskBudgetExceededError, match="Not enough"):
+        budget.reserve("full", tmp_path / "full.mp4", 100)
+    metrics = budget.metrics()
+    assert metrics.evicted_bytes == 500
+    assert metrics.used_bytes == 700
+
+
+def _reserve_in_thread(
+    budget: ClipsDiskBudget,
+    path: Path,
+    estimated_bytes: int,
+) -> tuple[threading.Thread, list[Exception]]:
+    errors: list[Exception] = []
+
+    def reserve() -> None:
+        try:
+            budget.reserve(path.name, path, estimated_bytes)
+        except DiskBudgetExceededError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=reserve)
+    thread.start()
+    return thread, errors
+
+
+def test_reserve_blocks_until_space_is_released(tmp_path: Path) -> None:
+    budget = ClipsDiskBudget(tmp_path, budget_bytes=1000)
+    first_path = tmp_path / "first.mp4"
+    budget.reserve("first", first_path, 600)
+    thread, errors = _reserve_in_thread(budget, tmp_path / "second.mp4", 600)
+    thread.join(0.1)
+    assert thread.is_alive()
+    # Written bytes move from the reservation to the folder usage
+    _write_file(first_path, 300)
+    budget.mark_completed(tmp_path / "other.mp4")
+    thread.join(0.1)
+    assert thread.is_alive()
+    # The download failed, its partial file is removed
+    first_path.unlink()
+    budget.release("first")
+    thread.join(5)
+    assert not thread.is_alive()
+    assert errors == []
+    metrics = budget.metrics()
+    assert metrics.in_flight_bytes == 600
+    assert metrics.evicted_bytes == 0
+    assert metrics.blocked_seconds >= 0.2
+
+
+def test_blocked_reserve_fails_once_no_writer_can_free_space(
+    tmp_path: Path,
+) -> None:
+    budget = ClipsDiskBudget(tmp_path, budget_bytes=1000)
+    first_path = tmp_path / "first.mp4"
+    budget.reserve("first", first_path, 600)
+    thread, errors = _reserve_in_thread(budget, tmp_path / "second.mp4", 600)
+    thread.join(0.1)
+    assert thread.is_alive()
+    _write_file(first_path, 600)
+    # The written file stays protected once its reservation ends
+    budget.release("first")
+    thread.join(5)
+    assert not thread.is_alive()
+    [error] = errors
+    assert "Not enough disk budget" in str(error)
+    assert first_path.exists()
+    budget.mark_completed(first_path)
+    budget.reserve("second", tmp_path / "second.mp4", 600)
+    assert not first_path.exists()
+
+
+def test_reserve_gives_up_after_timeout(tmp_path: Path) -> None:
+    budget = ClipsDiskBudget(tmp_path, budget_bytes=1000)
+    budget.reserve("first", tmp_path / "first.mp4", 600)
+    with pytest.raises(DiskBudgetExceededError, match="Not enough"):
+        budget.reserve("second", tmp_path / "second.mp4", 600, timeout=0.05)
+    assert budget.metrics().in_flight_bytes == 600
+
+
+def test_reservation_larger_than_budget_fails_fast(tmp_path: Path) -> None:
+    budget = ClipsDiskBudget(tmp_path, budget_bytes=1000)
+    budget.reserve("first", tmp_path / "first.mp4", 600)
+    started_at = time.monotonic()
+    with pytest.raises(DiskBudgetExceededError, match="doesn't fit"):
+        budget.reserve("huge", tmp_path / "huge.mp4", 1001)
+    assert time.monotonic() - started_at < 1
+    assert budget.metrics().in_flight_bytes == 600
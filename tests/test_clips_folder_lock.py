@@ -0,0 +1,119 @@
+import multiprocessing
+from multiprocessing.connection import Connection
+from pathlib import Path
+
+import pytest
+
+from twitch_clips import ClipsFolderLock
+
+# flock locks are POSIX, so the holder can be forked
+_CONTEXT = multiprocessing.get_context("fork")
+
+
+def _hold_lease(
+    clips_folder_path: Path,
+    clip_id: str,
+    connection: Connection,
+    single_flight: bool,
+) -> None:
+    folder_lock = ClipsFolderLock(
+        clips_folder_path,
+        run_id="holder",
+        single_flight=single_flight,
+    )
+    folder_lock.acquire_run()
+    connection.send(folder_lock.try_lease(clip_id))
+    # Hold the locks until the test lets go or kills the process
+    connection.recv()
+    folder_lock.release_run()
+
+
+@pytest.fixture
+def start_holder(tmp_path: Path):
+    processes = []
+
+    def start(
+        clip_id: str = "clip",
+        single_flight: bool = False,
+    ) -> tuple[multiprocessing.Process, Connection]:
+        connection, child_connection = _CONTEXT.Pipe()
+        process = _CONTEXT.Process(
+            target=_hold_lease,
+            args=(tmp_path, clip_id, child_connection, single_flight),
+        )
+        process.start()
+        processes.append(process)
+        assert connection.poll(10)
+        assert connection.recv()
+        return process, connection
+
+    yield start
+    for process in processes:
+        process.kill()
+        process.join()
+
+
+def test_lease_is_exclusive_across_processes(
+    tmp_path: Path,
+    start_holder,
+) -> None:
+    process, connection = start_holder()
+    folder_lock = ClipsFolderLock(tmp_path, run_id="runner")
+    folder_lock.acquire_run()
+    assert folder_lock.other_runs() == ["holder"]
+    assert not folder_lock.try_lease("clip")
+    assert folder_lock.try_lease("other clip")
+    connection.send(None)
+    process.join(10)
+    assert folder_lock.other_runs() == []
+    assert folder_lock.try_lease("clip")
+    folder_lock.release_run()
+
+
+def test_killed_holder_releases_lease(tmp_path: Path, start_holder) -> None:
+    process, _ = start_holder()
+    folder_lock = ClipsFolderLock(tmp_path, run_id="runner")
+    assert not folder_lock.try_lease("clip")
+    process.kill()
+    process.join(10)
+    assert folder_lock.try_lease("clip")
+    folder_lock.release_leases()
+
+
+def test_single_flight_run_excludes_other_runs(
+    tmp_path: Path,
+    start_holder,
+) -> None:
+    process, connection = start_holder(single_flight=True)
+    folder_lock = ClipsFolderLock(tmp_path, run_id="runner")
+    with pytest.raises(RuntimeError, match="single-flight"):
+        folder_lock.acquire_run()
+    connection.send(None)
+    process.join(10)
+    folder_lock.acquire_run()
+    folder_lock.release_run()
+
+
+def test_single_flight_run_waits_for_other_runs(
+    tmp_path: Path,
+    start_holder,
+) -> None:
+    start_holder()
+    folder_lock = ClipsFolderLock(
+        tmp_path,
+        run_id="runner",
+        single_flight=True,
+    )
+    with pytest.raises(RuntimeError, match="single-flight"):
+        folder_lock.acquire_run()
+
+
+def test_published_marker_outlives_run(tmp_path: Path) -> None:
+    folder_lock = ClipsFolderLock(tmp_path, run_id="runner")
+    folder_lock.acquire_run()
+    assert folder_lock.try_lease("clip")
+    folder_lock.mark_published("clip")
+    folder_lock.release_run()
+    later_lock = ClipsFolderLock(tmp_path, run_id="later runner")
+    assert later_lock.is_published("clip")
+    assert not later_lock.is_published("other clip")
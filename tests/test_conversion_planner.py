@@ -0,0 +1,263 @@
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from twitch_clips import (
+    ConversionActionEnum,
+    ConversionPlanner,
+    EncodeSettings,
+    MediaProbe,
+    TwitchClipsToYoutube,
+    VerticalVideoConverter,
+)
+
+_LANDSCAPE_PROBE = MediaProbe(
+    width=1920,
+    height=1080,
+    duration=30.0,
+    video_codec="h264",
+    audio_codec="aac",
+    format_name="mov,mp4,m4a,3gp,3g2,mj2",
+)
+
+
+def _probe(**fields: object) -> MediaProbe:
+    return MediaProbe(**{**_LANDSCAPE_PROBE.__dict__, **fields})
+
+
+@pytest.mark.parametrize(
+    ("probe_json", "expected"),
+    [
+        (
+            {
+                "streams": [
+                    {
+                        "codec_type": "video",
+                        "codec_name": "h264",
+                        "width": 1920,
+                        "height": 1080,
+                    },
+                    {"codec_type": "audio", "codec_name": "aac"},
+                ],
+                "format": {
+                    "duration": "30.000000",
+                    "format_name": "mov,mp4,m4a,3gp,3g2,mj2",
+                },
+            },
+            _LANDSCAPE_PROBE,
+        ),
+        (
+            {
+                "streams": [
+                    {"codec_type": "audio", "codec_name": "opus"},
+                    {"codec_type": "data"},
+                    {
+                        "codec_type": "video",
+                        "codec_name": "vp9",
+                        "width": "1080",
+                        "height": "1920",
+                    },
+                ],
+                "format": {
+                    "duration": "12.5",
+                    "format_name": "matroska,webm",
+                },
+            },
+            MediaProbe(
+                width=1080,
+                height=1920,
+                duration=12.5,
+                video_codec="vp9",
+                audio_codec="opus",
+                format_name="matroska,webm",
+            ),
+        ),
+        (
+            {
+                "streams": [
+                    {
+                        "codec_type": "video",
+                        "codec_name": "hevc",
+                        "width": 720,
+                        "height": 1280,
+                    },
+                ],
+                "format": {"duration": "8", "format_name": "mpegts"},
+            },
+            MediaProbe(
+                width=720,
+                height=1280,
+                duration=8.0,
+                video_codec="hevc",
+                audio_codec=None,
+                format_name="mpegts",
+            ),
+        ),
+    ],
+)
+def test_parse_probe(probe_json: dict, expected: MediaProbe) -> None:
+    assert ConversionPlanner.parse_probe(probe_json) == expected
+
+
+_MP4_SUMMARY = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'clip.mp4':
+  Metadata:
+    major_brand     : isom
+  Duration: 00:00:30.00, start: 0.000000, bitrate: 6000 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), \
+yuv420p(tv, bt709, progressive), 1920x1080 [SAR 1:1 DAR 16:9], \
+5800 kb/s, 60 fps, 60 tbr, 15360 tbn (default)
+  Stream #0:1[0x2](und): Audio: aac (LC) (mp4a / 0x6134706D), \
+48000 Hz, stereo, fltp, 160 kb/s (default)
+At least one output file must be specified
+"""
+
+_WEBM_SUMMARY = """\
+Input #0, matroska,webm, from 'clip.webm':
+  Duration: 01:02:03.50, start: -0.007000, bitrate: 2500 kb/s
+  Stream #0:0: Audio: opus, 48000 Hz, stereo, fltp (default)
+  Stream #0:1: Video: vp9 (Profile 0), yuv420p(tv), 1080x1920, \
+SAR 1:1 DAR 9:16, 30 fps, 30 tbr, 1k tbn (default)
+"""
+
+
+@pytest.mark.parametrize(
+    ("summary", "expected"),
+    [
+        (_MP4_SUMMARY, _LANDSCAPE_PROBE),
+        (
+            _WEBM_SUMMARY,
+            MediaProbe(
+                width=1080,
+                height=1920,
+                duration=3723.5,
+                video_codec="vp9",
+                audio_codec="opus",
+                format_name="matroska,webm",
+            ),
+        ),
+        (
+            _MP4_SUMMARY.replace(
+                "  Stream #0:1[0x2](und): Audio: aac",
+                "  Stream #0:1[0x2](und): Data: bin_data",
+            ),
+            _probe(audio_codec=None),
+        ),
+    ],
+)
+def test_parse_ffmpeg_summary(summary: str, expected: MediaProbe) -> None:
+    assert ConversionPlanner.parse_ffmpeg_summary(summary) == expected
+
+
+@pytest.mark.parametrize(
+    "summary",
+    [
+        "clip.mp4: No such file or directory",
+        _MP4_SUMMARY.replace("Video: h264", "Data: h264"),
+        _MP4_SUMMARY.replace("Duration: 00:00:30.00", "Duration: N/A"),
+    ],
+)
+def test_parse_ffmpeg_summary_needs_video_stream(summary: str) -> None:
+    with pytest.raises(ValueError, match="No video stream"):
+        ConversionPlanner.parse_ffmpeg_summary(summary)
+
+
+_PORTRAIT_PROBE = _probe(width=1080, height=1920)
+
+
+@pytest.mark.parametrize(
+    ("probe", "expected_action"),
+    [
+        (_PORTRAIT_PROBE, ConversionActionEnum.PASS_THROUGH),
+        (
+            _probe(width=720, height=1280, audio_codec=None),
+            ConversionActionEnum.PASS_THROUGH,
+        ),
+        (
+            _probe(
+                width=1080,
+                height=1920,
+                video_codec="vp9",
+                audio_codec="opus",
+                format_name="matroska,webm",
+            ),
+            ConversionActionEnum.REMUX,
+        ),
+        (
+            _probe(width=1080, height=1920, format_name="mpegts"),
+            ConversionActionEnum.REMUX,
+        ),
+        (_LANDSCAPE_PROBE, ConversionActionEnum.REENCODE),
+        (_probe(width=1080, height=1080), ConversionActionEnum.REENCODE),
+        (
+            _probe(width=1080, height=1920, video_codec="mpeg4"),
+            ConversionActionEnum.REENCODE,
+        ),
+        (
+            _probe(width=1080, height=1920, audio_codec="ac3"),
+            ConversionActionEnum.REENCODE,
+        ),
+        (
+            _probe(
+                width=1080,
+                height=1920,
+                video_codec="mpeg2video",
+                format_name="mpegts",
+            ),
+            ConversionActionEnum.REENCODE,
+        ),
+    ],
+)
+def test_plan(
+    probe: MediaProbe,
+    expected_action: ConversionActionEnum,
+) -> None:
+    plan = ConversionPlanner().plan(probe)
+    assert plan.action is expected_action
+    assert plan.probe is probe
+
+
+@pytest.fixture
+def encodes(monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    encodes = []
+
+    def run_ffmpeg_encode(**kwargs: object) -> Path:
+        encodes.append(kwargs)
+        return Path(kwargs["output_path"])
+
+    monkeypatch.setattr(
+        VerticalVideoConverter,
+        "run_ffmpeg_encode",
+        run_ffmpeg_encode,
+    )
+    return encodes
+
+
+def test_pipeline_encode_settings_reach_the_planner(
+    make_pipeline: Callable[..., TwitchClipsToYoutube],
+    encodes: list[dict],
+    tmp_path: Path,
+) -> None:
+    planner = ConversionPlanner()
+    planner.probe = lambda source: _LANDSCAPE_PROBE
+    encode_settings = EncodeSettings(
+        max_bytes_per_second=250_000,
+        audio_bytes_per_second=16_000,
+        timeout_seconds=60,
+    )
+    pipeline = make_pipeline(
+        conversion_planner=planner,
+        encode_settings=encode_settings,
+    )
+    pipeline._convert_with_planner(
+        clip_path=tmp_path / "clip.mp4",
+        output_path=tmp_path / "clip_vertical.mp4",
+    )
+    [encode] = encodes
+    video_arguments = encode["video_arguments"]
+    assert "-crf" not in video_arguments
+    bitrate = video_arguments[video_arguments.index("-maxrate") + 1]
+    assert int(bitrate) == (250_000 - 16_000) * 8
+    assert encode["audio_arguments"][-1] == str(16_000 * 8)
+    assert encode["timeout_seconds"] == 60
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from twitch_clips import CpuMeter
+
+_BURN_COMMAND = [sys.executable, "-c", "sum(range(20_000_000))"]
+
+
+def test_run_counts_child_cpu_of_calling_thread() -> None:
+    with CpuMeter.measure() as usage:
+        CpuMeter.run(_BURN_COMMAND)
+    assert usage.processes == 1
+    assert usage.process_seconds > 0.05
+
+
+def test_run_ignores_processes_of_other_threads() -> None:
+    burner = threading.Thread(target=CpuMeter.run, args=(_BURN_COMMAND,))
+    with CpuMeter.measure() as usage:
+        burner.start()
+        CpuMeter.run(["sleep", "0.2"])
+        burner.join()
+    assert usage.processes == 1
+    assert usage.process_seconds < 0.05
+
+
+def test_run_raises_with_error_output() -> None:
+    with pytest.raises(subprocess.CalledProcessError) as error_info:
+        CpuMeter.run(["sh", "-c", "echo failed >&2; exit 3"])
+    assert error_info.value.returncode == 3
+    assert error_info.value.stderr == b"failed\n"
+
+
+def test_run_kills_process_on_timeout() -> None:
+    with pytest.raises(subprocess.TimeoutExpired):
+        CpuMeter.run(["sleep", "10"], timeout_seconds=0.2)
@@ -0,0 +1,156 @@
+import io
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from twitch_clips import (
+    DropPolicyEnum,
+    JsonLinesLogger,
+    Logger,
+    LogLevelEnum,
+    RotatingFileSettings,
+)
+from twitch_clips.Logger import _RotatingFileSink
+
+
+def _read_records(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_below_level_are_dropped() -> None:
+    stream = io.StringIO()
+    logger = JsonLinesLogger(level=LogLevelEnum.WARNING, stream=stream)
+    logger.log("Listing clips", level=LogLevelEnum.DEBUG)
+    logger.log("Downloaded clip")
+    logger.log("Upload retried", level=LogLevelEnum.WARNING)
+    logger.get_child("uploader").log("Upload failed", LogLevelEnum.ERROR)
+    logger.close()
+    records = _read_records(stream)
+    assert [(record["level"], record["message"]) for record in records] == [
+        ("WARNING", "Upload retried"),
+        ("ERROR", "Upload failed"),
+    ]
+    assert records[1]["component"] == "uploader"
+
+
+def test_records_of_other_components_are_dropped() -> None:
+    stream = io.StringIO()
+    logger = JsonLinesLogger(components=["uploader"], stream=stream)
+    logger.get_child("downloader").log("Downloaded clip")
+    logger.get_child("downloader").get_child("uploader").log("Uploaded")
+    logger.log("Run finished")
+    logger.close()
+    assert [
+        (record["component"], record["message"])
+        for record in _read_records(stream)
+    ] == [("downloader.uploader", "Uploaded")]
+
+
+def test_plain_logger_prints_level(capsys: pytest.CaptureFixture) -> None:
+    logger = Logger()
+    logger.log("downloaded clip")
+    logger.log("upload failed", level=LogLevelEnum.ERROR)
+    Logger(debug_mode=False).log("hidden", level=LogLevelEnum.ERROR)
+    assert capsys.readouterr().out.splitlines() == [
+        "[INFO] Downloaded clip",
+        "[ERROR] Upload failed",
+    ]
+
+
+def test_close_flushes_queued_records(tmp_path: Path) -> None:
+    file_path = tmp_path / "logs" / "run.jsonl"
+    logger = JsonLinesLogger(file_settings=RotatingFileSettings(file_path))
+    for index in range(1000):
+        logger.log(f"Record {index}")
+    logger.close()
+    logger.close()
+    logger.log("Logged after close")
+    lines = file_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1000
+    assert json.loads(lines[-1])["message"] == "Record 999"
+    assert not logger._writer.is_alive()
+
+
+class _BlockingStream(io.StringIO):
+    """Stream blocking the writer thread until it's released."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writing = threading.Event()
+        self.released = threading.Event()
+
+    def write(self, data: str) -> int:
+        self.writing.set()
+        self.released.wait()
+        return super().write(data)
+
+
+@pytest.mark.parametrize(
+    ("drop_policy", "messages"),
+    [
+        (DropPolicyEnum.DROP_NEWEST, ["First", "Second"]),
+        (DropPolicyEnum.DROP_OLDEST, ["First", "Third"]),
+    ],
+)
+def test_full_queue_drops_records(
+    drop_policy: DropPolicyEnum,
+    messages: list[str],
+) -> None:
+    stream = _BlockingStream()
+    logger = JsonLinesLogger(
+        stream=stream,
+        queue_size=1,
+        drop_policy=drop_policy,
+    )
+    logger.log("First")
+    assert stream.writing.wait(5)
+    logger.log("Second")
+    logger.log("Third")
+    assert logger.dropped_count == 1
+    stream.released.set()
+    logger.close()
+    assert [record["message"] for record in _read_records(stream)] == (
+        messages
+    )
+
+
+def test_sink_rotates_backups(tmp_path: Path) -> None:
+    file_path = tmp_path / "run.jsonl"
+    sink = _RotatingFileSink(
+        RotatingFileSettings(file_path, max_bytes=20, backup_count=2),
+    )
+    for index in range(5):
+        sink.write(f"record {index} line\n")
+    sink.close()
+    # Two 14-byte records exceed a file, the oldest are dropped
+    assert file_path.read_text() == "record 4 line\n"
+    assert Path(f"{file_path}.1").read_text() == "record 3 line\n"
+    assert Path(f"{file_path}.2").read_text() == "record 2 line\n"
+    assert not Path(f"{file_path}.3").exists()
+
+
+def test_sink_appends_up_to_max_bytes(tmp_path: Path) -> None:
+    file_path = tmp_path / "run.jsonl"
+    file_path.write_text("old\n")
+    sink = _RotatingFileSink(
+        RotatingFileSettings(file_path, max_bytes=12, backup_count=1),
+    )
+    sink.write("new\n")
+    sink.write("more\n")
+    sink.close()
+    assert file_path.read_text() == "more\n"
+    assert Path(f"{file_path}.1").read_text() == "old\nnew\n"
+
+
+def test_sink_without_backups_truncates(tmp_path: Path) -> None:
+    file_path = tmp_path / "run.jsonl"
+    sink = _RotatingFileSink(
+        RotatingFileSettings(file_path, max_bytes=10, backup_count=0),
+    )
+    sink.write("first line\n")
+    sink.write("second line\n")
+    sink.close()
+    assert file_path.read_text() == "second line\n"
+    assert list(tmp_path.iterdir()) == [file_path]
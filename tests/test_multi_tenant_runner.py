@@ -0,0 +1,69 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from conftest import StubUploader
+
+from twitch_clips import (
+    JsonLinesLogger,
+    MultiTenantRunner,
+    TenantConfig,
+    TwitchClipsToYoutube,
+    TwitchData,
+)
+
+
+def _make_tenant(name: str, tmp_path: Path) -> TenantConfig:
+    return TenantConfig(
+        name=name,
+        max_videos_to_upload=2,
+        twitch_data=TwitchData(
+            channels_urls=[f"https://www.twitch.tv/{name}"],
+            clips_folder_path=tmp_path / name,
+        ),
+        uploader=StubUploader(),
+    )
+
+
+def test_failing_tenant_does_not_stop_the_others(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    def run(pipeline: TwitchClipsToYoutube) -> int:
+        pipeline.logger.log("Publishing clips...")
+        if pipeline.clips_folder_path.name == "broken":
+            msg = "Upload limit exceeded"
+            raise RuntimeError(msg)
+        return pipeline.max_videos
+
+    monkeypatch.setattr(TwitchClipsToYoutube, "run", run)
+    stream = io.StringIO()
+    logger = JsonLinesLogger(stream=stream)
+    runner = MultiTenantRunner(
+        tenants=[
+            _make_tenant("broken", tmp_path),
+            _make_tenant("healthy", tmp_path),
+        ],
+        logger=logger,
+    )
+    results = runner.run()
+    logger.close()
+
+    assert [result.name for result in results] == ["broken", "healthy"]
+    assert results[0].posted_videos == 0
+    assert str(results[0].error) == "Upload limit exceeded"
+    assert results[1].posted_videos == 2
+    assert results[1].error is None
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    components = {
+        record["component"]
+        for record in records
+        if record["message"] == "Publishing clips..."
+    }
+    assert components == {"broken.pipeline", "healthy.pipeline"}
+    [error_record] = [
+        record for record in records if record["level"] == "ERROR"
+    ]
+    assert error_record["component"] == "runner"
+    assert "broken" in error_record["message"]
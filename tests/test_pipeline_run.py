@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from conftest import make_clip_info
+
+from twitch_clips import TwitchClipsToYoutube
+from twitch_clips.TwitchClipsDownloader import ClipInfo
+
+
+def test_run_cleans_up_when_interrupted(
+    make_pipeline: Callable[..., TwitchClipsToYoutube],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pipeline = make_pipeline()
+    clip_info = make_clip_info("clip")
+    clip_path = pipeline.twitch_downloader.clips_folder_path / "clip.mp4"
+
+    def publish_clip(**_: object) -> bool:
+        assert pipeline.folder_lock.try_lease(clip_info.id)
+        clip_path.parent.mkdir(parents=True, exist_ok=True)
+        clip_path.write_bytes(b"\0")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(pipeline, "_select_clips", lambda: [clip_info])
+    monkeypatch.setattr(pipeline, "_is_vertical", lambda _: False)
+    monkeypatch.setattr(pipeline, "_publish_clip", publish_clip)
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.run()
+    assert not clip_path.exists()
+    assert not pipeline.folder_lock.has_lease(clip_info.id)
+
+
+def test_run_cleans_up_when_selection_fails(
+    make_pipeline: Callable[..., TwitchClipsToYoutube],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pipeline = make_pipeline()
+    cleaned_up_runs = []
+    monkeypatch.setattr(
+        pipeline,
+        "_clean_up_run",
+        lambda: cleaned_up_runs.append(True),
+    )
+
+    def select_clips() -> list[ClipInfo]:
+        msg = "Twitch API is unreachable"
+        raise ConnectionError(msg)
+
+    monkeypatch.setattr(pipeline, "_select_clips", select_clips)
+    with pytest.raises(ConnectionError):
+        pipeline.run()
+    assert cleaned_up_runs == [True]
@@ -0,0 +1,252 @@
+import importlib
+import subprocess
+
+import httpx
+import pytest
+
+from twitch_clips import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _Random:
+    """Draw the upper bound of every delay, recording the bounds."""
+
+    def __init__(self) -> None:
+        self.bounds: list[tuple[float, float]] = []
+
+    def uniform(self, low: float, high: float) -> float:
+        self.bounds.append((low, high))
+        return high
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    retry_module = importlib.import_module("twitch_clips.RetryPolicy")
+    monkeypatch.setattr(retry_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def rng(monkeypatch: pytest.MonkeyPatch) -> _Random:
+    rng = _Random()
+    retry_module = importlib.import_module("twitch_clips.RetryPolicy")
+    monkeypatch.setattr(retry_module, "random", rng)
+    return rng
+
+
+def _status_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://api.twitch.tv/helix/clips")
+    return httpx.HTTPStatusError(
+        "Request failed",
+        request=request,
+        response=httpx.Response(status_code, request=request),
+    )
+
+
+def _process_error(
+    returncode: int,
+    stderr: bytes | str | None = None,
+    output: bytes | str | None = None,
+) -> subprocess.CalledProcessError:
+    return subprocess.CalledProcessError(
+        returncode,
+        ["twitch-dl", "download"],
+        output=output,
+        stderr=stderr,
+    )
+
+
+@pytest.mark.parametrize(
+    ("error", "is_retryable"),
+    [
+        (_status_error(429), True),
+        (_status_error(503), True),
+        (_status_error(408), True),
+        (_status_error(404), False),
+        (_status_error(403), False),
+        (httpx.ConnectError("Connection refused"), True),
+        (TimeoutError(), True),
+        (ConnectionResetError(), True),
+        (_process_error(-9), True),
+        (_process_error(1), False),
+        (_process_error(1, stderr=b"Error: Clip not found"), False),
+        (_process_error(1, stderr=b"httpx.ConnectError: failed"), True),
+        (_process_error(1, stderr="Read TIMED OUT"), True),
+        (_process_error(1, output=b"503 Service Unavailable"), True),
+        (_process_error(1, stderr=b"\xff\xfe connection reset"), True),
+        (CircuitOpenError("Circuit for twitch api is open"), False),
+        (FileNotFoundError("twitch-dl"), False),
+        (ValueError("Invalid clip slug"), False),
+        (KeyError("id"), False),
+    ],
+)
+def test_errors_are_classified(
+    error: Exception,
+    is_retryable: bool,
+) -> None:
+    assert RetryPolicy.is_retryable_error(error) is is_retryable
+
+
+def test_breaker_opens_then_closes_after_a_trial(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+    clock.now += 10
+    # Half-open: a single trial call gets through
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_breaker(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    clock.now += 9
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_cancelled_trial_lets_another_call_try(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.cancel_trial()
+    assert breaker.is_open
+    assert breaker.allow()
+
+
+def test_backoff_delays_are_jittered_within_bounds(
+    clock: _Clock,
+    rng: _Random,
+) -> None:
+    policy = RetryPolicy(
+        max_attempts=6,
+        base_delay=1,
+        max_delay=5,
+        failure_threshold=10,
+    )
+    attempts = 0
+
+    def operation() -> None:
+        nonlocal attempts
+        attempts += 1
+        raise ConnectionResetError
+
+    with pytest.raises(ConnectionResetError):
+        policy.call("twitch api", operation)
+    assert attempts == 6
+    assert rng.bounds == [(0, 1), (0, 2), (0, 4), (0, 5), (0, 5)]
+    assert clock.sleeps == [1, 2, 4, 5, 5]
+
+
+def test_deadline_stops_retries(clock: _Clock, rng: _Random) -> None:
+    policy = RetryPolicy(
+        max_attempts=10,
+        base_delay=1,
+        max_delay=30,
+        failure_threshold=10,
+    )
+    attempts = 0
+
+    def operation() -> None:
+        nonlocal attempts
+        attempts += 1
+        raise TimeoutError
+
+    with pytest.raises(TimeoutError):
+        policy.call("twitch api", operation, deadline_seconds=8)
+    # Waiting 8s after the fourth attempt, at 7s, would pass the deadline
+    assert clock.sleeps == [1, 2, 4]
+    assert attempts == 4
+
+
+def test_retries_until_success(clock: _Clock, rng: _Random) -> None:
+    policy = RetryPolicy(max_attempts=3, base_delay=1)
+    results = iter([TimeoutError(), "clip"])
+
+    def operation() -> str:
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert policy.call("twitch api", operation) == "clip"
+    assert clock.sleeps == [1]
+    assert policy.get_breaker("twitch api").failures == 0
+
+
+def test_permanent_errors_are_not_retried_nor_open_breaker(
+    clock: _Clock,
+    rng: _Random,
+) -> None:
+    policy = RetryPolicy(failure_threshold=2)
+    attempts = 0
+
+    def operation() -> None:
+        nonlocal attempts
+        attempts += 1
+        raise _process_error(1, stderr=b"Error: Clip not found")
+
+    for _ in range(5):
+        with pytest.raises(subprocess.CalledProcessError):
+            policy.call("twitch-dl", operation)
+    assert attempts == 5
+    assert clock.sleeps == []
+    assert not policy.get_breaker("twitch-dl").is_open
+
+
+def test_open_breaker_fails_fast(clock: _Clock, rng: _Random) -> None:
+    policy = RetryPolicy(
+        max_attempts=5,
+        failure_threshold=2,
+        reset_timeout=60,
+    )
+    attempts = 0
+
+    def operation() -> None:
+        nonlocal attempts
+        attempts += 1
+        raise _status_error(503)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        policy.call("twitch api", operation)
+    # The retry stops once the second failure opens the circuit
+    assert attempts == 2
+    with pytest.raises(CircuitOpenError):
+        policy.call("twitch api", operation)
+    assert attempts == 2
+    # Other endpoints have their own breaker
+    with pytest.raises(httpx.HTTPStatusError):
+        policy.call("youtube upload", operation)
+    assert attempts == 4
+
+    clock.now += 60
+    assert policy.call("twitch api", lambda: "ok") == "ok"
+    assert not policy.get_breaker("twitch api").is_open
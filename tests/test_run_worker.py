@@ -0,0 +1,54 @@
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from conftest import StubUploader, make_clip_info
+
+from twitch_clips import JobStatusEnum, SQLiteWorkQueue, TwitchClipsToYoutube
+
+
+class _WorkerCrash(BaseException):
+    pass
+
+
+def test_reclaimed_job_is_not_uploaded_again(
+    make_pipeline: Callable[..., TwitchClipsToYoutube],
+    tmp_path: Path,
+) -> None:
+    queue = SQLiteWorkQueue(tmp_path / "queue.db")
+    clip_info = make_clip_info("clip")
+    queue.enqueue(clip_info.id, asdict(clip_info))
+    crashing_uploader = StubUploader()
+    crashing_pipeline = make_pipeline(uploader=crashing_uploader)
+
+    def upload_then_crash(
+        clip_info: object,
+        is_vertical: bool | None = None,
+        publish_at: datetime | None = None,
+        raise_timeouts: bool | None = None,
+        on_uploaded: Callable[[], None] | None = None,
+    ) -> bool:
+        crashing_uploader.uploaded_videos.append(clip_info)
+        on_uploaded()
+        msg = "Worker died before completing the job"
+        raise _WorkerCrash(msg)
+
+    crashing_pipeline._publish_clip = upload_then_crash
+    with pytest.raises(_WorkerCrash):
+        crashing_pipeline.run_worker(queue, visibility_timeout=0.01)
+    assert queue.counts()[JobStatusEnum.LEASED] == 1
+    time.sleep(0.05)
+
+    pipeline = make_pipeline()
+    published_clips = []
+    pipeline._publish_clip = lambda clip_info, **_: published_clips.append(
+        clip_info,
+    )
+    assert pipeline.run_worker(queue) == 0
+    assert published_clips == []
+    assert len(crashing_uploader.uploaded_videos) == 1
+    assert queue.counts()[JobStatusEnum.DONE] == 1
+    assert pipeline.folder_lock.is_published(clip_info.id)
@@ -0,0 +1,39 @@
+import time
+from pathlib import Path
+
+from twitch_clips import ProfilingSettings, StageProfiler
+
+
+def _busy_wait(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_samples_are_attributed_to_the_innermost_stage(
+    tmp_path: Path,
+) -> None:
+    profiler = StageProfiler(
+        ProfilingSettings(
+            output_folder_path=tmp_path,
+            sampling_interval=0.001,
+        ),
+    )
+    with profiler.stage("publish_clip"):
+        _busy_wait(0.1)
+        with profiler.stage("convert"):
+            _busy_wait(0.1)
+    profiler.close()
+
+    output_folder_path = profiler.output_folder_path
+    [convert_file] = output_folder_path.glob("*_publish_clip.convert.*")
+    assert "_busy_wait" in convert_file.read_text()
+    summary_lines = (
+        (output_folder_path / "stages.collapsed").read_text().splitlines()
+    )
+    assert all(line.startswith("publish_clip;") for line in summary_lines)
+    assert any(
+        line.startswith("publish_clip;convert;") for line in summary_lines
+    )
+    # Samples of finished stages aren't kept
+    assert profiler._stage_samples == {}
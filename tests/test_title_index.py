@@ -0,0 +1,141 @@
+import random
+import struct
+import zlib
+from pathlib import Path
+
+import pytest
+
+from twitch_clips import MinHashTitleIndex
+
+_WORDS = (
+    "epic clutch insane play funny moment stream fail win boss fight "
+    "rage quit chat reaction speedrun"
+).split()
+
+
+def _shingles(title: str, size: int = 3) -> set[str]:
+    normalized_title = MinHashTitleIndex.normalize(title)
+    if len(normalized_title) <= size:
+        return {normalized_title}
+    return {
+        normalized_title[position : position + size]
+        for position in range(len(normalized_title) - size + 1)
+    }
+
+
+def _jaccard(title: str, other_title: str) -> float:
+    shingles, other_shingles = _shingles(title), _shingles(other_title)
+    return len(shingles & other_shingles) / len(shingles | other_shingles)
+
+
+def _title_pairs(count: int) -> list[tuple[str, str]]:
+    """Get titles paired with copies having a few typos."""
+    rng = random.Random(0)
+    pairs = []
+    for index in range(count):
+        title = " ".join(rng.choice(_WORDS) for _ in range(6)) + f" {index}"
+        characters = list(title)
+        for _ in range(rng.randint(0, 8)):
+            characters[rng.randrange(len(characters))] = rng.choice(
+                "abcdefghijklmnopqrstuvwxyz",
+            )
+        pairs.append((title, "".join(characters)))
+    return pairs
+
+
+def test_banding_recall_and_precision_around_threshold() -> None:
+    index = MinHashTitleIndex()
+    found_by_similarity: dict[bool, list[bool]] = {True: [], False: []}
+    for title, other_title in _title_pairs(400):
+        pair_index = index.empty_copy()
+        pair_index.add(title)
+        similarity = _jaccard(title, other_title)
+        found = pair_index.find_similar(other_title) is not None
+        # Candidates are confirmed with the exact similarity
+        assert found <= (similarity >= index.threshold)
+        if similarity >= index.threshold + 0.1:
+            found_by_similarity[True].append(found)
+        elif similarity < index.threshold:
+            found_by_similarity[False].append(found)
+    recall = sum(found_by_similarity[True]) / len(found_by_similarity[True])
+    assert len(found_by_similarity[True]) > 50
+    assert recall >= 0.9
+    assert len(found_by_similarity[False]) > 100
+    assert not any(found_by_similarity[False])
+
+
+def test_exact_normalized_title_is_found() -> None:
+    index = MinHashTitleIndex()
+    index.add("Insane CLUTCH!!")
+    assert index.find_similar("insane_clutch") == "insane clutch"
+    assert index.find_similar("!!!") is None
+    index.add("")
+    assert len(index) == 1
+
+
+@pytest.mark.parametrize("threshold", [0, 1.5])
+def test_threshold_must_be_a_similarity(threshold: float) -> None:
+    with pytest.raises(ValueError, match="threshold"):
+        MinHashTitleIndex(threshold=threshold)
+
+
+@pytest.mark.parametrize("title", ["a", "boss fight", "ÉPIC 🎉 moment"])
+def test_band_keys_match_pure_int_reference(title: str) -> None:
+    index = MinHashTitleIndex()
+    shingles = _shingles(title)
+    shingle_hashes = [
+        zlib.crc32(shingle.encode("utf-8")) % index._PRIME
+        for shingle in shingles
+    ]
+    signature = [
+        min(
+            (int(multiplier) * shingle_hash + int(increment))
+            % index._PRIME
+            for shingle_hash in shingle_hashes
+        )
+        for multiplier, increment in zip(
+            index._multipliers[:, 0],
+            index._increments[:, 0],
+        )
+    ]
+    expected = [
+        zlib.crc32(
+            struct.pack(
+                f"={index.rows}Q",
+                *signature[band * index.rows : (band + 1) * index.rows],
+            ),
+        )
+        for band in range(index.bands)
+    ]
+    assert index._band_keys(shingles) == expected
+
+
+def test_index_is_appended_and_reloaded(tmp_path: Path) -> None:
+    index_path = tmp_path / "titles.jsonl"
+    index = MinHashTitleIndex(index_path)
+    index.sync(["Boss fight rage quit", "Funny chat reaction"])
+    index.sync(["boss fight, rage quit!"])
+    written_lines = index_path.read_text().splitlines()
+    assert len(written_lines) == 2
+
+    with Path.open(index_path, "a", encoding="utf-8") as file:
+        file.write('{"title": "speedrun w\n')
+    reloaded_index = MinHashTitleIndex(index_path)
+    assert len(reloaded_index) == 2
+    assert reloaded_index._buckets == index._buckets
+    assert (
+        reloaded_index.find_similar("Boss fight rage quits")
+        == "boss fight rage quit"
+    )
+    reloaded_index.add("Speedrun world record")
+    lines = index_path.read_text().splitlines()
+    assert lines[: len(written_lines)] == written_lines
+    assert len(lines) == len(written_lines) + 2
+    # Entries with another banding get their band keys recomputed
+    other_index = MinHashTitleIndex(index_path, num_permutations=32)
+    assert other_index.bands != index.bands
+    assert len(other_index) == 3
+    assert (
+        other_index.find_similar("Speedrun world records")
+        == "speedrun world record"
+    )
@@ -0,0 +1,128 @@
+import random
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from twitch_clips import VideoFingerprintIndex
+from twitch_clips.VideoFingerprintIndex import (
+    MultiIndexHashTable,
+    VideoFingerprinter,
+)
+
+
+def _flip_bits(hash_: int, bits: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), bits):
+        hash_ ^= 1 << bit
+    return hash_
+
+
+@pytest.mark.parametrize("radius", [0, 3, 7, 10, 12])
+def test_search_matches_brute_force(radius: int) -> None:
+    rng = random.Random(radius)
+    table = MultiIndexHashTable()
+    hashes = [rng.getrandbits(64) for _ in range(300)]
+    for index, hash_ in enumerate(hashes):
+        table.add(hash_, f"clip{index}")
+    queries = [rng.getrandbits(64) for _ in range(20)]
+    # Queries around the radius boundary of stored hashes
+    for flipped_bits in (radius - 1, radius, radius + 1):
+        queries.extend(
+            _flip_bits(rng.choice(hashes), flipped_bits, rng)
+            for _ in range(20)
+            if flipped_bits >= 0
+        )
+    for query in queries:
+        expected = sorted(
+            ((hash_ ^ query).bit_count(), f"clip{index}")
+            for index, hash_ in enumerate(hashes)
+            if (hash_ ^ query).bit_count() <= radius
+        )
+        assert sorted(table.search(query, radius)) == expected
+
+
+def test_search_radius_is_inclusive() -> None:
+    table = MultiIndexHashTable()
+    table.add(0, "clip")
+    assert table.search((1 << 10) - 1, radius=10) == [(10, "clip")]
+    assert table.search((1 << 11) - 1, radius=10) == []
+
+
+def _stream(seed: int) -> Callable[[float], np.ndarray]:
+    """Get frames of a stream fading between random scenes."""
+    rng = np.random.default_rng(seed)
+    scenes = [
+        np.kron(
+            rng.integers(0, 256, size=(8, 8, 3)),
+            np.ones((16, 16, 1)),
+        )
+        for _ in range(20)
+    ]
+
+    def get_frame(time: float) -> np.ndarray:
+        scene, progress = divmod(time / 2, 1)
+        return (
+            scenes[int(scene)] * (1 - progress)
+            + scenes[int(scene) + 1] * progress
+        ).astype(np.uint8)
+
+    return get_frame
+
+
+def _clip_hashes(
+    stream: Callable[[float], np.ndarray],
+    start: float,
+) -> list[int]:
+    return VideoFingerprinter.frame_hashes(
+        sample_frame=lambda time: stream(start + time),
+        duration=20,
+    )
+
+
+def test_clips_cut_at_other_offsets_match(tmp_path: Path) -> None:
+    index = VideoFingerprintIndex(tmp_path / "fingerprints.txt")
+    stream = _stream(seed=0)
+    index.add("clip", _clip_hashes(stream, start=4))
+    for start in (4.1, 4.25, 4.4, 5):
+        assert index.find_duplicate(_clip_hashes(stream, start)) == "clip"
+    other_stream = _stream(seed=1)
+    assert index.find_duplicate(_clip_hashes(other_stream, start=4)) is None
+
+
+def test_static_clips_are_not_indexed(tmp_path: Path) -> None:
+    index = VideoFingerprintIndex(tmp_path / "fingerprints.txt")
+    scene = _stream(seed=0)(0)
+    frame_hashes = VideoFingerprinter.frame_hashes(
+        sample_frame=lambda time: scene,
+        duration=20,
+    )
+    assert len(frame_hashes) == 1
+    index.add("static", frame_hashes)
+    assert len(index.hash_table) == 0
+    assert index.find_duplicate(frame_hashes) is None
+    black_frame = np.zeros((64, 64, 3), dtype=np.uint8)
+    assert VideoFingerprinter.frame_hash(black_frame) is None
+
+
+def test_index_is_appended_and_reloaded(tmp_path: Path) -> None:
+    index_path = tmp_path / "fingerprints.txt"
+    index = VideoFingerprintIndex(index_path)
+    clip_hashes = _clip_hashes(_stream(seed=0), start=0)
+    other_hashes = _clip_hashes(_stream(seed=1), start=0)
+    index.add("clip", clip_hashes)
+    written_lines = index_path.read_text().splitlines()
+    assert len(written_lines) == len(clip_hashes)
+
+    with Path.open(index_path, "a", encoding="utf-8") as file:
+        file.write("truncated\n")
+    reloaded_index = VideoFingerprintIndex(index_path)
+    assert len(reloaded_index.hash_table) == len(clip_hashes)
+    assert reloaded_index.find_duplicate(clip_hashes) == "clip"
+    reloaded_index.add("other", other_hashes)
+    lines = index_path.read_text().splitlines()
+    # Adding a clip only appends its lines
+    assert lines[: len(written_lines)] == written_lines
+    assert len(lines) == len(written_lines) + 1 + len(other_hashes)
+    final_index = VideoFingerprintIndex(index_path)
+    assert final_index.find_duplicate(other_hashes) == "other"
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from twitch_clips import JobStatusEnum, SQLiteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path: Path) -> SQLiteWorkQueue:
+    return SQLiteWorkQueue(tmp_path / "queue.db", max_attempts=2)
+
+
+def test_enqueue_ignores_known_ids(queue: SQLiteWorkQueue) -> None:
+    assert queue.enqueue("clip", {"id": "clip"})
+    assert not queue.enqueue("clip", {"id": "other"})
+    job = queue.lease("worker", visibility_timeout=60)
+    assert job is not None
+    assert job.payload == {"id": "clip"}
+
+
+def test_lease_hides_job_until_completed(queue: SQLiteWorkQueue) -> None:
+    queue.enqueue("clip", {})
+    job = queue.lease("worker", visibility_timeout=60)
+    assert job is not None
+    assert job.attempts == 1
+    assert queue.lease("other worker", visibility_timeout=60) is None
+    assert queue.complete(job)
+    assert not queue.complete(job)
+    assert queue.counts()[JobStatusEnum.DONE] == 1
+
+
+def test_expired_lease_can_not_complete(queue: SQLiteWorkQueue) -> None:
+    queue.enqueue("clip", {})
+    expired_job = queue.lease("worker", visibility_timeout=0)
+    job = queue.lease("other worker", visibility_timeout=60)
+    assert expired_job is not None
+    assert job is not None
+    assert job.lease_token != expired_job.lease_token
+    assert not queue.extend_lease(expired_job, visibility_timeout=60)
+    assert not queue.complete(expired_job)
+    assert queue.counts()[JobStatusEnum.LEASED] == 1
+    assert queue.complete(job)
+
+
+def test_fail_delays_retry(queue: SQLiteWorkQueue) -> None:
+    queue.enqueue("clip", {})
+    job = queue.lease("worker", visibility_timeout=60)
+    queue.fail(job, "timed out", retry_delay=60)
+    assert queue.counts()[JobStatusEnum.PENDING] == 1
+    assert queue.lease("worker", visibility_timeout=60) is None
+
+
+def test_fail_gives_up_after_max_attempts(queue: SQLiteWorkQueue) -> None:
+    queue.enqueue("clip", {})
+    first_job = queue.lease("worker", visibility_timeout=60)
+    queue.fail(first_job, "timed out")
+    job = queue.lease("worker", visibility_timeout=60)
+    assert job.attempts == 2
+    queue.fail(first_job, "stale lease")
+    assert queue.counts()[JobStatusEnum.LEASED] == 1
+    queue.fail(job, "timed out")
+    assert queue.counts()[JobStatusEnum.FAILED] == 1
+    assert queue.lease("worker", visibility_timeout=60) is None
+
+
+def test_expired_last_attempt_fails_job(queue: SQLiteWorkQueue) -> None:
+    queue.enqueue("clip", {})
+    queue.lease("worker", visibility_timeout=0)
+    queue.lease("worker", visibility_timeout=0)
+    assert queue.lease("worker", visibility_timeout=60) is None
+    assert queue.counts()[JobStatusEnum.FAILED] == 1
+
+
+def test_publish_slots_are_claimed_once(tmp_path: Path) -> None:
+    database_path = tmp_path / "queue.db"
+    queues = [SQLiteWorkQueue(database_path) for _ in range(2)]
+    start = datetime(2024, 6, 1, 14, tzinfo=timezone.utc)
+    slots = [start + timedelta(days=day) for day in range(3)]
+    claimed = [queue.claim_publish_slot(slots) for queue in queues * 2]
+    assert claimed == [*slots, None]
+    queues[1].release_publish_slot(slots[1])
+    assert queues[0].claim_publish_slot(slots) == slots[1]
+
+
+def test_upload_mark_outlives_the_lease(queue: SQLiteWorkQueue) -> None:
+    queue.enqueue("clip", {})
+    expired_job = queue.lease("worker", visibility_timeout=0)
+    assert not expired_job.is_uploaded
+    assert queue.mark_uploaded(expired_job)
+    job = queue.lease("other worker", visibility_timeout=60)
+    assert job.is_uploaded
+    assert not queue.mark_uploaded(expired_job)
@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from youtube_up import YTUploaderSession
+
+from twitch_clips import (
+    RetryPolicy,
+    VideoInfo,
+    YoutubeUploaderViaApi,
+    YoutubeUploaderViaCookies,
+)
+
+
+@pytest.fixture
+def video_path(tmp_path: Path) -> Path:
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"\0" * 1024)
+    return video_path
+
+
+class _ResumableRequest:
+    """Resumable upload whose chunk responses fail as scripted."""
+
+    def __init__(self, video_path: Path, errors: list[Exception]) -> None:
+        self.resumable = self
+        self.video_path = video_path
+        self.errors = errors
+        self.chunk_calls = 0
+
+    def filename(self) -> str:
+        return str(self.video_path)
+
+    def next_chunk(self) -> tuple[None, dict]:
+        self.chunk_calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return None, {"id": "video-id", "snippet": {"title": "Clip"}}
+
+
+class _Youtube:
+    def __init__(self, request: _ResumableRequest) -> None:
+        self.request = request
+        self.inserts = 0
+
+    def videos(self) -> "_Youtube":
+        return self
+
+    def insert(self, **_: object) -> _ResumableRequest:
+        self.inserts += 1
+        return self.request
+
+
+def test_api_upload_resumes_the_session_after_a_lost_response(
+    video_path: Path,
+) -> None:
+    uploader = YoutubeUploaderViaApi(
+        client_secret="client_secret.json",
+        retry_policy=RetryPolicy(base_delay=0),
+    )
+    request = _ResumableRequest(video_path, errors=[TimeoutError()])
+    youtube = _Youtube(request)
+    uploader._insert_video(
+        youtube=youtube,
+        video_info=VideoInfo(video_path=video_path, title="Clip"),
+    )
+    # The failed chunk is sent again in the same upload session
+    assert youtube.inserts == 1
+    assert request.chunk_calls == 2
+
+
+class _Session:
+    """Upload session failing once the given progress was reported."""
+
+    _progress_steps = YTUploaderSession._progress_steps
+
+    def __init__(self, fail_at_percents: list[float]) -> None:
+        self.fail_at_percents = fail_at_percents
+        self.uploads = 0
+
+    def upload(
+        self,
+        file_path: str,
+        metadata: object,
+        progress_callback: Callable[[str, float], None],
+    ) -> str:
+        self.uploads += 1
+        for step in ("get_upload_url", "upload_video", "create_video"):
+            percent = self._progress_steps[step]
+            if self.fail_at_percents and (
+                percent >= self.fail_at_percents[0]
+            ):
+                self.fail_at_percents.pop(0)
+                msg = "Connection reset by peer"
+                raise ConnectionError(msg)
+            progress_callback(step, percent)
+        return "video-id"
+
+
+def _make_cookies_uploader(
+    monkeypatch: pytest.MonkeyPatch,
+    session: _Session,
+) -> YoutubeUploaderViaCookies:
+    monkeypatch.setattr(
+        YTUploaderSession,
+        "from_cookies_txt",
+        lambda cookies_txt_path: session,
+    )
+    return YoutubeUploaderViaCookies(
+        cookies_path=Path("cookies.txt"),
+        retry_policy=RetryPolicy(base_delay=0),
+    )
+
+
+def test_cookies_upload_retries_failures_before_the_file_is_sent(
+    monkeypatch: pytest.MonkeyPatch,
+    video_path: Path,
+) -> None:
+    session = _Session(fail_at_percents=[20])
+    uploader = _make_cookies_uploader(monkeypatch, session)
+    uploader.upload(VideoInfo(video_path=video_path, title="Clip"))
+    assert session.uploads == 2
+
+
+def test_cookies_upload_is_not_retried_once_the_video_may_exist(
+    monkeypatch: pytest.MonkeyPatch,
+    video_path: Path,
+) -> None:
+    session = _Session(fail_at_percents=[90])
+    uploader = _make_cookies_uploader(monkeypatch, session)
+    with pytest.raises(RuntimeError, match="Failed to upload video"):
+        uploader.upload(VideoInfo(video_path=video_path, title="Clip"))
+    assert session.uploads == 1
@@ -0,0 +1,298 @@
+import math
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from types import TracebackType
+
+import httpx
+
+from .Logger import BaseLogger, Logger
+
+
+@dataclass
+class ConcurrencySettings:
+    """Bounds and tuning of an adaptive concurrency limit.
+
+    `max_cpu_load` is the 1 minute load average per CPU above which
+    the limit backs off, `None` ignores the CPU.
+    """
+
+    max_limit: int | None = None
+    min_limit: int | None = None
+    initial_limit: int | None = None
+    window_seconds: float | None = None
+    decrease_factor: float | None = None
+    max_error_rate: float | None = None
+    max_cpu_load: float | None = None
+
+
+@dataclass
+class ConcurrencyMetrics:
+    limit: int
+    peak_limit: int
+    in_flight: int
+    completed: int
+    errors: int
+    overloads: int
+    tasks_per_second: float
+    error_rate: float
+    increases: int
+    decreases: int
+
+
+class AdaptiveConcurrencyLimiter:
+    """Semaphore whose size follows AIMD (additive increase,
+    multiplicative decrease).
+
+    Tasks hold a slot with `with limiter:`, which records whether they
+    failed. At the end of every window the limit grows by one if the
+    slots were all used, errors stayed under `max_error_rate` and
+    throughput (finished tasks per second) didn't drop. An increase
+    that made throughput drop is taken back. Throttling, timeouts and
+    CPU saturation multiply the limit by `decrease_factor`, at most
+    once per window, as tasks started under the old limit fail too.
+    """
+
+    _THROUGHPUT_TOLERANCE = 0.1
+    _OVERLOAD_STATUS_CODES = (429, 503)
+    _OVERLOAD_MARKERS = (
+        "too many requests",
+        "rate limit",
+        "service unavailable",
+        "timed out",
+    )
+
+    def __init__(
+        self,
+        settings: ConcurrencySettings | None = None,
+        name: str | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.settings = settings or ConcurrencySettings()
+        self.name = name or "tasks"
+        self.logger = (logger if logger else Logger()).get_child(
+            "concurrency",
+        )
+        self.max_limit = max(self.settings.max_limit or 4, 1)
+        self.min_limit = min(
+            max(self.settings.min_limit or 1, 1),
+            self.max_limit,
+        )
+        self.window_seconds = self.settings.window_seconds or 10
+        self.decrease_factor = self.settings.decrease_factor or 0.5
+        self.max_error_rate = (
+            self.settings.max_error_rate
+            if self.settings.max_error_rate is not None
+            else 0.1
+        )
+        self._limit = float(
+            min(
+                max(
+                    self.settings.initial_limit or self.min_limit,
+                    self.min_limit,
+                ),
+                self.max_limit,
+            ),
+        )
+        self._peak_limit = int(self._limit)
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._completed = 0
+        self._errors = 0
+        self._overloads = 0
+        self._increases = 0
+        self._decreases = 0
+        self._tasks_per_second = 0.0
+        self._error_rate = 0.0
+        self._previous_tasks_per_second: float | None = None
+        self._has_increased = False
+        self._decreased_at = -math.inf
+        self._reset_window(time.monotonic())
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _reset_window(self, now: float) -> None:
+        self._window_started_at = now
+        self._window_completed = 0
+        self._window_errors = 0
+        self._window_peak = self._in_flight
+
+    def acquire(
+        self,
+        blocking: bool = True,
+        timeout: float | None = None,
+    ) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight >= self.limit:
+                if not blocking:
+                    return False
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._in_flight += 1
+            self._window_peak = max(self._window_peak, self._in_flight)
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def __enter__(self) -> "AdaptiveConcurrencyLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            self.record(exc)
+        finally:
+            self.release()
+
+    @classmethod
+    def is_overload_error(cls, error: BaseException) -> bool:
+        """Check an error means the resource is overloaded.
+
+        Only timeouts, HTTP statuses and the error output of failed
+        processes are checked, never messages, which hold commands,
+        paths and clip ids.
+        """
+        if isinstance(
+            error,
+            TimeoutError | subprocess.TimeoutExpired | httpx.TimeoutException,
+        ):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            return (
+                error.response.status_code in cls._OVERLOAD_STATUS_CODES
+            )
+        if isinstance(error, subprocess.CalledProcessError):
+            return any(
+                cls._has_overload_marker(output)
+                for output in (error.stderr, error.output)
+            )
+        return False
+
+    @classmethod
+    def _has_overload_marker(cls, output: bytes | str | None) -> bool:
+        if not output:
+            return False
+        if isinstance(output, bytes):
+            output = output.decode(errors="replace")
+        output = output.lower()
+        return any(marker in output for marker in cls._OVERLOAD_MARKERS)
+
+    def _is_cpu_saturated(self) -> bool:
+        if self.settings.max_cpu_load is None:
+            return False
+        try:
+            load = os.getloadavg()[0]
+        except OSError:
+            return False
+        return load / (os.cpu_count() or 1) >= self.settings.max_cpu_load
+
+    def record(self, error: BaseException | None = None) -> None:
+        """Record a finished task, adjusting the limit.
+
+        Cancelled and interrupted tasks are ignored.
+        """
+        if error is not None and not isinstance(error, Exception):
+            return
+        with self._condition:
+            previous_limit = self.limit
+            self._completed += 1
+            self._window_completed += 1
+            if error is not None:
+                self._errors += 1
+                self._window_errors += 1
+            if error is not None and self.is_overload_error(error):
+                self._overloads += 1
+                reason = self._decrease(f"overloaded: {error}")
+            else:
+                reason = self._evaluate_window()
+            limit = self.limit
+        if reason is not None and limit != previous_limit:
+            self.logger.log(
+                f"Concurrency of {self.name}: {previous_limit} -> {limit} "
+                f"({reason})",
+            )
+
+    def _decrease(self, reason: str) -> str | None:
+        now = time.monotonic()
+        if now - self._decreased_at < self.window_seconds:
+            return None
+        self._limit = max(self._limit * self.decrease_factor, self.min_limit)
+        self._decreases += 1
+        self._decreased_at = now
+        self._has_increased = False
+        self._previous_tasks_per_second = None
+        self._reset_window(now)
+        return reason
+
+    def _evaluate_window(self) -> str | None:
+        now = time.monotonic()
+        elapsed_seconds = now - self._window_started_at
+        if elapsed_seconds < self.window_seconds:
+            return None
+        tasks_per_second = self._window_completed / elapsed_seconds
+        self._tasks_per_second = tasks_per_second
+        self._error_rate = self._window_errors / self._window_completed
+        previous_tasks_per_second = self._previous_tasks_per_second
+        self._previous_tasks_per_second = tasks_per_second
+        is_saturated = self._window_peak >= self.limit
+        self._reset_window(now)
+        if self._is_cpu_saturated():
+            return self._decrease("CPU saturated")
+        if self._error_rate > self.max_error_rate:
+            self._has_increased = False
+            return None
+        if (
+            is_saturated
+            and self._has_increased
+            and previous_tasks_per_second is not None
+            and tasks_per_second
+            < previous_tasks_per_second * (1 - self._THROUGHPUT_TOLERANCE)
+        ):
+            self._limit = max(self._limit - 1, self.min_limit)
+            self._decreases += 1
+            self._has_increased = False
+            return (
+                f"throughput dropped to {tasks_per_second:.2f} tasks/s "
+                f"from {previous_tasks_per_second:.2f}"
+            )
+        if not is_saturated or self._limit >= self.max_limit:
+            self._has_increased = False
+            return None
+        self._limit = min(self._limit + 1, self.max_limit)
+        self._peak_limit = max(self._peak_limit, self.limit)
+        self._increases += 1
+        self._has_increased = True
+        self._condition.notify_all()
+        return f"throughput: {tasks_per_second:.2f} tasks/s"
+
+    def metrics(self) -> ConcurrencyMetrics:
+        with self._condition:
+            return ConcurrencyMetrics(
+                limit=self.limit,
+                peak_limit=self._peak_limit,
+                in_flight=self._in_flight,
+                completed=self._completed,
+                errors=self._errors,
+                overloads=self._overloads,
+                tasks_per_second=round(self._tasks_per_second, 3),
+                error_rate=round(self._error_rate, 3),
+                increases=self._increases,
+                decreases=self._decreases,
+            )
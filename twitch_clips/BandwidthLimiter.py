@@ -0,0 +1,184 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import time as day_time
+from typing import Iterable, Iterator
+
+import pytz
+
+from .Logger import BaseLogger, Logger
+
+
+@dataclass
+class RateWindow:
+    """Rate limit for a daily window, e.g. peak hours.
+
+    Windows ending before they start wrap past midnight. `None` rate
+    means unlimited.
+    """
+
+    start: day_time
+    end: day_time
+    bytes_per_second: int | None
+
+
+@dataclass
+class BandwidthSettings:
+    bytes_per_second: int | None = None
+    windows: list[RateWindow] | None = None
+    timezone: str | None = None
+    burst_seconds: float | None = None
+
+
+@dataclass
+class TransferMetrics:
+    transferred_bytes: int
+    active_seconds: float
+    bytes_per_second: float
+    throttled_seconds: float
+    rate_limit: int | None
+
+
+class BandwidthLimiter:
+    """Token bucket shared by transfers of one direction.
+
+    Transfers take tokens for every chunk before sending or after
+    receiving it. The bucket holds up to `burst_seconds` of tokens and
+    may go into debt, so a transfer sleeps for its own chunk plus the
+    chunks queued before it. The rate follows `windows`, falling back
+    to `bytes_per_second`, and can be changed with `set_rate`.
+    """
+
+    def __init__(
+        self,
+        settings: BandwidthSettings | None = None,
+        name: str | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.settings = settings or BandwidthSettings()
+        self.name = name or "transfers"
+        self.logger = (logger if logger else Logger()).get_child(
+            "bandwidth",
+        )
+        self.timezone = pytz.timezone(
+            self.settings.timezone or "America/Los_Angeles",
+        )
+        self.burst_seconds = self.settings.burst_seconds or 1
+        self._lock = threading.Lock()
+        self._override_rate: int | None = None
+        self._has_override = False
+        self.rate: int | None = self._scheduled_rate()
+        self._tokens = float(self._capacity())
+        self._refilled_at = time.monotonic()
+        self._transferred_bytes = 0
+        self._throttled_seconds = 0.0
+        self._active_transfers = 0
+        self._active_since = 0.0
+        self._active_seconds = 0.0
+
+    def _capacity(self) -> float:
+        return 0 if self.rate is None else self.rate * self.burst_seconds
+
+    def _scheduled_rate(self, now: datetime | None = None) -> int | None:
+        if now is None:
+            now = datetime.now(self.timezone)
+        current_time = now.astimezone(self.timezone).time()
+        for window in self.settings.windows or []:
+            if window.start <= window.end:
+                in_window = window.start <= current_time < window.end
+            else:
+                in_window = (
+                    current_time >= window.start or current_time < window.end
+                )
+            if in_window:
+                return window.bytes_per_second
+        return self.settings.bytes_per_second
+
+    def set_rate(self, bytes_per_second: int | None) -> None:
+        """Override the scheduled rate, `None` restores the schedule."""
+        with self._lock:
+            self._has_override = bytes_per_second is not None
+            self._override_rate = bytes_per_second
+        self._update_rate()
+
+    def _update_rate(self) -> None:
+        rate = (
+            self._override_rate
+            if self._has_override
+            else self._scheduled_rate()
+        )
+        with self._lock:
+            if rate == self.rate:
+                return
+            self._refill()
+            self.rate = rate
+            self._tokens = min(self._tokens, self._capacity())
+        self.logger.log(
+            f"Bandwidth limit for {self.name}: "
+            f"{'unlimited' if rate is None else f'{rate} B/s'}",
+        )
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate is not None:
+            self._tokens = min(
+                self._capacity(),
+                self._tokens + (now - self._refilled_at) * self.rate,
+            )
+        self._refilled_at = now
+
+    def consume(self, amount: int) -> None:
+        """Take tokens for `amount` bytes, sleeping while in debt."""
+        self._update_rate()
+        with self._lock:
+            self._transferred_bytes += amount
+            if self.rate is None:
+                return
+            self._refill()
+            self._tokens -= amount
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+            self._throttled_seconds += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttle(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.consume(len(chunk))
+            yield chunk
+
+    @contextmanager
+    def transfer(self) -> Iterator[None]:
+        """Count the wrapped block as active transfer time."""
+        with self._lock:
+            if self._active_transfers == 0:
+                self._active_since = time.monotonic()
+            self._active_transfers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_transfers -= 1
+                if self._active_transfers == 0:
+                    self._active_seconds += (
+                        time.monotonic() - self._active_since
+                    )
+
+    def metrics(self) -> TransferMetrics:
+        with self._lock:
+            active_seconds = self._active_seconds
+            if self._active_transfers:
+                active_seconds += time.monotonic() - self._active_since
+            return TransferMetrics(
+                transferred_bytes=self._transferred_bytes,
+                active_seconds=round(active_seconds, 3),
+                bytes_per_second=round(
+                    self._transferred_bytes / active_seconds
+                    if active_seconds > 0
+                    else 0,
+                    1,
+                ),
+                throttled_seconds=round(self._throttled_seconds, 3),
+                rate_limit=self.rate,
+            )
@@ -1,9 +1,15 @@
+import asyncio
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta
 from enum import Enum
 from pathlib import Path
 from typing import List
 
+import pytz
+
+from .ChannelUploadsIndex import ChannelUploadsIndex
+
 
 class BasePrivacyEnum(str, Enum):
     PRIVATE = "private"
@@ -34,6 +40,44 @@ class VideoInfo:
     privacy: BasePrivacyEnum | None = None
     language: BaseLanguageEnum | None = None
     license_: BaseLicenseEnum | None = None
+    publish_at: datetime | None = None
+
+
+@dataclass
+class PublishSchedule:
+    """Daily publish slots for staggering scheduled videos.
+
+    Slots are taken in order starting from `start_date` (today by
+    default), skipping those less than `min_lead_time` away.
+    """
+
+    slot_times: List[time] | None = None
+    timezone: str | None = None
+    start_date: date | None = None
+    min_lead_time: timedelta | None = None
+
+    def get_slots(
+        self,
+        count: int,
+        now: datetime | None = None,
+    ) -> List[datetime]:
+        timezone = pytz.timezone(self.timezone or "America/Los_Angeles")
+        slot_times = sorted(self.slot_times or [time(hour=14)])
+        now = now.astimezone(timezone) if now else datetime.now(timezone)
+        earliest_slot = now + (
+            self.min_lead_time
+            if self.min_lead_time is not None
+            else timedelta(hours=1)
+        )
+        day = self.start_date or now.date()
+        slots: List[datetime] = []
+        while len(slots) < count:
+            for slot_time in slot_times:
+                slot = timezone.localize(datetime.combine(day, slot_time))
+                if slot >= earliest_slot and len(slots) < count:
+                    slots.append(slot)
+            day += timedelta(days=1)
+        return slots
 
 
 class BaseUploader(ABC):
@@ -44,6 +88,52 @@ class BaseUploader(ABC):
     ) -> None:
         """Upload video to YouTube."""
 
+    async def aupload(
+        self,
+        video_info: VideoInfo,
+    ) -> None:
+        """Upload video to YouTube without blocking the event loop.
+
+        Runs `upload` in a worker thread. Cancelling the awaiting task
+        doesn't stop an upload that has already started.
+        """
+        await asyncio.to_thread(self.upload, video_info)
+
+    def upload_batch(
+        self,
+        videos_info: List[VideoInfo],
+        schedule: PublishSchedule,
+    ) -> List[datetime]:
+        """Upload videos now as private, publishing them at schedule slots.
+
+        :returns: publish datetimes of the uploaded videos
+        :rtype: List[datetime]
+        """
+        slots = schedule.get_slots(count=len(videos_info))
+        for video_info, slot in zip(videos_info, slots):
+            self.upload(
+                replace(
+                    video_info,
+                    privacy=BasePrivacyEnum.PRIVATE,
+                    publish_at=slot,
+                ),
+            )
+        return slots
+
+    def sync_uploads_index(
+        self,
+        index: ChannelUploadsIndex,  # noqa: ARG002
+    ) -> int:
+        """Add channel uploads missing from the index.
+
+        Uploaders that can't list the channel uploads keep the index
+        as is.
+
+        :returns: number of added uploads
+        :rtype: int
+        """
+        return 0
+
     @abstractmethod
     def close_session(self) -> None:
         """Close session with YouTube."""
@@ -0,0 +1,231 @@
+import json
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .Logger import BaseLogger, Logger
+
+
+@dataclass
+class ChannelStats:
+    polls: int = 0
+    last_polled_at: float | None = None
+    last_clips_limit: int | None = None
+    last_new_clips: int = 0
+    new_clips_per_poll: float | None = None
+    candidates_per_poll: float | None = None
+    uploads_per_poll: float | None = None
+    uploads_since_poll: int = 0
+    total_new_clips: int = 0
+    total_candidates: int = 0
+    total_uploads: int = 0
+    recent_clip_ids: list[str] = field(default_factory=list)
+
+
+class ChannelPollScheduler:
+    """Schedule channel discovery from its historical clip yield.
+
+    Every poll records the clips not seen by earlier polls, the clips
+    that survived filtering and the clips uploaded from the channel,
+    each as a moving average per poll. Channels are polled again after
+    `min_interval_seconds` divided by their yield relative to
+    `target_yield`, so quiet channels are polled rarely, and listed up
+    to twice their usual number of new clips.
+    """
+
+    # Yield of a poll, e.g. an upload counts as much as two candidates
+    _UPLOAD_WEIGHT = 1.0
+    _CANDIDATE_WEIGHT = 0.5
+    _NEW_CLIP_WEIGHT = 0.1
+    _SMOOTHING = 0.3
+    _RECENT_CLIP_IDS = 500
+
+    def __init__(
+        self,
+        stats_path: Path | None = None,
+        min_interval_seconds: float | None = None,
+        max_interval_seconds: float | None = None,
+        target_yield: float | None = None,
+        min_clips_limit: int | None = None,
+        max_clips_limit: int | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.stats_path = stats_path
+        self.min_interval_seconds = min_interval_seconds or 3600
+        self.max_interval_seconds = max_interval_seconds or 7 * 24 * 3600
+        self.target_yield = target_yield or 1
+        self.min_clips_limit = min_clips_limit or 5
+        self.max_clips_limit = max_clips_limit or 100
+        self.logger = (logger if logger else Logger()).get_child(
+            "scheduler",
+        )
+        self.channels: dict[str, ChannelStats] = {}
+        self._polled_channels: set[str] = set()
+        self._load()
+
+    @staticmethod
+    def channel_name(channel: str) -> str:
+        """Normalize a channel URL or login."""
+        return channel.rstrip("/").split("/")[-1].lower()
+
+    def _load(self) -> None:
+        if self.stats_path is None or not self.stats_path.exists():
+            return
+        with Path.open(self.stats_path, encoding="utf-8") as file:
+            data = json.load(file)
+        for channel, stats in data.get("channels", {}).items():
+            self.channels[channel] = ChannelStats(**stats)
+        self.logger.log(
+            f"Loaded polling stats of {len(self.channels)} channels",
+        )
+
+    def save(self) -> None:
+        if self.stats_path is None:
+            return
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.stats_path.with_suffix(".tmp")
+        with Path.open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "channels": {
+                        channel: asdict(stats)
+                        for channel, stats in self.channels.items()
+                    },
+                },
+                file,
+                ensure_ascii=False,
+            )
+        temporary_path.replace(self.stats_path)
+
+    def _smooth(self, average: float | None, value: float) -> float:
+        if average is None:
+            return value
+        return average + self._SMOOTHING * (value - average)
+
+    def get_yield(self, channel: str) -> float | None:
+        """Weighted clips per poll, `None` for channels never polled."""
+        stats = self.channels.get(self.channel_name(channel))
+        if stats is None or not stats.polls:
+            return None
+        return (
+            self._UPLOAD_WEIGHT * (stats.uploads_per_poll or 0)
+            + self._CANDIDATE_WEIGHT * (stats.candidates_per_poll or 0)
+            + self._NEW_CLIP_WEIGHT * (stats.new_clips_per_poll or 0)
+        )
+
+    def get_interval(self, channel: str) -> float:
+        channel_yield = self.get_yield(channel)
+        if channel_yield is None:
+            return 0
+        if channel_yield <= 0:
+            return self.max_interval_seconds
+        return min(
+            max(
+                self.min_interval_seconds * self.target_yield / channel_yield,
+                self.min_interval_seconds,
+            ),
+            self.max_interval_seconds,
+        )
+
+    def get_clips_limit(self, channel: str) -> int:
+        stats = self.channels.get(self.channel_name(channel))
+        if stats is None or not stats.polls:
+            return self.max_clips_limit
+        if (
+            stats.last_clips_limit is not None
+            and stats.last_new_clips >= stats.last_clips_limit
+        ):
+            # Every listed clip was new, more were probably cut off
+            clips_limit = stats.last_clips_limit * 2
+        else:
+            clips_limit = math.ceil(2 * (stats.new_clips_per_poll or 0))
+        return min(
+            max(clips_limit, self.min_clips_limit),
+            self.max_clips_limit,
+        )
+
+    def plan_polls(
+        self,
+        channels: list[str],
+        now: float | None = None,
+    ) -> dict[str, int]:
+        """Get clips limits of the channels due for a poll."""
+        now = time.time() if now is None else now
+        polls = {}
+        for channel in channels:
+            stats = self.channels.get(self.channel_name(channel))
+            if (
+                stats is None
+                or stats.last_polled_at is None
+                or now - stats.last_polled_at >= self.get_interval(channel)
+            ):
+                polls[channel] = self.get_clips_limit(channel)
+        self.logger.log(
+            f"Polling {len(polls)} of {len(channels)} channels",
+        )
+        return polls
+
+    def record_polls(
+        self,
+        polls: dict[str, tuple[int | None, list[str]]],
+        now: float | None = None,
+    ) -> None:
+        """Record clips limits and listed clip ids of polled channels."""
+        now = time.time() if now is None else now
+        self._polled_channels = set()
+        for channel, (clips_limit, clip_ids) in polls.items():
+            name = self.channel_name(channel)
+            stats = self.channels.setdefault(name, ChannelStats())
+            if stats.polls:
+                # Uploads are credited to the poll they came from
+                stats.uploads_per_poll = self._smooth(
+                    stats.uploads_per_poll,
+                    stats.uploads_since_poll,
+                )
+            seen_clip_ids = set(stats.recent_clip_ids)
+            new_clip_ids = [
+                clip_id for clip_id in clip_ids if clip_id not in seen_clip_ids
+            ]
+            stats.polls += 1
+            stats.last_polled_at = now
+            stats.last_clips_limit = clips_limit
+            stats.last_new_clips = len(new_clip_ids)
+            stats.new_clips_per_poll = self._smooth(
+                stats.new_clips_per_poll,
+                len(new_clip_ids),
+            )
+            stats.uploads_since_poll = 0
+            stats.total_new_clips += len(new_clip_ids)
+            stats.recent_clip_ids = [
+                *new_clip_ids,
+                *stats.recent_clip_ids,
+            ][: self._RECENT_CLIP_IDS]
+            self._polled_channels.add(name)
+        self.save()
+
+    def record_candidates(self, broadcasters: list[str]) -> None:
+        """Record broadcasters of the clips surviving the filters."""
+        candidates = dict.fromkeys(self._polled_channels, 0)
+        for broadcaster in broadcasters:
+            name = self.channel_name(broadcaster)
+            if name in candidates:
+                candidates[name] += 1
+        for name, count in candidates.items():
+            stats = self.channels[name]
+            stats.candidates_per_poll = self._smooth(
+                stats.candidates_per_poll,
+                count,
+            )
+            stats.total_candidates += count
+        self._polled_channels = set()
+        self.save()
+
+    def record_upload(self, broadcaster: str) -> None:
+        stats = self.channels.setdefault(
+            self.channel_name(broadcaster),
+            ChannelStats(),
+        )
+        stats.uploads_since_poll += 1
+        stats.total_uploads += 1
+        self.save()
@@ -0,0 +1,219 @@
+import json
+import re
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+from .Logger import BaseLogger, Logger
+
+
+@dataclass
+class UploadedVideo:
+    video_id: str | None
+    title: str
+    duration_seconds: int | None = None
+    clip_id: str | None = None
+
+
+class ChannelUploadsIndex:
+    """Index of videos already uploaded to the target channel.
+
+    Remote entries come from the uploader sync, local entries are added
+    right after an upload so the index stays usable between syncs.
+    The source clip is recognized by a `twitch-clip-<id>` video tag.
+    A synced video replaces the local entry of the same clip, or with
+    the same title and duration. Videos the sync listed but couldn't
+    fetch are kept as unsynced until a later sync fetches them.
+    Added videos are written to `index_path` by `save`, which callers
+    call once per sync or run.
+    """
+
+    CLIP_TAG_PREFIX = "twitch-clip-"
+    # YouTube rounds durations to seconds, re-encodes may shift them
+    _DURATION_TOLERANCE_SECONDS = 2
+
+    def __init__(
+        self,
+        index_path: Path | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.index_path = index_path
+        self.logger = (logger if logger else Logger()).get_child("uploads")
+        self.videos: dict[str, UploadedVideo] = {}
+        self._titles: set[str] = set()
+        self._clip_ids: set[str] = set()
+        # Keys of local entries by clip id and by base title, duration
+        self._local_keys_by_clip_id: dict[str, str] = {}
+        self._local_keys_by_title: dict[str, dict[int | None, set[str]]] = {}
+        self.unsynced_video_ids: list[str] = []
+        self._load()
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self.videos
+
+    def __len__(self) -> int:
+        return len(self.videos)
+
+    @classmethod
+    def clip_tag(cls, clip_id: str) -> str:
+        return f"{cls.CLIP_TAG_PREFIX}{clip_id}"
+
+    @classmethod
+    def parse_clip_id(cls, tags: list[str]) -> str | None:
+        for tag in tags:
+            if tag.startswith(cls.CLIP_TAG_PREFIX):
+                return tag[len(cls.CLIP_TAG_PREFIX) :]
+        return None
+
+    @staticmethod
+    def base_title(title: str) -> str:
+        """Strip hashtags appended to the clip title."""
+        return re.sub(r"(\s+#\S+)+\s*$", "", title).strip().lower()
+
+    @staticmethod
+    def parse_duration(duration: str) -> int | None:
+        """Convert ISO 8601 duration (e.g. `PT1M5S`) to seconds."""
+        match = re.fullmatch(
+            r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?",
+            duration or "",
+        )
+        if match is None:
+            return None
+        days, hours, minutes, seconds = (
+            int(value or 0) for value in match.groups()
+        )
+        return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+    def _load(self) -> None:
+        if self.index_path is None or not self.index_path.exists():
+            return
+        with Path.open(self.index_path, encoding="utf-8") as file:
+            data = json.load(file)
+        for video in data.get("videos", []):
+            self._register(UploadedVideo(**video))
+        self.unsynced_video_ids = data.get("unsynced_video_ids", [])
+        self.logger.log(f"Loaded {len(self.videos)} channel uploads")
+
+    def save(self) -> None:
+        if self.index_path is None:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.index_path.with_suffix(".tmp")
+        with Path.open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "videos": [
+                        asdict(video) for video in self.videos.values()
+                    ],
+                    "unsynced_video_ids": self.unsynced_video_ids,
+                },
+                file,
+                ensure_ascii=False,
+            )
+        temporary_path.replace(self.index_path)
+
+    def _is_same_upload(
+        self,
+        local_video: UploadedVideo,
+        video: UploadedVideo,
+    ) -> bool:
+        if local_video.clip_id is not None and video.clip_id is not None:
+            return local_video.clip_id == video.clip_id
+        if self.base_title(local_video.title) != self.base_title(
+            video.title,
+        ):
+            return False
+        if (
+            local_video.duration_seconds is None
+            or video.duration_seconds is None
+        ):
+            return True
+        return (
+            abs(local_video.duration_seconds - video.duration_seconds)
+            <= self._DURATION_TOLERANCE_SECONDS
+        )
+
+    def _find_local_key(self, video: UploadedVideo) -> str | None:
+        if video.clip_id is not None:
+            key = self._local_keys_by_clip_id.get(video.clip_id)
+            if key is not None:
+                return key
+        keys_by_duration = self._local_keys_by_title.get(
+            self.base_title(video.title),
+            {},
+        )
+        if video.duration_seconds is None:
+            durations = list(keys_by_duration)
+        else:
+            durations = [
+                *range(
+                    video.duration_seconds - self._DURATION_TOLERANCE_SECONDS,
+                    video.duration_seconds
+                    + self._DURATION_TOLERANCE_SECONDS
+                    + 1,
+                ),
+                None,
+            ]
+        for duration in durations:
+            for key in keys_by_duration.get(duration, ()):
+                if self._is_same_upload(self.videos[key], video):
+                    return key
+        return None
+
+    def _index_local(self, key: str, video: UploadedVideo) -> None:
+        if video.clip_id is not None:
+            self._local_keys_by_clip_id[video.clip_id] = key
+        self._local_keys_by_title.setdefault(
+            self.base_title(video.title),
+            {},
+        ).setdefault(video.duration_seconds, set()).add(key)
+
+    def _remove_local(self, key: str) -> UploadedVideo:
+        video = self.videos.pop(key)
+        if video.clip_id is not None:
+            self._local_keys_by_clip_id.pop(video.clip_id, None)
+        title = self.base_title(video.title)
+        keys_by_duration = self._local_keys_by_title[title]
+        keys_by_duration[video.duration_seconds].discard(key)
+        if not keys_by_duration[video.duration_seconds]:
+            del keys_by_duration[video.duration_seconds]
+        if not keys_by_duration:
+            del self._local_keys_by_title[title]
+        return video
+
+    def _reconcile(self, video: UploadedVideo) -> UploadedVideo:
+        """Replace the local entry of a synced video."""
+        key = self._find_local_key(video)
+        if key is None:
+            return video
+        local_video = self._remove_local(key)
+        return replace(video, clip_id=video.clip_id or local_video.clip_id)
+
+    def _register(self, video: UploadedVideo) -> None:
+        if video.video_id is not None:
+            video = self._reconcile(video)
+        key = video.video_id or f"local:{video.clip_id or video.title}"
+        if key in self.videos and video.video_id is None:
+            self._remove_local(key)
+        self.videos[key] = video
+        if video.video_id is None:
+            self._index_local(key, video)
+        self._titles.add(self.base_title(video.title))
+        if video.clip_id is not None:
+            self._clip_ids.add(video.clip_id)
+
+    def add(
+        self,
+        videos: list[UploadedVideo],
+        unsynced_video_ids: list[str] | None = None,
+    ) -> None:
+        """Add videos, `unsynced_video_ids` replaces the unsynced ones."""
+        for video in videos:
+            self._register(video)
+        if unsynced_video_ids is not None:
+            self.unsynced_video_ids = unsynced_video_ids
+
+    def has_title(self, title: str) -> bool:
+        return self.base_title(title) in self._titles
+
+    def has_clip(self, clip_id: str) -> bool:
+        return clip_id in self._clip_ids
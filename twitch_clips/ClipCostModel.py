@@ -0,0 +1,296 @@
+import json
+import math
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+from .ClipsDiskBudget import ClipsDiskBudget
+from .Logger import BaseLogger, Logger
+from .TwitchClipsDownloader import ClipInfo
+
+
+class BudgetKindEnum(str, Enum):
+    WALL_CLOCK = "wall_clock"
+    CPU = "cpu"
+
+
+@dataclass
+class RunBudget:
+    seconds: float
+    kind: BudgetKindEnum | None = None
+
+
+@dataclass
+class ClipCost:
+    download_bytes: int
+    upload_bytes: int
+    download_seconds: float
+    encode_seconds: float
+    upload_seconds: float
+    cpu_seconds: float
+
+    @property
+    def wall_seconds(self) -> float:
+        return (
+            self.download_seconds + self.encode_seconds + self.upload_seconds
+        )
+
+    def get_seconds(self, kind: BudgetKindEnum) -> float:
+        if kind == BudgetKindEnum.CPU:
+            return self.cpu_seconds
+        return self.wall_seconds
+
+
+@dataclass
+class CostStats:
+    download_bytes_per_second: float | None = None
+    upload_bytes_per_second: float | None = None
+    encode_seconds_per_output_second: float | None = None
+    encode_cpu_seconds_per_output_second: float | None = None
+    output_bytes_per_output_second: float | None = None
+    source_bytes_per_clip_second: dict[str, float] = field(
+        default_factory=dict,
+    )
+
+
+class ClipCostModel:
+    """Predict the time a clip takes to publish from measured history.
+
+    Download and upload throughput, source bytes per clip second (by
+    source height), encode wall and CPU seconds per output second and
+    output bytes per output second are kept as moving averages. Until
+    measured, they fall back to conservative defaults.
+    """
+
+    _SMOOTHING = 0.3
+    _DEFAULT_DOWNLOAD_BYTES_PER_SECOND = 2_000_000
+    _DEFAULT_UPLOAD_BYTES_PER_SECOND = 1_000_000
+    _DEFAULT_ENCODE_SECONDS_PER_OUTPUT_SECOND = 1.0
+    _DEFAULT_ENCODE_CPU_SECONDS_PER_OUTPUT_SECOND = 2.0
+    _DEFAULT_OUTPUT_HEIGHT = 1080
+
+    def __init__(
+        self,
+        stats_path: Path | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.stats_path = stats_path
+        self.logger = (logger if logger else Logger()).get_child("costs")
+        self.stats = CostStats()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if self.stats_path is None or not self.stats_path.exists():
+            return
+        with Path.open(self.stats_path, encoding="utf-8") as file:
+            self.stats = CostStats(**json.load(file))
+        self.logger.log(f"Loaded cost stats: {asdict(self.stats)}")
+
+    def _save(self) -> None:
+        if self.stats_path is None:
+            return
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.stats_path.with_suffix(".tmp")
+        with Path.open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(asdict(self.stats), file)
+        temporary_path.replace(self.stats_path)
+
+    def _smooth(self, average: float | None, value: float) -> float:
+        if average is None:
+            return value
+        return average + self._SMOOTHING * (value - average)
+
+    @staticmethod
+    def cpu_seconds() -> float:
+        """CPU time of the process and its finished children.
+
+        It's process-wide, so it only measures runs of a single
+        pipeline. Encodes are measured with `CpuMeter` instead.
+        """
+        times = os.times()
+        return (
+            times.user
+            + times.system
+            + times.children_user
+            + times.children_system
+        )
+
+    def predict_source_bytes(self, clip_info: ClipInfo) -> int:
+        bytes_per_second = self.stats.source_bytes_per_clip_second.get(
+            str(clip_info.quality),
+        )
+        if bytes_per_second is None:
+            return ClipsDiskBudget.estimate_clip_bytes(
+                duration_seconds=clip_info.duration_seconds,
+                height=int(clip_info.quality),
+            )
+        return int(max(clip_info.duration_seconds, 1) * bytes_per_second)
+
+    def predict(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+        is_streamed: bool | None = None,
+        output_bytes: int | None = None,
+    ) -> ClipCost:
+        """Predict the cost of a clip.
+
+        :param is_streamed: the clip is converted from its stream, so
+            downloading it is part of the encode time
+        :param output_bytes: size of the converted video if known
+            upfront, e.g. from bitrate-targeted encode settings
+        """
+        stats = self.stats
+        source_bytes = self.predict_source_bytes(clip_info)
+        download_seconds = (
+            0
+            if is_streamed
+            else source_bytes
+            / (
+                stats.download_bytes_per_second
+                or self._DEFAULT_DOWNLOAD_BYTES_PER_SECOND
+            )
+        )
+        encode_seconds = 0.0
+        cpu_seconds = 0.0
+        upload_bytes = source_bytes
+        if is_vertical:
+            duration_seconds = max(clip_info.duration_seconds, 1)
+            encode_seconds = duration_seconds * (
+                stats.encode_seconds_per_output_second
+                or self._DEFAULT_ENCODE_SECONDS_PER_OUTPUT_SECOND
+            )
+            cpu_seconds = duration_seconds * (
+                stats.encode_cpu_seconds_per_output_second
+                or self._DEFAULT_ENCODE_CPU_SECONDS_PER_OUTPUT_SECOND
+            )
+            if output_bytes is not None:
+                upload_bytes = output_bytes
+            elif stats.output_bytes_per_output_second is not None:
+                upload_bytes = int(
+                    duration_seconds * stats.output_bytes_per_output_second,
+                )
+            else:
+                upload_bytes = ClipsDiskBudget.estimate_clip_bytes(
+                    duration_seconds=duration_seconds,
+                    height=self._DEFAULT_OUTPUT_HEIGHT,
+                )
+        return ClipCost(
+            download_bytes=0 if is_streamed else source_bytes,
+            upload_bytes=upload_bytes,
+            download_seconds=download_seconds,
+            encode_seconds=encode_seconds,
+            upload_seconds=upload_bytes
+            / (
+                stats.upload_bytes_per_second
+                or self._DEFAULT_UPLOAD_BYTES_PER_SECOND
+            ),
+            cpu_seconds=cpu_seconds,
+        )
+
+    def record_download(
+        self,
+        clip_info: ClipInfo,
+        size_bytes: int,
+        seconds: float,
+    ) -> None:
+        with self._lock:
+            if seconds > 0:
+                self.stats.download_bytes_per_second = self._smooth(
+                    self.stats.download_bytes_per_second,
+                    size_bytes / seconds,
+                )
+            quality = str(clip_info.quality)
+            self.stats.source_bytes_per_clip_second[quality] = self._smooth(
+                self.stats.source_bytes_per_clip_second.get(quality),
+                size_bytes / max(clip_info.duration_seconds, 1),
+            )
+            self._save()
+
+    def record_encode(
+        self,
+        output_seconds: float,
+        size_bytes: int,
+        seconds: float,
+        cpu_seconds: float | None = None,
+    ) -> None:
+        """Record an encode, `cpu_seconds` is `None` if unmeasured."""
+        output_seconds = max(output_seconds, 1)
+        with self._lock:
+            self.stats.encode_seconds_per_output_second = self._smooth(
+                self.stats.encode_seconds_per_output_second,
+                seconds / output_seconds,
+            )
+            if cpu_seconds is not None:
+                self.stats.encode_cpu_seconds_per_output_second = (
+                    self._smooth(
+                        self.stats.encode_cpu_seconds_per_output_second,
+                        cpu_seconds / output_seconds,
+                    )
+                )
+            self.stats.output_bytes_per_output_second = self._smooth(
+                self.stats.output_bytes_per_output_second,
+                size_bytes / output_seconds,
+            )
+            self._save()
+
+    def record_upload(self, size_bytes: int, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.stats.upload_bytes_per_second = self._smooth(
+                self.stats.upload_bytes_per_second,
+                size_bytes / seconds,
+            )
+            self._save()
+
+    @staticmethod
+    def select_within_budget(
+        costs: list[float],
+        values: list[float],
+        budget: float,
+        max_count: int,
+        resolution: int | None = None,
+    ) -> list[int]:
+        """Pick items of the highest total value fitting the budget.
+
+        Solves the 0/1 knapsack with at most `max_count` items by
+        dynamic programming, with costs rounded up to `budget /
+        resolution` units.
+
+        :returns: indexes of the picked items, in ascending order
+        """
+        resolution = resolution or 200
+        if budget <= 0 or max_count <= 0 or not costs:
+            return []
+        unit = budget / resolution
+        weights = [math.ceil(cost / unit - 1e-9) for cost in costs]
+        best_values = np.zeros((max_count + 1, resolution + 1))
+        is_taken = np.zeros(
+            (len(costs), max_count + 1, resolution + 1),
+            dtype=bool,
+        )
+        for index, (weight, value) in enumerate(
+            zip(weights, values, strict=True),
+        ):
+            if weight > resolution:
+                continue
+            for count in range(max_count, 0, -1):
+                with_item = best_values[count - 1, : resolution + 1 - weight]
+                with_item = with_item + value
+                is_better = with_item > best_values[count, weight:]
+                best_values[count, weight:][is_better] = with_item[is_better]
+                is_taken[index, count, weight:] = is_better
+        picked = []
+        count, capacity = max_count, resolution
+        for index in range(len(costs) - 1, -1, -1):
+            if count > 0 and is_taken[index, count, capacity]:
+                picked.append(index)
+                count -= 1
+                capacity -= weights[index]
+        return sorted(picked)
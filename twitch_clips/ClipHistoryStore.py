@@ -0,0 +1,405 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .Logger import BaseLogger, Logger
+from .TwitchClipsDownloader import ClipInfo
+
+
+class ClipHistoryStore:
+    """Columnar history of discovered clips.
+
+    Every run appends one observation per discovered clip to a NumPy
+    structured array segment in `history_path`. Channels are stored as
+    codes listed in `channels.json`. Segments are merged (dropping rows
+    older than `retention_seconds`) once there are more than
+    `max_segments` of them.
+
+    Observations are also folded into a table with one row per clip,
+    sorted by a 64-bit hash of the clip id, holding the latest
+    observation and the view velocity averaged over roughly
+    `velocity_window_seconds`. Queries and ranking only read this table,
+    which is rebuilt from the segments on load. Clips are ranked by
+    views projected `velocity_horizon_seconds` ahead.
+    """
+
+    ROW_DTYPE = np.dtype(
+        [
+            ("observed_at", "f8"),
+            ("clip_key", "u8"),
+            ("clip_id", "S64"),
+            ("channel", "i4"),
+            ("view_count", "i8"),
+            ("duration_seconds", "f4"),
+        ],
+    )
+    STATS_DTYPE = np.dtype(
+        [
+            ("clip_key", "u8"),
+            ("clip_id", "S64"),
+            ("channel", "i4"),
+            ("view_count", "i8"),
+            ("duration_seconds", "f4"),
+            ("first_seen_at", "f8"),
+            ("last_seen_at", "f8"),
+            ("views_per_hour", "f8"),
+        ],
+    )
+
+    def __init__(
+        self,
+        history_path: Path,
+        velocity_window_seconds: float | None = None,
+        velocity_horizon_seconds: float | None = None,
+        max_clips_per_channel: int | None = None,
+        retention_seconds: float | None = None,
+        max_segments: int | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.history_path = history_path
+        self.velocity_window_seconds = (
+            velocity_window_seconds or 7 * 24 * 3600
+        )
+        self.velocity_horizon_seconds = (
+            24 * 3600
+            if velocity_horizon_seconds is None
+            else velocity_horizon_seconds
+        )
+        self.max_clips_per_channel = max_clips_per_channel
+        self.retention_seconds = retention_seconds or 90 * 24 * 3600
+        self.max_segments = max_segments or 32
+        self.logger = (logger if logger else Logger()).get_child("history")
+        self._lock = threading.Lock()
+        self._channels: list[str] = []
+        self._channel_codes: dict[str, int] = {}
+        self._rows = np.empty(0, dtype=self.ROW_DTYPE)
+        self._stats = np.empty(0, dtype=self.STATS_DTYPE)
+        self._segment_paths: list[Path] = []
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def _channels_path(self) -> Path:
+        return self.history_path / "channels.json"
+
+    def _load(self) -> None:
+        if self._channels_path.exists():
+            with Path.open(self._channels_path, encoding="utf-8") as file:
+                self._channels = json.load(file)
+            self._channel_codes = {
+                channel: code for code, channel in enumerate(self._channels)
+            }
+        self._segment_paths = sorted(self.history_path.glob("*.npy"))
+        segments = [
+            np.load(segment_path, allow_pickle=False)
+            for segment_path in self._segment_paths
+        ]
+        if not segments:
+            return
+        self._rows = np.concatenate(segments).astype(self.ROW_DTYPE)
+        self._stats = self._build_stats(self._rows)
+        self.logger.log(
+            f"Loaded {len(self._rows)} observations of "
+            f"{len(self._stats)} clips from {len(segments)} segments",
+        )
+
+    @staticmethod
+    def clip_key(clip_id: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(clip_id.encode(), digest_size=8).digest(),
+            "big",
+        )
+
+    def _get_channel_codes(self, channels: list[str]) -> np.ndarray:
+        """Get codes of channels, adding the unknown ones."""
+        new_channels = [
+            channel
+            for channel in dict.fromkeys(channels)
+            if channel not in self._channel_codes
+        ]
+        if new_channels:
+            for channel in new_channels:
+                self._channel_codes[channel] = len(self._channels)
+                self._channels.append(channel)
+            temporary_path = self._channels_path.with_suffix(".tmp")
+            with Path.open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(self._channels, file, ensure_ascii=False)
+            temporary_path.replace(self._channels_path)
+        return np.array(
+            [self._channel_codes[channel] for channel in channels],
+            dtype=np.int32,
+        )
+
+    def _save_segment(self, rows: np.ndarray) -> Path:
+        name = f"{time.time_ns():020d}"
+        segment_path = self.history_path / f"{name}.npy"
+        temporary_path = self.history_path / f"{name}.tmp"
+        with Path.open(temporary_path, "wb") as file:
+            np.save(file, rows, allow_pickle=False)
+        temporary_path.replace(segment_path)
+        return segment_path
+
+    def append(
+        self,
+        clips: list[ClipInfo],
+        observed_at: float | None = None,
+    ) -> None:
+        """Record an observation of every clip."""
+        if not clips:
+            return
+        observed_at = time.time() if observed_at is None else observed_at
+        with self._lock:
+            self.history_path.mkdir(parents=True, exist_ok=True)
+            rows = np.empty(len(clips), dtype=self.ROW_DTYPE)
+            rows["observed_at"] = observed_at
+            rows["clip_key"] = [self.clip_key(clip.id) for clip in clips]
+            rows["clip_id"] = [clip.id.encode() for clip in clips]
+            rows["channel"] = self._get_channel_codes(
+                [clip.broadcaster.lower() for clip in clips],
+            )
+            rows["view_count"] = [clip.view_count for clip in clips]
+            rows["duration_seconds"] = [
+                clip.duration_seconds for clip in clips
+            ]
+            self._segment_paths.append(self._save_segment(rows))
+            self._rows = np.concatenate([self._rows, rows])
+            self._stats = self._update_stats(self._stats, rows)
+            if len(self._segment_paths) > self.max_segments:
+                self._compact(now=observed_at)
+
+    def _build_stats(self, rows: np.ndarray) -> np.ndarray:
+        """Fold observations into clip stats, oldest first."""
+        rows = rows[np.argsort(rows["observed_at"], kind="stable")]
+        batch_starts = np.flatnonzero(
+            np.append(
+                True,
+                rows["observed_at"][1:] != rows["observed_at"][:-1],
+            ),
+        )
+        stats = np.empty(0, dtype=self.STATS_DTYPE)
+        for start, end in zip(
+            batch_starts,
+            [*batch_starts[1:], len(rows)],
+            strict=True,
+        ):
+            stats = self._update_stats(stats, rows[start:end])
+        return stats
+
+    def _update_stats(
+        self,
+        stats: np.ndarray,
+        rows: np.ndarray,
+    ) -> np.ndarray:
+        """Fold observations made at the same time into clip stats.
+
+        Velocity is smoothed with a weight growing with the time since
+        the previous observation, so it averages over about
+        `velocity_window_seconds` however often clips are observed.
+        """
+        stats = stats.copy()
+        keys, first_indexes = np.unique(rows["clip_key"], return_index=True)
+        rows = rows[first_indexes]
+        positions = np.searchsorted(stats["clip_key"], keys)
+        is_known = np.zeros(len(keys), dtype=bool)
+        in_bounds = positions < len(stats)
+        is_known[in_bounds] = (
+            stats["clip_key"][positions[in_bounds]] == keys[in_bounds]
+        )
+        known_positions = positions[is_known]
+        known_rows = rows[is_known]
+        elapsed_seconds = (
+            known_rows["observed_at"]
+            - stats["last_seen_at"][known_positions]
+        )
+        is_newer = elapsed_seconds > 0
+        known_positions = known_positions[is_newer]
+        known_rows = known_rows[is_newer]
+        elapsed_seconds = elapsed_seconds[is_newer]
+        instant_views_per_hour = (
+            known_rows["view_count"] - stats["view_count"][known_positions]
+        ) / (elapsed_seconds / 3600)
+        previous_views_per_hour = stats["views_per_hour"][known_positions]
+        weights = np.where(
+            stats["first_seen_at"][known_positions]
+            == stats["last_seen_at"][known_positions],
+            1,
+            -np.expm1(-elapsed_seconds / self.velocity_window_seconds),
+        )
+        stats["views_per_hour"][known_positions] = (
+            previous_views_per_hour
+            + weights * (instant_views_per_hour - previous_views_per_hour)
+        )
+        for field in ("channel", "view_count", "duration_seconds"):
+            stats[field][known_positions] = known_rows[field]
+        stats["last_seen_at"][known_positions] = known_rows["observed_at"]
+        new_rows = rows[~is_known]
+        new_stats = np.zeros(len(new_rows), dtype=self.STATS_DTYPE)
+        new_stats["clip_key"] = keys[~is_known]
+        for field in ("clip_id", "channel", "view_count", "duration_seconds"):
+            new_stats[field] = new_rows[field]
+        new_stats["first_seen_at"] = new_rows["observed_at"]
+        new_stats["last_seen_at"] = new_rows["observed_at"]
+        return np.insert(stats, positions[~is_known], new_stats)
+
+    def compact(self, now: float | None = None) -> None:
+        """Merge segments, dropping rows past the retention period."""
+        with self._lock:
+            self._compact(now=time.time() if now is None else now)
+
+    def _compact(self, now: float) -> None:
+        min_observed_at = now - self.retention_seconds
+        rows = self._rows[self._rows["observed_at"] >= min_observed_at]
+        merged_path = self._save_segment(rows)
+        for segment_path in self._segment_paths:
+            segment_path.unlink(missing_ok=True)
+        self.logger.log(
+            f"Merged {len(self._segment_paths)} segments, "
+            f"dropped {len(self._rows) - len(rows)} old observations",
+        )
+        self._segment_paths = [merged_path]
+        self._rows = rows
+        # Velocities of kept clips must not depend on dropped rows
+        self._stats = self._build_stats(rows)
+
+    def observations(self) -> np.ndarray:
+        """Get all observations as `ROW_DTYPE` rows."""
+        with self._lock:
+            return self._rows
+
+    def clip_stats(self) -> np.ndarray:
+        """Get `STATS_DTYPE` rows, sorted by clip key."""
+        with self._lock:
+            return self._stats
+
+    def channel_name(self, code: int) -> str:
+        return self._channels[code]
+
+    @staticmethod
+    def rank_within_groups(groups: np.ndarray) -> np.ndarray:
+        """Get position of every item among the items of its group.
+
+        Items keep their order within a group, e.g. positions of
+        `[7, 3, 7, 7]` are `[0, 0, 1, 2]`.
+        """
+        order = np.argsort(groups, kind="stable")
+        sorted_groups = groups[order]
+        group_starts = np.flatnonzero(
+            np.append(True, sorted_groups[1:] != sorted_groups[:-1]),
+        )
+        group_sizes = np.diff(np.append(group_starts, len(groups)))
+        positions = np.empty(len(groups), dtype=np.int64)
+        positions[order] = np.arange(len(groups)) - np.repeat(
+            group_starts,
+            group_sizes,
+        )
+        return positions
+
+    def project_views(
+        self,
+        view_count: np.ndarray,
+        views_per_hour: np.ndarray,
+    ) -> np.ndarray:
+        return view_count + np.maximum(views_per_hour, 0) * (
+            self.velocity_horizon_seconds / 3600
+        )
+
+    def query(
+        self,
+        channels: list[str] | None = None,
+        min_duration: float | None = None,
+        max_duration: float | None = None,
+        seen_since: float | None = None,
+        max_clips_per_channel: int | None = None,
+        limit: int | None = None,
+    ) -> np.ndarray:
+        """Get stats of the top clips by projected views.
+
+        :returns: `STATS_DTYPE` rows, best first
+        """
+        stats = self.clip_stats()
+        mask = np.ones(len(stats), dtype=bool)
+        if channels is not None:
+            mask &= np.isin(
+                stats["channel"],
+                [
+                    self._channel_codes[channel.lower()]
+                    for channel in channels
+                    if channel.lower() in self._channel_codes
+                ],
+            )
+        if min_duration is not None:
+            mask &= stats["duration_seconds"] >= min_duration
+        if max_duration is not None:
+            mask &= stats["duration_seconds"] < max_duration
+        if seen_since is not None:
+            mask &= stats["last_seen_at"] >= seen_since
+        stats = stats[mask]
+        stats = stats[
+            np.argsort(
+                -self.project_views(
+                    stats["view_count"],
+                    stats["views_per_hour"],
+                ),
+                kind="stable",
+            )
+        ]
+        if max_clips_per_channel is not None:
+            stats = stats[
+                self.rank_within_groups(stats["channel"])
+                < max_clips_per_channel
+            ]
+        return stats[:limit]
+
+    def rank(self, clips: list[ClipInfo]) -> list[ClipInfo]:
+        """Sort clips by views projected from their view velocity.
+
+        Clips past `max_clips_per_channel` of their channel go after
+        all the others.
+        """
+        if not clips:
+            return []
+        started_at = time.perf_counter()
+        stats = self.clip_stats()
+        keys = np.array(
+            [self.clip_key(clip.id) for clip in clips],
+            dtype=np.uint64,
+        )
+        views_per_hour = np.zeros(len(clips))
+        if len(stats):
+            positions = np.minimum(
+                np.searchsorted(stats["clip_key"], keys),
+                len(stats) - 1,
+            )
+            is_known = stats["clip_key"][positions] == keys
+            views_per_hour[is_known] = stats["views_per_hour"][
+                positions[is_known]
+            ]
+        order = np.argsort(
+            -self.project_views(
+                np.array([clip.view_count for clip in clips]),
+                views_per_hour,
+            ),
+            kind="stable",
+        )
+        if self.max_clips_per_channel is not None:
+            _, channels = np.unique(
+                [clips[index].broadcaster.lower() for index in order],
+                return_inverse=True,
+            )
+            is_deferred = (
+                self.rank_within_groups(channels)
+                >= self.max_clips_per_channel
+            )
+            order = np.concatenate([order[~is_deferred], order[is_deferred]])
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        self.logger.log(
+            f"Ranked {len(clips)} clips against {len(stats)} clip "
+            f"histories in {elapsed_ms:.1f}ms",
+        )
+        return [clips[index] for index in order]
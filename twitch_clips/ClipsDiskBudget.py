@@ -0,0 +1,271 @@
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .ClipsFolderLock import ClipsFolderLock
+from .Logger import BaseLogger, Logger
+
+
+class DiskBudgetExceededError(RuntimeError):
+    pass
+
+
+@dataclass
+class DiskUsageMetrics:
+    budget_bytes: int
+    used_bytes: int
+    in_flight_bytes: int
+    free_bytes: int
+    evicted_bytes: int
+    blocked_seconds: float
+
+
+@dataclass
+class _Reservation:
+    path: Path
+    estimated_bytes: int
+
+
+class ClipsDiskBudget:
+    """Bound the size of the clips folder.
+
+    Writers reserve the estimated size of a file before creating it and
+    block while the folder is over budget. Reserved and in-use files are
+    protected; files marked completed are evicted first, then orphaned
+    files older than `orphan_grace_seconds`, oldest first. With a
+    `folder_lock`, orphaned files of clips leased by other runs sharing
+    the folder are never evicted.
+    """
+
+    # Approximate clip bitrates (bytes per second) by source height
+    _BYTES_PER_SECOND = {1080: 800_000, 720: 450_000, 480: 200_000}
+    _DEFAULT_BYTES_PER_SECOND = 120_000
+
+    def __init__(
+        self,
+        folder_path: Path,
+        budget_bytes: int,
+        min_free_bytes: int | None = None,
+        orphan_grace_seconds: float | None = None,
+        folder_lock: ClipsFolderLock | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        if budget_bytes <= 0:
+            budget_error = "Disk budget must be positive"
+            raise ValueError(budget_error)
+        self.folder_path = folder_path
+        self.budget_bytes = budget_bytes
+        self.min_free_bytes = min_free_bytes or 0
+        self.orphan_grace_seconds = (
+            600 if orphan_grace_seconds is None else orphan_grace_seconds
+        )
+        self.folder_lock = folder_lock
+        self.logger = (logger if logger else Logger()).get_child("disk")
+        self.evicted_bytes = 0
+        self.blocked_seconds = 0.0
+        self._reservations: dict[str, _Reservation] = {}
+        self._protected_paths: set[Path] = set()
+        self._completed_paths: list[Path] = []
+        self._condition = threading.Condition()
+
+    @classmethod
+    def estimate_clip_bytes(cls, duration_seconds: float, height: int) -> int:
+        bytes_per_second = next(
+            (
+                rate
+                for min_height, rate in sorted(
+                    cls._BYTES_PER_SECOND.items(),
+                    reverse=True,
+                )
+                if height >= min_height
+            ),
+            cls._DEFAULT_BYTES_PER_SECOND,
+        )
+        return int(max(duration_seconds, 1) * bytes_per_second)
+
+    def reserve(
+        self,
+        key: str,
+        path: Path,
+        estimated_bytes: int,
+        timeout: float | None = None,
+    ) -> None:
+        """Reserve space for a file, blocking while over budget.
+
+        :raises DiskBudgetExceededError: if the space can't be freed
+            before `timeout`, or no other writer can free it
+        """
+        if estimated_bytes > self.budget_bytes:
+            too_large_error = (
+                f"File {path} ({estimated_bytes} bytes) doesn't fit "
+                f"the disk budget ({self.budget_bytes} bytes)"
+            )
+            raise DiskBudgetExceededError(too_large_error)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            blocked_since = None
+            while not self._fits(estimated_bytes):
+                self._evict(estimated_bytes)
+                if self._fits(estimated_bytes):
+                    break
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if not self._reservations or (
+                    remaining is not None and remaining <= 0
+                ):
+                    budget_error = (
+                        f"Not enough disk budget for {path} "
+                        f"({estimated_bytes} bytes)"
+                    )
+                    raise DiskBudgetExceededError(budget_error)
+                if blocked_since is None:
+                    blocked_since = time.monotonic()
+                    self.logger.log(
+                        f"Clips folder is over budget, waiting for space "
+                        f"for {path}...",
+                    )
+                self._condition.wait(remaining)
+            if blocked_since is not None:
+                self.blocked_seconds += time.monotonic() - blocked_since
+            self._reservations[key] = _Reservation(
+                path=Path(path),
+                estimated_bytes=estimated_bytes,
+            )
+            self._protected_paths.add(Path(path))
+
+    def release(self, key: str) -> None:
+        """End a reservation, the written file stays protected."""
+        with self._condition:
+            self._reservations.pop(key, None)
+            self._condition.notify_all()
+
+    @contextmanager
+    def reservation(
+        self,
+        key: str,
+        path: Path,
+        estimated_bytes: int,
+        timeout: float | None = None,
+    ) -> Iterator[None]:
+        self.reserve(
+            key=key,
+            path=path,
+            estimated_bytes=estimated_bytes,
+            timeout=timeout,
+        )
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def mark_completed(self, path: Path) -> None:
+        """Allow eviction of an artifact that is no longer needed."""
+        with self._condition:
+            self._protected_paths.discard(Path(path))
+            if Path(path) not in self._completed_paths:
+                self._completed_paths.append(Path(path))
+            self._condition.notify_all()
+
+    def forget(self, path: Path) -> None:
+        """Stop tracking a deleted artifact."""
+        with self._condition:
+            self._protected_paths.discard(Path(path))
+            if Path(path) in self._completed_paths:
+                self._completed_paths.remove(Path(path))
+            self._condition.notify_all()
+
+    def metrics(self) -> DiskUsageMetrics:
+        with self._condition:
+            return DiskUsageMetrics(
+                budget_bytes=self.budget_bytes,
+                used_bytes=self._used_bytes(),
+                in_flight_bytes=self._in_flight_bytes(),
+                free_bytes=self._free_bytes(),
+                evicted_bytes=self.evicted_bytes,
+                blocked_seconds=round(self.blocked_seconds, 3),
+            )
+
+    def _fits(self, estimated_bytes: int) -> bool:
+        within_budget = (
+            self._used_bytes() + self._in_flight_bytes() + estimated_bytes
+            <= self.budget_bytes
+        )
+        enough_free_space = (
+            self._free_bytes() - estimated_bytes >= self.min_free_bytes
+        )
+        return within_budget and enough_free_space
+
+    def _files(self) -> list[os.DirEntry]:
+        if not self.folder_path.exists():
+            return []
+        with os.scandir(self.folder_path) as entries:
+            return [
+                entry
+                for entry in entries
+                if entry.is_file() and not entry.name.startswith(".")
+            ]
+
+    def _used_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in self._files())
+
+    def _in_flight_bytes(self) -> int:
+        in_flight_bytes = 0
+        for reservation in self._reservations.values():
+            try:
+                written_bytes = reservation.path.stat().st_size
+            except OSError:
+                written_bytes = 0
+            in_flight_bytes += max(
+                0,
+                reservation.estimated_bytes - written_bytes,
+            )
+        return in_flight_bytes
+
+    def _free_bytes(self) -> int:
+        return shutil.disk_usage(self.folder_path).free
+
+    def _eviction_candidates(self) -> list[Path]:
+        now = time.time()
+        completed_paths = [
+            path for path in self._completed_paths if path.exists()
+        ]
+        orphaned_entries = sorted(
+            (
+                entry
+                for entry in self._files()
+                if Path(entry.path) not in self._protected_paths
+                and Path(entry.path) not in completed_paths
+                and now - entry.stat().st_mtime >= self.orphan_grace_seconds
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        return completed_paths + [
+            Path(entry.path) for entry in orphaned_entries
+        ]
+
+    def _evict(self, needed_bytes: int) -> None:
+        for path in self._eviction_candidates():
+            if self._fits(needed_bytes):
+                return
+            with (
+                self.folder_lock.artifact(path)
+                if self.folder_lock is not None
+                else nullcontext(True)
+            ) as is_owned:
+                if not is_owned:
+                    continue
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                except OSError:
+                    continue
+            self.evicted_bytes += size
+            if path in self._completed_paths:
+                self._completed_paths.remove(path)
+            self.logger.log(f"Evicted {path} ({size} bytes)")
@@ -0,0 +1,248 @@
+import fcntl
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from .Logger import BaseLogger, Logger
+
+
+class ClipsFolderLock:
+    """Coordinate runs sharing a clips folder.
+
+    Control files live in the `.twitch_clips` folder of the clips
+    folder. A run registers as alive by locking `runs/<run id>.lock`
+    and holds a shared lock on `run.lock`. A `single_flight` run holds
+    `run.lock` exclusively instead, so it never overlaps other runs.
+
+    Runs lease a clip by locking `leases/<clip id>.lock` before
+    creating its files, skip clips leased by other runs and only
+    delete files of clips they can lease, so overlapping runs split
+    the clips between them. Published clips get a `published/<clip
+    id>` marker, which outlives the run, so later runs never lease
+    them again. Locks are `flock` locks, which the kernel drops when a
+    run dies, so crashed runs never block others.
+    """
+
+    CONTROL_FOLDER_NAME = ".twitch_clips"
+
+    def __init__(
+        self,
+        clips_folder_path: Path,
+        run_id: str | None = None,
+        logger: BaseLogger | None = None,
+        single_flight: bool | None = None,
+    ) -> None:
+        self.control_folder_path = clips_folder_path / self.CONTROL_FOLDER_NAME
+        self.run_id = (
+            run_id
+            or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.logger = (logger if logger else Logger()).get_child("lock")
+        self.single_flight = bool(single_flight)
+        self._lock = threading.Lock()
+        self._run_fd: int | None = None
+        self._gate_fd: int | None = None
+        self._lease_fds: dict[str, int] = {}
+
+    @property
+    def _runs_folder_path(self) -> Path:
+        return self.control_folder_path / "runs"
+
+    @property
+    def _leases_folder_path(self) -> Path:
+        return self.control_folder_path / "leases"
+
+    @property
+    def _published_folder_path(self) -> Path:
+        return self.control_folder_path / "published"
+
+    @property
+    def _gate_path(self) -> Path:
+        return self.control_folder_path / "run.lock"
+
+    def _lease_path(self, clip_id: str) -> Path:
+        return self._leases_folder_path / f"{clip_id}.lock"
+
+    def _try_lock(self, path: Path) -> int | None:
+        """Lock a control file, `None` if another holder has it.
+
+        The file is unlinked by its holder before unlocking, so a lock
+        taken on an unlinked file is retried on the new one.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            try:
+                is_current = os.stat(path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                is_current = False
+            if is_current:
+                os.ftruncate(fd, 0)
+                os.write(fd, self.run_id.encode())
+                return fd
+            os.close(fd)
+
+    @staticmethod
+    def _unlock(path: Path, fd: int) -> None:
+        path.unlink(missing_ok=True)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _lock_gate(self) -> int | None:
+        """Lock `run.lock`, shared or exclusive for single-flight runs.
+
+        Unlike other control files, it is never unlinked, as shared
+        holders would lose their lock to a new file.
+        """
+        self.control_folder_path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._gate_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(
+                fd,
+                (fcntl.LOCK_EX if self.single_flight else fcntl.LOCK_SH)
+                | fcntl.LOCK_NB,
+            )
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _unlock_gate(self) -> None:
+        if self._gate_fd is not None:
+            fcntl.flock(self._gate_fd, fcntl.LOCK_UN)
+            os.close(self._gate_fd)
+            self._gate_fd = None
+
+    def acquire_run(self) -> None:
+        """Register the run as alive.
+
+        :raises RuntimeError: if a single-flight run uses the folder,
+            or any other run does and this one is single-flight
+        """
+        with self._lock:
+            if self._run_fd is not None:
+                return
+            self._gate_fd = self._lock_gate()
+            if self._gate_fd is None:
+                single_flight_error = (
+                    "Another run is active in "
+                    f"{self.control_folder_path.parent} and runs are "
+                    "single-flight"
+                )
+                raise RuntimeError(single_flight_error)
+            self._run_fd = self._try_lock(
+                self._runs_folder_path / f"{self.run_id}.lock",
+            )
+            if self._run_fd is None:
+                self._unlock_gate()
+        if self._run_fd is None:
+            run_error = f"Run {self.run_id} is already active"
+            raise RuntimeError(run_error)
+        other_runs = self.other_runs()
+        if other_runs:
+            self.logger.log(
+                f"Sharing clips folder with runs: {', '.join(other_runs)}",
+            )
+
+    def release_run(self) -> None:
+        """Release the run lock and all leases of the run."""
+        self.release_leases()
+        with self._lock:
+            if self._run_fd is None:
+                return
+            self._unlock(
+                self._runs_folder_path / f"{self.run_id}.lock",
+                self._run_fd,
+            )
+            self._run_fd = None
+            self._unlock_gate()
+
+    def other_runs(self) -> list[str]:
+        """Get ids of other live runs, removing files of dead ones."""
+        if not self._runs_folder_path.exists():
+            return []
+        other_runs = []
+        for run_path in self._runs_folder_path.glob("*.lock"):
+            if run_path.stem == self.run_id:
+                continue
+            fd = self._try_lock(run_path)
+            if fd is None:
+                other_runs.append(run_path.stem)
+            else:
+                self._unlock(run_path, fd)
+        return sorted(other_runs)
+
+    def try_lease(self, clip_id: str) -> bool:
+        """Lease a clip, False if it is leased already."""
+        with self._lock:
+            if clip_id in self._lease_fds:
+                return False
+            fd = self._try_lock(self._lease_path(clip_id))
+            if fd is None:
+                return False
+            self._lease_fds[clip_id] = fd
+            return True
+
+    def release_lease(self, clip_id: str) -> None:
+        with self._lock:
+            fd = self._lease_fds.pop(clip_id, None)
+            if fd is not None:
+                self._unlock(self._lease_path(clip_id), fd)
+
+    def release_leases(self) -> None:
+        with self._lock:
+            clip_ids = list(self._lease_fds)
+        for clip_id in clip_ids:
+            self.release_lease(clip_id)
+
+    def has_lease(self, clip_id: str) -> bool:
+        with self._lock:
+            return clip_id in self._lease_fds
+
+    def mark_published(self, clip_id: str) -> None:
+        """Mark a clip as published for every run sharing the folder."""
+        self._published_folder_path.mkdir(parents=True, exist_ok=True)
+        (self._published_folder_path / clip_id).write_text(
+            self.run_id,
+            encoding="utf-8",
+        )
+
+    def is_published(self, clip_id: str) -> bool:
+        return (self._published_folder_path / clip_id).exists()
+
+    @staticmethod
+    def clip_id_from_path(path: Path) -> str:
+        """Get id of the clip a file was created for.
+
+        Clip files are named `<clip id>.<format>` with optional
+        `_vertical` and `.tmp` suffixes.
+        """
+        return path.name.split(".")[0].removesuffix("_vertical")
+
+    @contextmanager
+    def artifact(self, path: Path) -> Iterator[bool]:
+        """Check a file isn't used by another run.
+
+        Files of clips leased by this run are its own. Files of other
+        clips stay leased until the block ends, so no run recreates
+        them meanwhile.
+        """
+        clip_id = self.clip_id_from_path(path)
+        if self.has_lease(clip_id):
+            yield True
+            return
+        is_leased = self.try_lease(clip_id)
+        try:
+            yield is_leased
+        finally:
+            if is_leased:
+                self.release_lease(clip_id)
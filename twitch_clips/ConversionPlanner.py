@@ -0,0 +1,328 @@
+import json
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Tuple
+
+from moviepy.config import FFMPEG_BINARY
+
+from .CpuMeter import CpuMeter
+from .Logger import BaseLogger, Logger
+from .VerticalVideoConverter import EncodeSettings, VerticalVideoConverter
+
+
+class ConversionActionEnum(str, Enum):
+    PASS_THROUGH = "pass_through"
+    REMUX = "remux"
+    REENCODE = "reencode"
+
+
+@dataclass
+class MediaProbe:
+    width: int
+    height: int
+    duration: float
+    video_codec: str
+    audio_codec: str | None
+    format_name: str
+
+
+@dataclass
+class ConversionPlan:
+    action: ConversionActionEnum
+    probe: MediaProbe
+    reason: str
+
+
+class ConversionPlanner:
+    """Pick the cheapest way to get an uploadable vertical video.
+
+    Portrait sources with codecs YouTube accepts are passed through,
+    or remuxed to MP4 when only the container differs. Everything else
+    is letterboxed by a single ffmpeg encode, copying the audio stream
+    when it's already AAC, or targeting `encode_settings` bitrates.
+    """
+
+    _VIDEO_CODECS = frozenset({"h264", "hevc", "vp9", "av1"})
+    _AUDIO_CODECS = frozenset({"aac", "mp3", "opus"})
+    _MP4_FORMATS = frozenset({"mov", "mp4", "m4a", "3gp", "3g2", "mj2"})
+    _FORMAT_PATTERN = re.compile(r"Input #0, (.+?), from ")
+    _DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+    _VIDEO_PATTERN = re.compile(
+        r"Stream #0:\d+.*?: Video: (\w+).*?, (\d+)x(\d+)",
+    )
+    _AUDIO_PATTERN = re.compile(r"Stream #0:\d+.*?: Audio: (\w+)")
+
+    def __init__(
+        self,
+        size: Tuple[int, int] | None = None,
+        ffprobe_path: str | None = None,
+        ffmpeg_path: str | None = None,
+        timeout_seconds: float | None = None,
+        logger: BaseLogger | None = None,
+        encode_settings: EncodeSettings | None = None,
+    ) -> None:
+        self.size = size or (1080, 1920)
+        self.encode_settings = encode_settings
+        self.ffmpeg_path = ffmpeg_path or FFMPEG_BINARY
+        self.timeout_seconds = timeout_seconds or 300
+        self.logger = (logger if logger else Logger()).get_child("planner")
+        self.ffprobe_path = ffprobe_path or self._find_ffprobe(
+            self.ffmpeg_path,
+        )
+        if self.ffprobe_path is None:
+            self.logger.log("No ffprobe found, probing with ffmpeg")
+        elif shutil.which(self.ffprobe_path) is None:
+            ffprobe_error = f"ffprobe not found: {self.ffprobe_path}"
+            raise FileNotFoundError(ffprobe_error)
+
+    @staticmethod
+    def _find_ffprobe(ffmpeg_path: str) -> str | None:
+        """Find ffprobe next to the ffmpeg binary, then on PATH."""
+        ffmpeg_location = shutil.which(ffmpeg_path)
+        if ffmpeg_location is not None:
+            ffmpeg_file = Path(ffmpeg_location)
+            ffprobe_file = ffmpeg_file.with_name(
+                ffmpeg_file.name.replace("ffmpeg", "ffprobe"),
+            )
+            if ffprobe_file != ffmpeg_file and shutil.which(ffprobe_file):
+                return str(ffprobe_file)
+        return shutil.which("ffprobe")
+
+    def probe(self, source: Path | str) -> MediaProbe:
+        if self.ffprobe_path is None:
+            return self._probe_with_ffmpeg(source)
+        command = [
+            self.ffprobe_path,
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration,format_name:"
+            "stream=codec_type,codec_name,width,height",
+            "-of",
+            "json",
+            str(source),
+        ]
+        try:
+            output = subprocess.run(
+                command,
+                capture_output=True,
+                check=True,
+                timeout=self.timeout_seconds,
+            ).stdout
+            return self.parse_probe(json.loads(output))
+        except Exception as e:
+            probe_error = f"Failed to probe video: {source}"
+            raise RuntimeError(probe_error) from e
+
+    def _probe_with_ffmpeg(self, source: Path | str) -> MediaProbe:
+        # Without an output, ffmpeg prints the input summary and fails
+        command = [self.ffmpeg_path, "-hide_banner", "-i", str(source)]
+        try:
+            error_output = subprocess.run(
+                command,
+                capture_output=True,
+                check=False,
+                timeout=self.timeout_seconds,
+            ).stderr.decode(errors="replace")
+            return self.parse_ffmpeg_summary(error_output)
+        except Exception as e:
+            probe_error = f"Failed to probe video: {source}"
+            raise RuntimeError(probe_error) from e
+
+    @classmethod
+    def parse_ffmpeg_summary(cls, summary: str) -> MediaProbe:
+        """Parse the input summary `ffmpeg -i` prints to stderr.
+
+        :raises ValueError: if the summary has no video stream
+        """
+        format_match = cls._FORMAT_PATTERN.search(summary)
+        duration_match = cls._DURATION_PATTERN.search(summary)
+        video_match = cls._VIDEO_PATTERN.search(summary)
+        if format_match is None or duration_match is None or not video_match:
+            summary_error = "No video stream in ffmpeg summary"
+            raise ValueError(summary_error)
+        audio_match = cls._AUDIO_PATTERN.search(summary)
+        hours, minutes, seconds = duration_match.groups()
+        return MediaProbe(
+            width=int(video_match.group(2)),
+            height=int(video_match.group(3)),
+            duration=int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+            video_codec=video_match.group(1),
+            audio_codec=audio_match.group(1) if audio_match else None,
+            format_name=format_match.group(1),
+        )
+
+    @staticmethod
+    def parse_probe(probe_json: dict) -> MediaProbe:
+        streams = probe_json.get("streams", [])
+        video_stream = next(
+            stream
+            for stream in streams
+            if stream.get("codec_type") == "video"
+        )
+        audio_stream = next(
+            (
+                stream
+                for stream in streams
+                if stream.get("codec_type") == "audio"
+            ),
+            None,
+        )
+        return MediaProbe(
+            width=int(video_stream["width"]),
+            height=int(video_stream["height"]),
+            duration=float(probe_json["format"]["duration"]),
+            video_codec=video_stream["codec_name"],
+            audio_codec=audio_stream["codec_name"] if audio_stream else None,
+            format_name=probe_json["format"]["format_name"],
+        )
+
+    def plan(self, probe: MediaProbe) -> ConversionPlan:
+        compatible_codecs = probe.video_codec in self._VIDEO_CODECS and (
+            probe.audio_codec is None
+            or probe.audio_codec in self._AUDIO_CODECS
+        )
+        if probe.height <= probe.width:
+            return ConversionPlan(
+                action=ConversionActionEnum.REENCODE,
+                probe=probe,
+                reason=f"source is {probe.width}x{probe.height}",
+            )
+        if not compatible_codecs:
+            return ConversionPlan(
+                action=ConversionActionEnum.REENCODE,
+                probe=probe,
+                reason=(
+                    f"codecs {probe.video_codec}/{probe.audio_codec} "
+                    "aren't supported"
+                ),
+            )
+        if self._MP4_FORMATS.isdisjoint(probe.format_name.split(",")):
+            return ConversionPlan(
+                action=ConversionActionEnum.REMUX,
+                probe=probe,
+                reason=f"container {probe.format_name} isn't MP4",
+            )
+        return ConversionPlan(
+            action=ConversionActionEnum.PASS_THROUGH,
+            probe=probe,
+            reason="source is already vertical",
+        )
+
+    def execute(
+        self,
+        plan: ConversionPlan,
+        source: Path | str,
+        output_path: Path,
+        encode_settings: EncodeSettings | None = None,
+    ) -> Path:
+        """Carry out the plan.
+
+        Passing through returns the source itself, stream URLs are
+        remuxed instead so the result is always a local file.
+        Re-encodes target `encode_settings`, the planner's own by
+        default.
+        """
+        encode_settings = encode_settings or self.encode_settings
+        self.logger.log(
+            f"Conversion plan: {plan.action.value} ({plan.reason})",
+        )
+        if plan.action == ConversionActionEnum.PASS_THROUGH and isinstance(
+            source,
+            Path,
+        ):
+            return source
+        if (
+            plan.action == ConversionActionEnum.REENCODE
+            and encode_settings is not None
+        ):
+            return self._execute_targeted(
+                plan,
+                source,
+                output_path,
+                encode_settings,
+            )
+        if plan.action == ConversionActionEnum.REENCODE:
+            codec_arguments = [
+                "-vf",
+                self._get_letterbox_filter(),
+                "-c:v",
+                "libx264",
+                "-preset",
+                "veryfast",
+                "-crf",
+                "20",
+                "-pix_fmt",
+                "yuv420p",
+                "-c:a",
+                "copy" if plan.probe.audio_codec == "aac" else "aac",
+            ]
+        else:
+            codec_arguments = ["-c", "copy"]
+        command = [
+            self.ffmpeg_path,
+            "-y",
+            "-v",
+            "error",
+            "-i",
+            str(source),
+            *codec_arguments,
+            "-movflags",
+            "+faststart",
+            str(output_path),
+        ]
+        try:
+            CpuMeter.run(command, timeout_seconds=self.timeout_seconds)
+        except Exception as e:
+            Path(output_path).unlink(missing_ok=True)
+            conversion_error = f"Failed to {plan.action.value} video: {source}"
+            raise RuntimeError(conversion_error) from e
+        return Path(output_path)
+
+    def _get_letterbox_filter(self) -> str:
+        width, height = self.size
+        return (
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease"
+            ":force_divisible_by=2,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=black,"
+            "setsar=1"
+        )
+
+    def _execute_targeted(
+        self,
+        plan: ConversionPlan,
+        source: Path | str,
+        output_path: Path,
+        encode_settings: EncodeSettings,
+    ) -> Path:
+        try:
+            _, audio_bitrate = VerticalVideoConverter.get_bitrates(
+                encode_settings,
+                plan.probe.duration,
+            )
+            return VerticalVideoConverter.run_ffmpeg_encode(
+                source=source,
+                output_path=output_path,
+                video_arguments=[
+                    "-vf",
+                    self._get_letterbox_filter(),
+                    *VerticalVideoConverter.get_rate_arguments(
+                        encode_settings,
+                        plan.probe.duration,
+                    ),
+                ],
+                audio_arguments=["-c:a", "aac", "-b:a", str(audio_bitrate)],
+                two_pass=encode_settings.two_pass,
+                ffmpeg_path=self.ffmpeg_path,
+                timeout_seconds=(
+                    encode_settings.timeout_seconds or self.timeout_seconds
+                ),
+            )
+        except Exception as e:
+            Path(output_path).unlink(missing_ok=True)
+            conversion_error = f"Failed to {plan.action.value} video: {source}"
+            raise RuntimeError(conversion_error) from e
@@ -21,7 +21,7 @@ class BaseCookieFormatter(ABC):
 
 class JSONNetScapeFormatter(BaseCookieFormatter):
     def __init__(self, logger: BaseLogger | None = None) -> None:
-        self.logger = logger if logger else Logger()
+        self.logger = (logger if logger else Logger()).get_child("cookies")
 
     def save(
         self,
@@ -110,7 +110,7 @@ class JSONNetScapeFormatter(BaseCookieFormatter):
 
 class StdinNetScapeFormatter(BaseCookieFormatter):
     def __init__(self, logger: BaseLogger | None = None) -> None:
-        self.logger = logger if logger else Logger()
+        self.logger = (logger if logger else Logger()).get_child("cookies")
 
     def save(
         self,
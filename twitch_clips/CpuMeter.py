@@ -0,0 +1,103 @@
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+
+@dataclass
+class CpuUsage:
+    thread_seconds: float = 0.0
+    process_seconds: float = 0.0
+    processes: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return self.thread_seconds + self.process_seconds
+
+
+class CpuMeter:
+    """Measure CPU time spent on behalf of the calling thread.
+
+    `os.times()` and `RUSAGE_CHILDREN` are process-wide, so they bill a
+    measured task for every thread and process running next to it.
+    The meter counts the CPU time of the calling thread and of the
+    processes it runs through `run`, read from `wait4` when they are
+    reaped. Processes started by libraries (e.g. moviepy's ffmpeg
+    writer) aren't counted.
+    """
+
+    _local = threading.local()
+
+    @classmethod
+    def _active_usages(cls) -> list[CpuUsage]:
+        if not hasattr(cls._local, "usages"):
+            cls._local.usages = []
+        return cls._local.usages
+
+    @classmethod
+    @contextmanager
+    def measure(cls) -> Iterator[CpuUsage]:
+        """Measure the wrapped block, usage is filled in on exit."""
+        usage = CpuUsage()
+        active_usages = cls._active_usages()
+        active_usages.append(usage)
+        started_seconds = time.thread_time()
+        try:
+            yield usage
+        finally:
+            usage.thread_seconds = time.thread_time() - started_seconds
+            active_usages.remove(usage)
+
+    @classmethod
+    def run(
+        cls,
+        command: list[str],
+        timeout_seconds: float | None = None,
+    ) -> None:
+        """Run a process to completion, counting its CPU time.
+
+        :raises subprocess.TimeoutExpired: if the process runs past
+            `timeout_seconds`, after killing it
+        :raises subprocess.CalledProcessError: if the process fails
+        """
+        with tempfile.TemporaryFile() as error_file, subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=error_file,
+        ) as process:
+            timed_out = threading.Event()
+
+            def kill() -> None:
+                timed_out.set()
+                process.kill()
+
+            timer = threading.Timer(timeout_seconds or 0, kill)
+            timer.daemon = True
+            if timeout_seconds:
+                timer.start()
+            try:
+                _, status, rusage = os.wait4(process.pid, 0)
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                timer.cancel()
+            process.returncode = os.waitstatus_to_exitcode(status)
+            for usage in cls._active_usages():
+                usage.process_seconds += rusage.ru_utime + rusage.ru_stime
+                usage.processes += 1
+            if timed_out.is_set() and process.returncode < 0:
+                raise subprocess.TimeoutExpired(command, timeout_seconds)
+            if process.returncode != 0:
+                error_file.seek(0)
+                raise subprocess.CalledProcessError(
+                    process.returncode,
+                    command,
+                    stderr=error_file.read(),
+                )
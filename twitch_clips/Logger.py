@@ -1,18 +1,49 @@
+import json
+import queue
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum, IntEnum
+from pathlib import Path
+from typing import TextIO
+
+
+class LogLevelEnum(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
 
 
 class BaseLogger(ABC):
     @abstractmethod
-    def log(self, message: str) -> None:
+    def log(self, message: str, level: LogLevelEnum | None = None) -> None:
         """Log message.
 
         :param message: message to be logged
         :type message: str
+        :param level: severity of the message, INFO by default
+        :type level: LogLevelEnum | None
 
         :returns: None
         :rtype: None
         """
 
+    def get_child(self, component: str) -> "BaseLogger":  # noqa: ARG002
+        """Get logger bound to a pipeline component.
+
+        Loggers without component support return themselves.
+
+        :param component: component name (e.g. "downloader")
+        :type component: str
+
+        :returns: logger bound to the component
+        :rtype: BaseLogger
+        """
+        return self
+
 
 class Logger(BaseLogger):
     def __init__(self, debug_mode: bool | None = None) -> None:
@@ -20,6 +51,213 @@ class Logger(BaseLogger):
             debug_mode = True
         self.debug_mode = debug_mode
 
-    def log(self, message: str) -> None:
+    def log(self, message: str, level: LogLevelEnum | None = None) -> None:
         if self.debug_mode:
-            print(f"[INFO] {message[:1].upper()}{message[1:]}")
+            level = LogLevelEnum.INFO if level is None else level
+            print(f"[{level.name}] {message[:1].upper()}{message[1:]}")
+
+
+class DropPolicyEnum(str, Enum):
+    DROP_NEWEST = "drop_newest"
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+
+
+@dataclass
+class RotatingFileSettings:
+    file_path: Path
+    max_bytes: int | None = None
+    backup_count: int | None = None
+
+
+class _RotatingFileSink:
+    def __init__(self, settings: RotatingFileSettings) -> None:
+        self.file_path = settings.file_path
+        self.max_bytes = settings.max_bytes or 10 * 1024 * 1024
+        self.backup_count = (
+            5 if settings.backup_count is None else settings.backup_count
+        )
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = Path.open(self.file_path, "a", encoding="utf-8")
+        self.size = self.file_path.stat().st_size
+
+    def write(self, data: str) -> None:
+        encoded_size = len(data.encode("utf-8"))
+        if self.size and self.size + encoded_size > self.max_bytes:
+            self._rotate()
+        self.file.write(data)
+        self.size += encoded_size
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def _rotate(self) -> None:
+        self.file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = Path(f"{self.file_path}.{index}")
+                if source.exists():
+                    source.replace(Path(f"{self.file_path}.{index + 1}"))
+            self.file_path.replace(Path(f"{self.file_path}.1"))
+        else:
+            self.file_path.unlink(missing_ok=True)
+        self.file = Path.open(self.file_path, "a", encoding="utf-8")
+        self.size = 0
+
+
+class JsonLinesLogger(BaseLogger):
+    """Queue-backed logger writing JSON lines from a background thread.
+
+    Callers only enqueue a record, formatting and I/O happen in the
+    writer thread. When the queue is full, records are handled by
+    `drop_policy` and counted in `dropped_count`. Children of component
+    loggers log under dotted paths (e.g. "tenant.pipeline"), kept when
+    any of their parts is in `components`.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        level: LogLevelEnum | None = None,
+        components: list[str] | None = None,
+        file_settings: RotatingFileSettings | None = None,
+        stream: TextIO | None = None,
+        queue_size: int | None = None,
+        drop_policy: DropPolicyEnum | None = None,
+    ) -> None:
+        self.level = level if level is not None else LogLevelEnum.INFO
+        self.components = set(components) if components else None
+        self.drop_policy = drop_policy or DropPolicyEnum.DROP_NEWEST
+        self.dropped_count = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or 10000)
+        self._drop_lock = threading.Lock()
+        self._sinks: list[TextIO | _RotatingFileSink] = []
+        if file_settings is not None:
+            self._sinks.append(_RotatingFileSink(file_settings))
+        if stream is not None or file_settings is None:
+            self._sinks.append(stream or sys.stdout)
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            name="JsonLinesLogger",
+            daemon=True,
+        )
+        self._writer.start()
+
+    def get_child(self, component: str) -> BaseLogger:
+        return _ComponentLogger(parent=self, component=component)
+
+    def log(
+        self,
+        message: str,
+        level: LogLevelEnum | None = None,
+        component: str | None = None,
+    ) -> None:
+        level = LogLevelEnum.INFO if level is None else level
+        if self._closed or level < self.level:
+            return
+        if self.components is not None and (
+            component is None
+            or self.components.isdisjoint(component.split("."))
+        ):
+            return
+        self._enqueue((time.time(), level, component, message))
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flush queued records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._writer.join(timeout)
+        for sink in self._sinks:
+            if isinstance(sink, _RotatingFileSink):
+                sink.close()
+
+    def _enqueue(self, record: tuple) -> None:
+        if self.drop_policy == DropPolicyEnum.BLOCK:
+            self._queue.put(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        with self._drop_lock:
+            self.dropped_count += 1
+            if self.drop_policy == DropPolicyEnum.DROP_NEWEST:
+                return
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                pass
+
+    def _write_loop(self) -> None:
+        while True:
+            records = [self._queue.get()]
+            while len(records) < 512:  # noqa: PLR2004
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is self._STOP for record in records)
+            lines = [
+                self._format(record)
+                for record in records
+                if record is not self._STOP
+            ]
+            if lines:
+                self._write(lines)
+            if stop:
+                return
+
+    def _write(self, lines: list[str]) -> None:
+        for sink in self._sinks:
+            try:
+                if isinstance(sink, _RotatingFileSink):
+                    for line in lines:
+                        sink.write(line)
+                else:
+                    sink.write("".join(lines))
+                sink.flush()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _format(record: tuple) -> str:
+        timestamp, level, component, message = record
+        return (
+            json.dumps(
+                {
+                    "ts": round(timestamp, 6),
+                    "level": level.name,
+                    "component": component,
+                    "message": message,
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+        )
+
+
+class _ComponentLogger(BaseLogger):
+    def __init__(self, parent: JsonLinesLogger, component: str) -> None:
+        self.parent = parent
+        self.component = component
+
+    def get_child(self, component: str) -> BaseLogger:
+        return _ComponentLogger(
+            parent=self.parent,
+            component=f"{self.component}.{component}",
+        )
+
+    def log(self, message: str, level: LogLevelEnum | None = None) -> None:
+        self.parent.log(message, level=level, component=self.component)
@@ -0,0 +1,218 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+from .AdaptiveConcurrencyLimiter import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencySettings,
+)
+from .BandwidthLimiter import BandwidthLimiter, BandwidthSettings
+from .BaseYoutubeUploader import BaseUploader, PublishSchedule
+from .ChannelPollScheduler import ChannelPollScheduler
+from .ChannelUploadsIndex import ChannelUploadsIndex
+from .ClipCostModel import BudgetKindEnum, ClipCostModel, RunBudget
+from .ClipHistoryStore import ClipHistoryStore
+from .ConversionPlanner import ConversionPlanner
+from .Logger import BaseLogger, Logger, LogLevelEnum
+from .RetryPolicy import RetryPolicy
+from .TitleIndex import MinHashTitleIndex
+from .TwitchClipsDownloader import ClipsDiscoveryCache, TwitchData
+from .TwitchClipsToYoutube import (
+    CustomVideoMetadata,
+    SharedResources,
+    StreamingSettings,
+    TwitchClipsToYoutube,
+)
+from .VerticalVideoConverter import EncodeSettings, VerticalModeEnum
+from .VideoFingerprintIndex import VideoFingerprintIndex
+from .YoutubeUploaderViaCookies import CookiesUploaderSettings
+
+
+@dataclass
+class TenantConfig:
+    name: str
+    max_videos_to_upload: int
+    twitch_data: TwitchData
+    cookies_settings: CookiesUploaderSettings | None = None
+    uploader: BaseUploader | None = None
+    custom_metadata: CustomVideoMetadata | None = None
+    vertical_mode: VerticalModeEnum | None = None
+    streaming_settings: StreamingSettings | None = None
+    fingerprint_index: VideoFingerprintIndex | None = None
+    title_index: MinHashTitleIndex | None = None
+    publish_schedule: PublishSchedule | None = None
+    uploads_index: ChannelUploadsIndex | None = None
+    conversion_planner: ConversionPlanner | None = None
+    poll_scheduler: ChannelPollScheduler | None = None
+    encode_settings: EncodeSettings | None = None
+    clip_history: ClipHistoryStore | None = None
+    cost_model: ClipCostModel | None = None
+    run_budget: RunBudget | None = None
+
+
+@dataclass
+class TenantResult:
+    name: str
+    posted_videos: int
+    error: Exception | None = None
+
+
+class MultiTenantRunner:
+    """Run pipelines of many YouTube channels in one process.
+
+    Tenants share the clips listing cache, the download and conversion
+    slots, the Twitch circuit breakers and the bandwidth limits.
+    Given concurrency settings, download and conversion slots adapt
+    to throughput and overload, up to `max_parallel_downloads` and
+    `max_parallel_conversions`.
+    Uploaders, used titles, dedup indexes, clips folders and upload
+    limits stay per tenant.
+    """
+
+    def __init__(
+        self,
+        tenants: list[TenantConfig],
+        max_parallel_tenants: int | None = None,
+        max_parallel_downloads: int | None = None,
+        max_parallel_conversions: int | None = None,
+        logger: BaseLogger | None = None,
+        download_bandwidth: BandwidthSettings | None = None,
+        upload_bandwidth: BandwidthSettings | None = None,
+        download_concurrency: ConcurrencySettings | None = None,
+        conversion_concurrency: ConcurrencySettings | None = None,
+    ) -> None:
+        clips_folders = [
+            tenant.twitch_data.clips_folder_path.resolve()
+            for tenant in tenants
+        ]
+        if len(set(clips_folders)) != len(clips_folders):
+            clips_folder_error = "Every tenant must have its own clips folder"
+            raise ValueError(clips_folder_error)
+        tenant_names = [tenant.name for tenant in tenants]
+        if len(set(tenant_names)) != len(tenant_names):
+            tenant_name_error = "Tenant names must be unique"
+            raise ValueError(tenant_name_error)
+        if len(tenants) > 1 and any(
+            tenant.run_budget is not None
+            and tenant.run_budget.kind == BudgetKindEnum.CPU
+            for tenant in tenants
+        ):
+            # Process CPU time would bill every tenant for all of them
+            cpu_budget_error = "CPU run budgets need a single tenant"
+            raise ValueError(cpu_budget_error)
+        self.tenants = tenants
+        self.max_parallel_tenants = max_parallel_tenants or 4
+        self._logger = logger if logger else Logger()
+        self.logger = self._logger.get_child("runner")
+        self.shared_resources = SharedResources(
+            clips_cache=ClipsDiscoveryCache(),
+            download_slots=self._create_slots(
+                max_parallel=max_parallel_downloads or 4,
+                settings=download_concurrency,
+                name="downloads",
+            ),
+            conversion_slots=self._create_slots(
+                max_parallel=max_parallel_conversions or 2,
+                settings=conversion_concurrency,
+                name="conversions",
+            ),
+            retry_policy=RetryPolicy(logger=self.logger),
+            download_bandwidth=(
+                BandwidthLimiter(
+                    settings=download_bandwidth,
+                    name="downloads",
+                    logger=self.logger,
+                )
+                if download_bandwidth is not None
+                else None
+            ),
+            upload_bandwidth=(
+                BandwidthLimiter(
+                    settings=upload_bandwidth,
+                    name="uploads",
+                    logger=self.logger,
+                )
+                if upload_bandwidth is not None
+                else None
+            ),
+        )
+
+    def _create_slots(
+        self,
+        max_parallel: int,
+        settings: ConcurrencySettings | None,
+        name: str,
+    ) -> threading.Semaphore | AdaptiveConcurrencyLimiter:
+        if settings is None:
+            return threading.BoundedSemaphore(max_parallel)
+        return AdaptiveConcurrencyLimiter(
+            settings=replace(
+                settings,
+                max_limit=settings.max_limit or max_parallel,
+            ),
+            name=name,
+            logger=self.logger,
+        )
+
+    def _create_pipeline(self, tenant: TenantConfig) -> TwitchClipsToYoutube:
+        return TwitchClipsToYoutube(
+            max_videos_to_upload=tenant.max_videos_to_upload,
+            twitch_data=tenant.twitch_data,
+            cookies_settings=tenant.cookies_settings,
+            custom_metadata=tenant.custom_metadata,
+            logger=self._logger.get_child(tenant.name),
+            vertical_mode=tenant.vertical_mode,
+            streaming_settings=tenant.streaming_settings,
+            fingerprint_index=tenant.fingerprint_index,
+            title_index=tenant.title_index,
+            uploader=tenant.uploader,
+            use_stdin_cookies=False,
+            shared_resources=self.shared_resources,
+            publish_schedule=tenant.publish_schedule,
+            uploads_index=tenant.uploads_index,
+            conversion_planner=tenant.conversion_planner,
+            poll_scheduler=tenant.poll_scheduler,
+            encode_settings=tenant.encode_settings,
+            clip_history=tenant.clip_history,
+            cost_model=tenant.cost_model,
+            run_budget=tenant.run_budget,
+        )
+
+    def _run_tenant(self, tenant: TenantConfig) -> TenantResult:
+        self.logger.log(f"Running tenant {tenant.name}...")
+        try:
+            pipeline = self._create_pipeline(tenant)
+        except Exception as e:
+            self.logger.log(
+                f"Failed to initialize tenant {tenant.name}: {e}",
+                level=LogLevelEnum.ERROR,
+            )
+            return TenantResult(name=tenant.name, posted_videos=0, error=e)
+        try:
+            posted_videos = pipeline.run()
+            self.logger.log(
+                f"Tenant {tenant.name} is done! "
+                f"({posted_videos} videos posted)",
+            )
+            return TenantResult(name=tenant.name, posted_videos=posted_videos)
+        except Exception as e:
+            self.logger.log(
+                f"Tenant {tenant.name} failed: {e}",
+                level=LogLevelEnum.ERROR,
+            )
+            return TenantResult(name=tenant.name, posted_videos=0, error=e)
+        finally:
+            try:
+                pipeline.close_session()
+            except Exception as e:
+                self.logger.log(
+                    f"Failed to close session of tenant {tenant.name}: {e}",
+                    level=LogLevelEnum.WARNING,
+                )
+
+    def run(self) -> list[TenantResult]:
+        with ThreadPoolExecutor(
+            max_workers=self.max_parallel_tenants,
+            thread_name_prefix="tenant",
+        ) as executor:
+            return list(executor.map(self._run_tenant, self.tenants))
@@ -0,0 +1,323 @@
+import asyncio
+import random
+import subprocess
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+from .Logger import BaseLogger, Logger, LogLevelEnum
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after consecutive failures.
+
+    After `failure_threshold` failures in a row the circuit opens and
+    calls fail fast. Once `reset_timeout` passes, a single trial call is
+    let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+    ) -> None:
+        self.failure_threshold = failure_threshold or 5
+        self.reset_timeout = 60 if reset_timeout is None else reset_timeout
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if (
+                self._trial_in_progress
+                or time.monotonic() - self._opened_at < self.reset_timeout
+            ):
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def cancel_trial(self) -> None:
+        """Let another call try the circuit after a cancelled trial."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if (
+                self._trial_in_progress
+                or self.failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+            self._trial_in_progress = False
+
+
+class RetryPolicy:
+    """Retry operations with exponential backoff and full jitter.
+
+    Delays are drawn from `[0, min(max_delay, base_delay * 2**attempt)]`.
+    Retries stop after `max_attempts`, when the next delay would exceed
+    the operation deadline, or on errors rejected by `is_retryable`.
+    Every endpoint gets its own circuit breaker, counting only the
+    failures accepted by `is_transient` (by default the retryable
+    ones), so a clip that can't be downloaded doesn't open the circuit
+    for the others.
+    """
+
+    _TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+    # Error output of processes failing for a reason that may pass
+    _TRANSIENT_OUTPUT_MARKERS = (
+        "timed out",
+        "timeout",
+        "temporarily",
+        "connection",
+        "connecterror",
+        "remoteprotocolerror",
+        "network",
+        "name resolution",
+        "too many requests",
+        "rate limit",
+        "internal server error",
+        "bad gateway",
+        "service unavailable",
+        "gateway timeout",
+    )
+
+    def __init__(
+        self,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        deadline_seconds: float | None = None,
+        is_retryable: Callable[[Exception], bool] | None = None,
+        is_transient: Callable[[Exception], bool] | None = None,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts or 3
+        self.base_delay = 1 if base_delay is None else base_delay
+        self.max_delay = 30 if max_delay is None else max_delay
+        self.deadline_seconds = deadline_seconds
+        self.is_retryable = is_retryable or self.is_retryable_error
+        self.is_transient = is_transient
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.logger = (logger if logger else Logger()).get_child("retry")
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_retryable_error(cls, error: Exception) -> bool:
+        """Treat programming and missing-executable errors as final.
+
+        Failed processes are retried if they were killed by a signal or
+        their error output tells of a network or server failure. Other
+        exit codes are deterministic (e.g. a deleted clip), like HTTP
+        client errors other than timeouts and throttling.
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            return (
+                error.response.status_code in cls._TRANSIENT_STATUS_CODES
+            )
+        if isinstance(error, subprocess.CalledProcessError):
+            return error.returncode < 0 or any(
+                cls._has_transient_marker(output)
+                for output in (error.stderr, error.output)
+            )
+        return not isinstance(
+            error,
+            (
+                CircuitOpenError,
+                FileNotFoundError,
+                PermissionError,
+                NotImplementedError,
+                TypeError,
+                ValueError,
+                KeyError,
+            ),
+        )
+
+    @classmethod
+    def _has_transient_marker(cls, output: bytes | str | None) -> bool:
+        if not output:
+            return False
+        if isinstance(output, bytes):
+            output = output.decode(errors="replace")
+        output = output.lower()
+        return any(
+            marker in output for marker in cls._TRANSIENT_OUTPUT_MARKERS
+        )
+
+    def get_breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(
+                    failure_threshold=self.failure_threshold,
+                    reset_timeout=self.reset_timeout,
+                )
+            return self._breakers[endpoint]
+
+    def get_delay(self, attempt: int) -> float:
+        return random.uniform(
+            0,
+            min(self.max_delay, self.base_delay * 2**attempt),
+        )
+
+    def call(
+        self,
+        endpoint: str,
+        operation: Callable[[], T],
+        deadline_seconds: float | None = None,
+        is_retryable: Callable[[Exception], bool] | None = None,
+        is_transient: Callable[[Exception], bool] | None = None,
+    ) -> T:
+        """Run `operation`, retrying failures.
+
+        :raises CircuitOpenError: if the endpoint circuit is open
+        :raises Exception: the last error of the operation
+        """
+        deadline = self._get_deadline(deadline_seconds)
+        breaker = self.get_breaker(endpoint)
+        attempt = 0
+        while True:
+            self._check_breaker(endpoint, breaker)
+            try:
+                result = operation()
+            except Exception as e:
+                attempt += 1
+                delay = self._get_retry_delay(
+                    endpoint=endpoint,
+                    error=e,
+                    attempt=attempt,
+                    deadline=deadline,
+                    is_retryable=is_retryable,
+                    is_transient=is_transient,
+                )
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    async def acall(
+        self,
+        endpoint: str,
+        operation: Callable[[], Awaitable[T]],
+        deadline_seconds: float | None = None,
+        is_retryable: Callable[[Exception], bool] | None = None,
+        is_transient: Callable[[Exception], bool] | None = None,
+    ) -> T:
+        """Await `operation`, retrying failures like `call`.
+
+        Cancellation is not counted as a failure of the endpoint.
+
+        :raises CircuitOpenError: if the endpoint circuit is open
+        :raises Exception: the last error of the operation
+        """
+        deadline = self._get_deadline(deadline_seconds)
+        breaker = self.get_breaker(endpoint)
+        attempt = 0
+        while True:
+            self._check_breaker(endpoint, breaker)
+            try:
+                result = await operation()
+            except Exception as e:
+                attempt += 1
+                delay = self._get_retry_delay(
+                    endpoint=endpoint,
+                    error=e,
+                    attempt=attempt,
+                    deadline=deadline,
+                    is_retryable=is_retryable,
+                    is_transient=is_transient,
+                )
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except asyncio.CancelledError:
+                breaker.cancel_trial()
+                raise
+            breaker.record_success()
+            return result
+
+    def _get_deadline(self, deadline_seconds: float | None) -> float | None:
+        deadline_seconds = (
+            deadline_seconds
+            if deadline_seconds is not None
+            else self.deadline_seconds
+        )
+        return (
+            None
+            if deadline_seconds is None
+            else time.monotonic() + deadline_seconds
+        )
+
+    @staticmethod
+    def _check_breaker(endpoint: str, breaker: CircuitBreaker) -> None:
+        if not breaker.allow():
+            circuit_error = f"Circuit for {endpoint} is open"
+            raise CircuitOpenError(circuit_error)
+
+    def _get_retry_delay(
+        self,
+        endpoint: str,
+        error: Exception,
+        attempt: int,
+        deadline: float | None,
+        is_retryable: Callable[[Exception], bool] | None = None,
+        is_transient: Callable[[Exception], bool] | None = None,
+    ) -> float | None:
+        """Record a failed attempt, `None` if it must not be retried."""
+        breaker = self.get_breaker(endpoint)
+        is_retryable = is_retryable or self.is_retryable
+        is_transient = is_transient or self.is_transient or is_retryable
+        if is_transient(error):
+            breaker.record_failure()
+        else:
+            # The endpoint answered, a trial call may be made again
+            breaker.cancel_trial()
+        if (
+            not is_retryable(error)
+            or attempt >= self.max_attempts
+            or breaker.is_open
+        ):
+            return None
+        delay = self.get_delay(attempt - 1)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self.logger.log(
+                f"Deadline of {endpoint} exceeded after {attempt} attempts",
+                level=LogLevelEnum.WARNING,
+            )
+            return None
+        self.logger.log(
+            f"{endpoint} failed ({error}). Retrying in {delay:.1f}s... "
+            f"Attempt: {attempt + 1}/{self.max_attempts}",
+            level=LogLevelEnum.WARNING,
+        )
+        return delay
@@ -0,0 +1,240 @@
+import cProfile
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from types import FrameType
+from typing import Iterator
+
+from .Logger import BaseLogger, Logger
+
+
+class ProfilerModeEnum(str, Enum):
+    SAMPLING = "sampling"
+    DETERMINISTIC = "deterministic"
+
+
+@dataclass
+class ProfilingSettings:
+    output_folder_path: Path
+    mode: ProfilerModeEnum | None = None
+    sampling_interval: float | None = None
+
+
+class StageProfiler:
+    """Profile named pipeline stages.
+
+    A sampler thread records the call stacks of threads inside a stage
+    and writes them as collapsed stacks (flamegraph.pl / speedscope
+    input), one file per stage run and `stages.collapsed` for all of
+    them with the stage path as root frames. In deterministic mode
+    every stage is also profiled with cProfile into a `.prof` file,
+    excluding the time of nested stages.
+    """
+
+    ENV_FOLDER_VARIABLE = "TWITCH_CLIPS_PROFILE_DIR"
+    ENV_MODE_VARIABLE = "TWITCH_CLIPS_PROFILE_MODE"
+
+    def __init__(
+        self,
+        settings: ProfilingSettings,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.mode = settings.mode or ProfilerModeEnum.SAMPLING
+        self.sampling_interval = settings.sampling_interval or 0.005
+        self.logger = (logger if logger else Logger()).get_child("profiler")
+        settings.output_folder_path.mkdir(parents=True, exist_ok=True)
+        self.output_folder_path = Path(
+            tempfile.mkdtemp(
+                prefix=f"{time.strftime('%Y%m%d-%H%M%S')}-",
+                dir=settings.output_folder_path,
+            ),
+        )
+        self._lock = threading.Lock()
+        self._stage_count = 0
+        self._stage_paths: dict[int, list[str]] = {}
+        self._profilers: dict[int, list[cProfile.Profile | None]] = {}
+        self._stage_samples: dict[tuple[int, int], Counter] = {}
+        self._active_stage_ids: dict[int, list[int]] = {}
+        self._total_samples: Counter = Counter()
+        self._sampler: threading.Thread | None = None
+        self._sampler_stop = threading.Event()
+
+    @classmethod
+    def from_environment(
+        cls,
+        logger: BaseLogger | None = None,
+    ) -> "StageProfiler | None":
+        output_folder = os.environ.get(cls.ENV_FOLDER_VARIABLE)
+        if not output_folder:
+            return None
+        mode = os.environ.get(cls.ENV_MODE_VARIABLE)
+        return cls(
+            ProfilingSettings(
+                output_folder_path=Path(output_folder),
+                mode=ProfilerModeEnum(mode) if mode else None,
+            ),
+            logger=logger,
+        )
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._stage_count += 1
+            stage_id = self._stage_count
+            stage_path = [*self._stage_paths.get(thread_id, []), name]
+            self._stage_paths[thread_id] = stage_path
+            self._active_stage_ids.setdefault(thread_id, []).append(stage_id)
+            self._stage_samples[(thread_id, stage_id)] = Counter()
+            self._start_sampler()
+        profiler = self._start_profiler(thread_id)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self._stop_profiler(thread_id, profiler, stage_id, stage_path)
+            with self._lock:
+                self._stage_paths[thread_id] = stage_path[:-1]
+                self._active_stage_ids[thread_id].pop()
+                samples = self._stage_samples.pop((thread_id, stage_id))
+            self._write_collapsed(
+                self._stage_file_path(stage_id, stage_path, ".collapsed"),
+                samples,
+            )
+            self.logger.log(
+                f"Stage {'/'.join(stage_path)} took {elapsed:.3f}s",
+            )
+
+    def _stage_file_path(
+        self,
+        stage_id: int,
+        stage_path: list[str],
+        suffix: str,
+    ) -> Path:
+        return self.output_folder_path / (
+            f"{stage_id:04d}_{'.'.join(stage_path)}{suffix}"
+        )
+
+    def _start_profiler(self, thread_id: int) -> cProfile.Profile | None:
+        if self.mode != ProfilerModeEnum.DETERMINISTIC:
+            return None
+        profilers = self._profilers.setdefault(thread_id, [])
+        if profilers and profilers[-1] is not None:
+            profilers[-1].disable()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Only one profiler may be active at once on Python 3.12+
+            self.logger.log(f"Deterministic profiling unavailable: {e}")
+            profiler = None
+        profilers.append(profiler)
+        return profiler
+
+    def _stop_profiler(
+        self,
+        thread_id: int,
+        profiler: cProfile.Profile | None,
+        stage_id: int,
+        stage_path: list[str],
+    ) -> None:
+        if self.mode != ProfilerModeEnum.DETERMINISTIC:
+            return
+        profilers = self._profilers[thread_id]
+        profilers.pop()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(
+                self._stage_file_path(stage_id, stage_path, ".prof"),
+            )
+        if profilers and profilers[-1] is not None:
+            try:
+                profilers[-1].enable()
+            except ValueError:
+                profilers[-1] = None
+
+    def _start_sampler(self) -> None:
+        if self._sampler is not None:
+            return
+        self._sampler = threading.Thread(
+            target=self._sample_loop,
+            name="StageProfiler",
+            daemon=True,
+        )
+        self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        sampler_thread_id = threading.get_ident()
+        while not self._sampler_stop.wait(self.sampling_interval):
+            # Frames are taken with the stages they belong to, stacks
+            # are collapsed without blocking threads entering stages
+            with self._lock:
+                frames = sys._current_frames()
+                active_frames = [
+                    (
+                        (thread_id, stage_ids[-1]),
+                        self._stage_paths[thread_id],
+                        frames[thread_id],
+                    )
+                    for thread_id, stage_ids in self._active_stage_ids.items()
+                    if stage_ids
+                    and thread_id in frames
+                    and thread_id != sampler_thread_id
+                ]
+            del frames
+            stacks = [
+                (stage_key, stage_path, self._collapse_stack(frame))
+                for stage_key, stage_path, frame in active_frames
+            ]
+            del active_frames
+            with self._lock:
+                for stage_key, stage_path, stack in stacks:
+                    stage_samples = self._stage_samples.get(stage_key)
+                    if stage_samples is None:
+                        continue
+                    stage_samples[stack] += 1
+                    self._total_samples[";".join([*stage_path, stack])] += 1
+
+    @staticmethod
+    def _collapse_stack(frame: FrameType | None) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(
+                f"{code.co_name} ({Path(code.co_filename).name}:"
+                f"{code.co_firstlineno})".replace(";", ","),
+            )
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+    @staticmethod
+    def _write_collapsed(path: Path, samples: Counter) -> None:
+        if not samples:
+            return
+        with Path.open(path, "w", encoding="utf-8") as file:
+            file.writelines(
+                f"{stack} {count}\n" for stack, count in samples.items()
+            )
+
+    def write_summary(self) -> Path:
+        """Write collapsed stacks of all stages profiled so far."""
+        summary_path = self.output_folder_path / "stages.collapsed"
+        with self._lock:
+            samples = Counter(self._total_samples)
+        self._write_collapsed(summary_path, samples)
+        self.logger.log(f"Profiles written to {self.output_folder_path}")
+        return summary_path
+
+    def close(self) -> None:
+        self._sampler_stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.write_summary()
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class ThreadWorkTracker:
+    """Track work that outlives the cancellation of its awaiting task.
+
+    A cancelled `asyncio.to_thread` call keeps running in its worker
+    thread, so files it writes can't be cleaned up until it returns.
+    Tracked work is shielded: cancelling the caller leaves it running
+    until `wait` sees it finish.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Future] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        task.add_done_callback(self._discard)
+        return await asyncio.shield(task)
+
+    async def to_thread(
+        self,
+        function: Callable[..., T],
+        /,
+        *args: object,
+        **kwargs: object,
+    ) -> T:
+        return await self.run(asyncio.to_thread(function, *args, **kwargs))
+
+    def _discard(self, task: asyncio.Future) -> None:
+        self._tasks.discard(task)
+        # Callers get the error, it's dropped once they were cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def wait(self) -> None:
+        """Wait until all tracked work has finished."""
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
@@ -0,0 +1,202 @@
+import json
+import random
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from .Logger import BaseLogger, Logger
+
+
+class MinHashTitleIndex:
+    """Near-duplicate title index based on MinHash and LSH banding.
+
+    Titles are normalized and split into character shingles. Their
+    MinHash signatures are cut into bands and every band is hashed into
+    a bucket, so a lookup only compares titles sharing a bucket. The
+    candidates are confirmed with the exact Jaccard similarity of their
+    shingles. Entries are appended to `index_path` as JSON lines.
+    """
+
+    _PRIME = (1 << 31) - 1
+    _SEED = 20240101
+
+    def __init__(
+        self,
+        index_path: Path | None = None,
+        threshold: float | None = None,
+        num_permutations: int | None = None,
+        shingle_size: int | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.index_path = index_path
+        self.threshold = 0.7 if threshold is None else threshold
+        if not 0 < self.threshold <= 1:
+            threshold_error = "Similarity threshold must be in (0, 1]"
+            raise ValueError(threshold_error)
+        self.num_permutations = num_permutations or 64
+        self.shingle_size = shingle_size or 3
+        self.logger = (logger if logger else Logger()).get_child("titles")
+        self.bands, self.rows = self._choose_bands(
+            threshold=self.threshold,
+            num_permutations=self.num_permutations,
+        )
+        generator = random.Random(self._SEED)
+        self._multipliers = np.array(
+            [
+                generator.randrange(1, self._PRIME)
+                for _ in range(self.bands * self.rows)
+            ],
+            dtype=np.uint64,
+        )[:, None]
+        self._increments = np.array(
+            [
+                generator.randrange(0, self._PRIME)
+                for _ in range(self.bands * self.rows)
+            ],
+            dtype=np.uint64,
+        )[:, None]
+        self._titles: list[str] = []
+        self._normalized_titles: set[str] = set()
+        self._buckets: list[dict[int, list[int]]] = [
+            {} for _ in range(self.bands)
+        ]
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @staticmethod
+    def _choose_bands(
+        threshold: float,
+        num_permutations: int,
+    ) -> tuple[int, int]:
+        """Pick the banding whose S-curve midpoint is nearest threshold."""
+        return min(
+            (
+                (bands, num_permutations // bands)
+                for bands in range(1, num_permutations + 1)
+            ),
+            key=lambda banding: abs(
+                (1 / banding[0]) ** (1 / banding[1]) - threshold,
+            ),
+        )
+
+    @staticmethod
+    def normalize(title: str) -> str:
+        return " ".join(re.sub(r"[\W_]+", " ", title.lower()).split())
+
+    def _shingles(self, normalized_title: str) -> set[str]:
+        if len(normalized_title) <= self.shingle_size:
+            return {normalized_title}
+        return {
+            normalized_title[position : position + self.shingle_size]
+            for position in range(
+                len(normalized_title) - self.shingle_size + 1,
+            )
+        }
+
+    def _band_keys(self, shingles: set[str]) -> list[int]:
+        shingle_hashes = np.array(
+            [
+                zlib.crc32(shingle.encode("utf-8")) % self._PRIME
+                for shingle in shingles
+            ],
+            dtype=np.uint64,
+        )[None, :]
+        signature = (
+            (self._multipliers * shingle_hashes + self._increments)
+            % self._PRIME
+        ).min(axis=1)
+        return [
+            zlib.crc32(band_signature.tobytes())
+            for band_signature in signature.reshape(self.bands, self.rows)
+        ]
+
+    def _jaccard(self, first: set[str], second: set[str]) -> float:
+        return len(first & second) / len(first | second)
+
+    def _insert(self, normalized_title: str, band_keys: list[int]) -> None:
+        position = len(self._titles)
+        self._titles.append(normalized_title)
+        self._normalized_titles.add(normalized_title)
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(position)
+
+    def _load(self) -> None:
+        if self.index_path is None or not self.index_path.exists():
+            return
+        with Path.open(self.index_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if len(entry.get("bands", [])) == self.bands:
+                    self._insert(entry["title"], entry["bands"])
+                else:
+                    self._insert(
+                        entry["title"],
+                        self._band_keys(self._shingles(entry["title"])),
+                    )
+        self.logger.log(f"Loaded {len(self._titles)} indexed titles")
+
+    def find_similar(self, title: str) -> str | None:
+        """Get an indexed title similar to `title`, if any."""
+        normalized_title = self.normalize(title)
+        if not normalized_title:
+            return None
+        if normalized_title in self._normalized_titles:
+            return normalized_title
+        shingles = self._shingles(normalized_title)
+        candidates = set()
+        for buckets, band_key in zip(
+            self._buckets,
+            self._band_keys(shingles),
+        ):
+            candidates.update(buckets.get(band_key, ()))
+        for position in candidates:
+            candidate = self._titles[position]
+            if (
+                self._jaccard(shingles, self._shingles(candidate))
+                >= self.threshold
+            ):
+                return candidate
+        return None
+
+    def add(self, title: str) -> None:
+        self.sync([title])
+
+    def sync(self, titles: list[str]) -> None:
+        """Index titles that are not indexed yet (e.g. used titles)."""
+        new_entries = []
+        for title in titles:
+            normalized_title = self.normalize(title)
+            if (
+                not normalized_title
+                or normalized_title in self._normalized_titles
+            ):
+                continue
+            band_keys = self._band_keys(self._shingles(normalized_title))
+            self._insert(normalized_title, band_keys)
+            new_entries.append(
+                json.dumps(
+                    {"title": normalized_title, "bands": band_keys},
+                    ensure_ascii=False,
+                )
+                + "\n",
+            )
+        if self.index_path is not None and new_entries:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with Path.open(self.index_path, "a", encoding="utf-8") as file:
+                file.writelines(new_entries)
+
+    def empty_copy(self) -> "MinHashTitleIndex":
+        """Get an empty in-memory index with the same parameters."""
+        return MinHashTitleIndex(
+            threshold=self.threshold,
+            num_permutations=self.num_permutations,
+            shingle_size=self.shingle_size,
+            logger=self.logger,
+        )
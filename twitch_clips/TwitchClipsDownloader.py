@@ -1,14 +1,39 @@
+import asyncio
+import heapq
 import json
 import os
+import signal
 import subprocess
+import threading
+import time
+from contextlib import ExitStack, asynccontextmanager, nullcontext
 from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+from urllib.parse import urlencode
 
 import emoji
+import httpx
+from twitchdl import twitch
 
-from .Logger import BaseLogger, Logger
+from .AdaptiveConcurrencyLimiter import AdaptiveConcurrencyLimiter
+from .BandwidthLimiter import BandwidthLimiter
+from .ChannelPollScheduler import ChannelPollScheduler
+from .ClipsDiskBudget import ClipsDiskBudget
+from .ClipsFolderLock import ClipsFolderLock
+from .Logger import BaseLogger, Logger, LogLevelEnum
+from .RetryPolicy import RetryPolicy
+from .ThreadWorkTracker import ThreadWorkTracker
+from .TitleIndex import MinHashTitleIndex
+
+
+T = TypeVar("T")
+
+
+class TwitchDlTimeoutError(RuntimeError, TimeoutError):
+    pass
 
 
 class PeriodEnum(str, Enum):
@@ -18,6 +43,30 @@ class PeriodEnum(str, Enum):
     ALL = "all"
 
 
+@dataclass
+class QualityTarget:
+    min_height: int
+    min_framerate: int | None = None
+
+
+@dataclass
+class QualityPolicy:
+    """Minimal source renditions per output type.
+
+    `None` keeps the rendition chosen by `generate_clip_info_dcls`.
+    Vertical videos scale the clip to 1080 px width, so a 720p source
+    is enough by default.
+    """
+
+    vertical: QualityTarget | None = field(
+        default_factory=lambda: QualityTarget(
+            min_height=720,
+            min_framerate=30,
+        ),
+    )
+    horizontal: QualityTarget | None = None
+
+
 @dataclass
 class TwitchData:
     channels_urls: list[str]
@@ -26,6 +75,12 @@ class TwitchData:
     clips_per_channel_limit: int | None = None
     unsupported_words_for_title: list[str] | None = None
     used_titles: list[str] | None = None
+    quality_policy: QualityPolicy | None = None
+    clips_folder_budget_bytes: int | None = None
+    clips_timeout_seconds: float | None = None
+    download_timeout_seconds: float | None = None
+    candidates_per_video: int | None = None
+    single_flight_runs: bool | None = None
 
 
 @dataclass
@@ -38,18 +93,81 @@ class ClipInfo:
     broadcaster: str
     quality: str
     framerate: int
+    video_qualities: list[tuple[int, int]] = field(default_factory=list)
+
+
+class ClipsDiscoveryCache:
+    """Thread-safe cache of channel clip listings.
+
+    Concurrent requests for the same listing (or listing page) wait for
+    a single fetch, so tenants sharing channels list each of them once.
+    """
+
+    def __init__(self, ttl_seconds: float | None = None) -> None:
+        self.ttl_seconds = 600 if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._entries: dict[tuple, tuple[float, object]] = {}
+
+    def get_or_fetch(
+        self,
+        key: tuple,
+        fetch: Callable[[], T],
+    ) -> T:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                time.monotonic() - entry[0] < self.ttl_seconds
+            ):
+                return entry[1]
+            clips_json = fetch()
+            self._entries[key] = (time.monotonic(), clips_json)
+            return clips_json
 
 
 class TwitchClipsDownloader:
+    _DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
     def __init__(
         self,
         twitch_urls: list[str],
         clips_folder_path: Path,
         logger: BaseLogger | None = None,
+        quality_policy: QualityPolicy | None = None,
+        disk_budget: ClipsDiskBudget | None = None,
+        clips_cache: ClipsDiscoveryCache | None = None,
+        download_slots: (
+            threading.Semaphore | AdaptiveConcurrencyLimiter | None
+        ) = None,
+        retry_policy: RetryPolicy | None = None,
+        clips_timeout_seconds: float | None = None,
+        download_timeout_seconds: float | None = None,
+        bandwidth_limiter: BandwidthLimiter | None = None,
+        poll_scheduler: ChannelPollScheduler | None = None,
+        folder_lock: ClipsFolderLock | None = None,
     ) -> None:
         self.clips_folder_path = clips_folder_path
-        self.logger = logger if logger else Logger()
+        self.clips_timeout_seconds = clips_timeout_seconds or 120
+        self.download_timeout_seconds = download_timeout_seconds or 300
+        self.quality_policy = quality_policy or QualityPolicy()
+        self.disk_budget = disk_budget
+        self.clips_cache = clips_cache
+        self.download_slots = download_slots
+        self.bandwidth_limiter = bandwidth_limiter
+        self.poll_scheduler = poll_scheduler
+        self.folder_lock = folder_lock
+        self.logger = (logger if logger else Logger()).get_child(
+            "downloader",
+        )
         self.twitch_urls = twitch_urls
+        self.retry_policy = retry_policy or RetryPolicy(logger=self.logger)
+        self._processes: set[subprocess.Popen] = set()
+        self._async_processes: set[asyncio.subprocess.Process] = set()
+        self._processes_lock = threading.Lock()
+        self._cancelled = False
+        self.thread_work = ThreadWorkTracker()
 
     def get_clips(
         self,
@@ -61,23 +179,20 @@ class TwitchClipsDownloader:
         for twitch_url in self.twitch_urls:
             twitch_username = twitch_url.split(r"/")[-1]
             self.logger.log(f"Getting clips from {twitch_username}")
-            command = ["twitch-dl", "clips", twitch_username, "--json"]
-            if clips_limit is None or clips_limit == 0:
-                command.append("--all")
-            else:
-                command.append("--limit")
-                command.append(str(clips_limit))
-
-            if period is None:
-                command.append("--period")
-                command.append("all_time")
-            else:
-                command.append("--period")
-                command.append(period)
+            command = self._get_clips_command(
+                twitch_username,
+                clips_limit,
+                period,
+            )
 
             try:
-                clips_json_str = subprocess.check_output(command)
-                clips_json = json.loads(clips_json_str)
+                if self.clips_cache is not None:
+                    clips_json = self.clips_cache.get_or_fetch(
+                        tuple(command),
+                        lambda command=command: self._fetch_clips(command),
+                    )
+                else:
+                    clips_json = self._fetch_clips(command)
                 for clip_json in clips_json:
                     if clip_json not in all_clips_json:
                         all_clips_json.append(clip_json)
@@ -86,15 +201,625 @@ class TwitchClipsDownloader:
                     f"Failed to parse "
                     f"{'all' if clips_limit is None else clips_limit} "
                     f"clips from {twitch_username}",
+                    level=LogLevelEnum.WARNING,
                 )
-                self.logger.log(str(e))
+                self.logger.log(str(e), level=LogLevelEnum.WARNING)
         self.logger.log(f"Got {len(all_clips_json)} clips")
         return all_clips_json
 
+    @staticmethod
+    def _get_clips_command(
+        twitch_username: str,
+        clips_limit: int | None = None,
+        period: PeriodEnum | None = None,
+    ) -> list[str]:
+        command = ["twitch-dl", "clips", twitch_username, "--json"]
+        if clips_limit is None or clips_limit == 0:
+            command.append("--all")
+        else:
+            command.append("--limit")
+            command.append(str(clips_limit))
+
+        if period is None:
+            command.append("--period")
+            command.append("all_time")
+        else:
+            command.append("--period")
+            command.append(period)
+        return command
+
+    async def aget_clips(
+        self,
+        clips_limit: int | None = None,
+        period: PeriodEnum | None = None,
+    ) -> list[dict]:
+        """List clips of all channels like `get_clips`, concurrently.
+
+        Listings run as asyncio subprocesses and skip the clips cache.
+        """
+        self.logger.log("Getting clips...")
+        twitch_usernames = [
+            twitch_url.split(r"/")[-1] for twitch_url in self.twitch_urls
+        ]
+        results = await asyncio.gather(
+            *(
+                self._afetch_clips(
+                    self._get_clips_command(
+                        twitch_username,
+                        clips_limit,
+                        period,
+                    ),
+                )
+                for twitch_username in twitch_usernames
+            ),
+            return_exceptions=True,
+        )
+        all_clips_json = []
+        for twitch_username, result in zip(twitch_usernames, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                self.logger.log(
+                    f"Failed to parse "
+                    f"{'all' if clips_limit is None else clips_limit} "
+                    f"clips from {twitch_username}",
+                    level=LogLevelEnum.WARNING,
+                )
+                self.logger.log(str(result), level=LogLevelEnum.WARNING)
+                continue
+            for clip_json in result:
+                if clip_json not in all_clips_json:
+                    all_clips_json.append(clip_json)
+        self.logger.log(f"Got {len(all_clips_json)} clips")
+        return all_clips_json
+
+    def iter_channel_clips(
+        self,
+        channel: str,
+        period: PeriodEnum | None = None,
+        clips_limit: int | None = None,
+        page_size: int | None = None,
+    ) -> Iterator[dict]:
+        """Yield clips of a channel, most viewed first.
+
+        Pages are requested by cursor only when the previous page is
+        consumed.
+        """
+        period_name = (
+            "all_time"
+            if period is None or period == PeriodEnum.ALL
+            else PeriodEnum(period).value
+        )
+        page_size = min(page_size or 20, 100)
+        after = None
+        yielded_clips = 0
+        while True:
+            page = self._fetch_clips_page(
+                channel=channel,
+                period=period_name,
+                page_size=page_size,
+                after=after,
+            )
+            for edge in page["edges"]:
+                if clips_limit and yielded_clips >= clips_limit:
+                    return
+                yield edge["node"]
+                yielded_clips += 1
+            if not page["pageInfo"]["hasNextPage"] or not page["edges"]:
+                return
+            after = page["edges"][-1]["cursor"]
+
+    def _fetch_clips_page(
+        self,
+        channel: str,
+        period: str,
+        page_size: int,
+        after: str | None,
+    ) -> dict:
+        def fetch() -> dict:
+            return self.retry_policy.call(
+                endpoint="twitch gql",
+                operation=lambda: twitch.get_channel_clips(
+                    channel,
+                    period,
+                    page_size,
+                    after,
+                ),
+            )
+
+        if self.clips_cache is not None:
+            return self.clips_cache.get_or_fetch(
+                ("clips page", channel, period, page_size, after),
+                fetch,
+            )
+        return fetch()
+
+    def discover_clips(
+        self,
+        clips_limit: int | None = None,
+        period: PeriodEnum | None = None,
+        page_size: int | None = None,
+    ) -> Iterator[ClipInfo]:
+        """Yield clips of all channels, most viewed first.
+
+        Channel listings are merged through a heap holding the next
+        clip of every channel, so a consumer that stops early leaves
+        the remaining pages unfetched. With a poll scheduler only the
+        channels due for a poll are listed, up to their scheduled
+        limits. When the generator is closed, polls of the channels
+        listed to the end or their limit are recorded, and the others
+        stay due.
+        """
+        twitch_urls, clips_limits = self._plan_discovery(clips_limit)
+        listed_clip_ids: list[list[str] | None] = [[] for _ in twitch_urls]
+        is_exhausted = [False] * len(twitch_urls)
+        heap: list[tuple[int, int, dict, Iterator[dict]]] = []
+
+        def push_next_clip(channel_index: int, clips: Iterator[dict]) -> None:
+            try:
+                clip_json = next(clips)
+            except StopIteration:
+                is_exhausted[channel_index] = True
+                return
+            except Exception as e:
+                self.logger.log(
+                    f"Failed to get clips from "
+                    f"{twitch_urls[channel_index]}: {e}",
+                    level=LogLevelEnum.WARNING,
+                )
+                listed_clip_ids[channel_index] = None
+                return
+            listed_clip_ids[channel_index].append(clip_json["id"])
+            heapq.heappush(
+                heap,
+                (-clip_json["viewCount"], channel_index, clip_json, clips),
+            )
+
+        try:
+            for channel_index, twitch_url in enumerate(twitch_urls):
+                push_next_clip(
+                    channel_index,
+                    self.iter_channel_clips(
+                        channel=twitch_url.split(r"/")[-1],
+                        period=period,
+                        clips_limit=clips_limits[channel_index],
+                        page_size=page_size,
+                    ),
+                )
+            seen_clip_ids = set()
+            while heap:
+                _, channel_index, clip_json, clips = heapq.heappop(heap)
+                push_next_clip(channel_index, clips)
+                if clip_json["id"] in seen_clip_ids:
+                    continue
+                seen_clip_ids.add(clip_json["id"])
+                yield self.generate_clip_info_dcls(clip_json)
+        finally:
+            self._record_discovery(
+                twitch_urls,
+                clips_limits,
+                listed_clip_ids,
+                is_exhausted,
+            )
+
+    async def adiscover_clips(
+        self,
+        clips_limit: int | None = None,
+        period: PeriodEnum | None = None,
+        page_size: int | None = None,
+    ) -> AsyncIterator[ClipInfo]:
+        """Yield clips of all channels like `discover_clips`.
+
+        Listing pages are fetched in worker threads, the first page of
+        every channel concurrently.
+        """
+        twitch_urls, clips_limits = self._plan_discovery(clips_limit)
+        listed_clip_ids: list[list[str] | None] = [[] for _ in twitch_urls]
+        is_exhausted = [False] * len(twitch_urls)
+        heap: list[tuple[int, int, dict, AsyncIterator[dict]]] = []
+
+        async def push_next_clip(
+            channel_index: int,
+            clips: AsyncIterator[dict],
+        ) -> None:
+            try:
+                clip_json = await anext(clips)
+            except StopAsyncIteration:
+                is_exhausted[channel_index] = True
+                return
+            except Exception as e:
+                self.logger.log(
+                    f"Failed to get clips from "
+                    f"{twitch_urls[channel_index]}: {e}",
+                    level=LogLevelEnum.WARNING,
+                )
+                listed_clip_ids[channel_index] = None
+                return
+            listed_clip_ids[channel_index].append(clip_json["id"])
+            heapq.heappush(
+                heap,
+                (-clip_json["viewCount"], channel_index, clip_json, clips),
+            )
+
+        try:
+            await asyncio.gather(
+                *(
+                    push_next_clip(
+                        channel_index,
+                        self.aiter_channel_clips(
+                            channel=twitch_url.split(r"/")[-1],
+                            period=period,
+                            clips_limit=clips_limits[channel_index],
+                            page_size=page_size,
+                        ),
+                    )
+                    for channel_index, twitch_url in enumerate(twitch_urls)
+                ),
+            )
+            seen_clip_ids = set()
+            while heap:
+                _, channel_index, clip_json, clips = heapq.heappop(heap)
+                await push_next_clip(channel_index, clips)
+                if clip_json["id"] in seen_clip_ids:
+                    continue
+                seen_clip_ids.add(clip_json["id"])
+                yield self.generate_clip_info_dcls(clip_json)
+        finally:
+            self._record_discovery(
+                twitch_urls,
+                clips_limits,
+                listed_clip_ids,
+                is_exhausted,
+            )
+
+    async def aiter_channel_clips(
+        self,
+        channel: str,
+        period: PeriodEnum | None = None,
+        clips_limit: int | None = None,
+        page_size: int | None = None,
+    ) -> AsyncIterator[dict]:
+        """Yield clips of a channel like `iter_channel_clips`."""
+        clips = self.iter_channel_clips(
+            channel=channel,
+            period=period,
+            clips_limit=clips_limit,
+            page_size=page_size,
+        )
+        done = object()
+        while True:
+            clip_json = await self.thread_work.to_thread(next, clips, done)
+            if clip_json is done:
+                return
+            yield clip_json
+
+    def _plan_discovery(
+        self,
+        clips_limit: int | None = None,
+    ) -> tuple[list[str], list[int | None]]:
+        """Get channels to list and their clips limits."""
+        channels_limits = (
+            self.poll_scheduler.plan_polls(self.twitch_urls)
+            if self.poll_scheduler is not None
+            else dict.fromkeys(self.twitch_urls)
+        )
+        return list(channels_limits), [
+            min(
+                (
+                    limit
+                    for limit in (clips_limit, channel_limit)
+                    if limit
+                ),
+                default=None,
+            )
+            for channel_limit in channels_limits.values()
+        ]
+
+    def _record_discovery(
+        self,
+        twitch_urls: list[str],
+        clips_limits: list[int | None],
+        listed_clip_ids: list[list[str] | None],
+        is_exhausted: list[bool],
+    ) -> None:
+        """Record polls of channels listed to the end or their limit.
+
+        Channels whose listing failed, or wasn't read to the end as
+        the consumer stopped early, stay due, as their yield is
+        unknown.
+        """
+        if self.poll_scheduler is None:
+            return
+        self.poll_scheduler.record_polls(
+            {
+                twitch_url: (clips_limit, clip_ids)
+                for twitch_url, clips_limit, clip_ids, is_listed in zip(
+                    twitch_urls,
+                    clips_limits,
+                    listed_clip_ids,
+                    is_exhausted,
+                    strict=True,
+                )
+                if clip_ids is not None
+                and (
+                    is_listed
+                    or (clips_limit and len(clip_ids) >= clips_limit)
+                )
+            },
+        )
+
+    def _fetch_clips(self, command: list[str]) -> list[dict]:
+        return json.loads(
+            self._call_twitch_dl(
+                endpoint="twitch-dl clips",
+                command=command,
+                timeout_seconds=self.clips_timeout_seconds,
+            ),
+        )
+
+    async def _afetch_clips(self, command: list[str]) -> list[dict]:
+        return json.loads(
+            await self._acall_twitch_dl(
+                endpoint="twitch-dl clips",
+                command=command,
+                timeout_seconds=self.clips_timeout_seconds,
+            ),
+        )
+
+    def _call_twitch_dl(
+        self,
+        endpoint: str,
+        command: list[str],
+        timeout_seconds: float,
+        slots: threading.Semaphore | AdaptiveConcurrencyLimiter | None = None,
+    ) -> bytes:
+        """Run twitch-dl with retries within one deadline.
+
+        :raises TwitchDlTimeoutError: if the deadline passes
+        """
+        deadline = time.monotonic() + timeout_seconds
+
+        def run() -> bytes:
+            with slots or nullcontext():
+                return self._run_process(
+                    command=command,
+                    timeout_seconds=deadline - time.monotonic(),
+                )
+
+        return self.retry_policy.call(
+            endpoint=endpoint,
+            operation=run,
+            deadline_seconds=timeout_seconds,
+            is_retryable=self._is_retryable_error,
+            is_transient=self._is_transient_error,
+        )
+
+    async def _acall_twitch_dl(
+        self,
+        endpoint: str,
+        command: list[str],
+        timeout_seconds: float,
+        slots: threading.Semaphore | AdaptiveConcurrencyLimiter | None = None,
+    ) -> bytes:
+        """Run twitch-dl like `_call_twitch_dl`, without blocking.
+
+        :raises TwitchDlTimeoutError: if the deadline passes
+        """
+        deadline = time.monotonic() + timeout_seconds
+
+        async def run() -> bytes:
+            async with self._acquire_slot(slots):
+                return await self._arun_process(
+                    command=command,
+                    timeout_seconds=deadline - time.monotonic(),
+                )
+
+        return await self.retry_policy.acall(
+            endpoint=endpoint,
+            operation=run,
+            deadline_seconds=timeout_seconds,
+            is_retryable=self._is_retryable_error,
+            is_transient=self._is_transient_error,
+        )
+
+    @staticmethod
+    @asynccontextmanager
+    async def _acquire_slot(
+        slots: threading.Semaphore | AdaptiveConcurrencyLimiter | None,
+    ) -> AsyncIterator[None]:
+        """Take a slot shared with threads, waiting in a worker thread.
+
+        A slot taken after cancellation is released right away. The
+        slot is released by its `__exit__`, so adaptive limiters record
+        the outcome of the task.
+        """
+        if slots is None:
+            yield
+            return
+        acquire_task = asyncio.ensure_future(asyncio.to_thread(slots.acquire))
+        try:
+            await asyncio.shield(acquire_task)
+        except asyncio.CancelledError:
+            acquire_task.add_done_callback(
+                lambda task: task.cancelled()
+                or task.exception() is not None
+                or slots.release(),
+            )
+            raise
+        with ExitStack() as stack:
+            stack.push(slots)
+            yield
+
+    def _is_retryable_error(self, error: Exception) -> bool:
+        # A timed out process already used the whole deadline
+        return (
+            not self._cancelled
+            and not isinstance(error, TwitchDlTimeoutError)
+            and self.retry_policy.is_retryable(error)
+        )
+
+    def _is_transient_error(self, error: Exception) -> bool:
+        # Timeouts aren't retried but still count toward the circuit
+        return not self._cancelled and (
+            isinstance(error, TwitchDlTimeoutError)
+            or self.retry_policy.is_retryable(error)
+        )
+
+    def _run_process(
+        self,
+        command: list[str],
+        timeout_seconds: float,
+    ) -> bytes:
+        """Run a command, killing its process group on timeout.
+
+        The child gets its own session, so grandchildren (e.g. ffmpeg
+        started by twitch-dl) are killed and reaped with it.
+        """
+        if self._cancelled:
+            cancelled_error = "Downloader was cancelled"
+            raise RuntimeError(cancelled_error)
+        if timeout_seconds <= 0:
+            timeout_error = f"Deadline passed before running: {command[:2]}"
+            raise TwitchDlTimeoutError(timeout_error)
+        process = subprocess.Popen(
+            [str(part) for part in command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        with self._processes_lock:
+            self._processes.add(process)
+        try:
+            output, error_output = process.communicate(
+                timeout=timeout_seconds,
+            )
+        except subprocess.TimeoutExpired as e:
+            self._kill_process(process)
+            timeout_error = (
+                f"{' '.join(map(str, command[:3]))} timed out "
+                f"after {timeout_seconds:.0f}s"
+            )
+            raise TwitchDlTimeoutError(timeout_error) from e
+        except BaseException:
+            self._kill_process(process)
+            raise
+        finally:
+            with self._processes_lock:
+                self._processes.discard(process)
+        if self._cancelled:
+            cancelled_error = "Downloader was cancelled"
+            raise RuntimeError(cancelled_error)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode,
+                command,
+                output=output,
+                stderr=error_output,
+            )
+        return output
+
+    async def _arun_process(
+        self,
+        command: list[str],
+        timeout_seconds: float,
+    ) -> bytes:
+        """Run a command like `_run_process` as an asyncio subprocess.
+
+        The process group is killed on timeout and on cancellation.
+        """
+        if self._cancelled:
+            cancelled_error = "Downloader was cancelled"
+            raise RuntimeError(cancelled_error)
+        if timeout_seconds <= 0:
+            timeout_error = f"Deadline passed before running: {command[:2]}"
+            raise TwitchDlTimeoutError(timeout_error)
+        process = await asyncio.create_subprocess_exec(
+            *[str(part) for part in command],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        with self._processes_lock:
+            self._async_processes.add(process)
+        try:
+            output, error_output = await asyncio.wait_for(
+                process.communicate(),
+                timeout=timeout_seconds,
+            )
+        except asyncio.TimeoutError as e:
+            await self._akill_process(process)
+            timeout_error = (
+                f"{' '.join(map(str, command[:3]))} timed out "
+                f"after {timeout_seconds:.0f}s"
+            )
+            raise TwitchDlTimeoutError(timeout_error) from e
+        except BaseException:
+            await self._akill_process(process)
+            raise
+        finally:
+            with self._processes_lock:
+                self._async_processes.discard(process)
+        if self._cancelled:
+            cancelled_error = "Downloader was cancelled"
+            raise RuntimeError(cancelled_error)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode,
+                command,
+                output=output,
+                stderr=error_output,
+            )
+        return output
+
+    @staticmethod
+    async def _akill_process(process: asyncio.subprocess.Process) -> None:
+        for kill_signal in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, kill_signal)
+            except (ProcessLookupError, PermissionError):
+                pass
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    @staticmethod
+    def _kill_process(process: subprocess.Popen) -> None:
+        for kill_signal in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, kill_signal)
+            except (ProcessLookupError, PermissionError):
+                pass
+            try:
+                process.communicate(timeout=5)
+                return
+            except subprocess.TimeoutExpired:
+                continue
+
+    def cancel(self) -> None:
+        """Kill running twitch-dl processes and refuse new ones."""
+        self._cancelled = True
+        with self._processes_lock:
+            processes = list(self._processes)
+            async_processes = list(self._async_processes)
+        for process in processes:
+            self._kill_process(process)
+        # Reaped by the coroutines awaiting them
+        for async_process in async_processes:
+            try:
+                os.killpg(async_process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
     def generate_clip_info_dcls(self, clip_dict: dict) -> ClipInfo:
         default_quality_dict = {
             "videoQualities": [{"frameRate": 30, "quality": "360"}],
         }
+        video_qualities = clip_dict.get(
+            "videoQualities",
+            default_quality_dict.get("videoQualities"),
+        )
         return ClipInfo(
             id=clip_dict["id"],
             slug=clip_dict["slug"],
@@ -102,17 +827,67 @@ class TwitchClipsDownloader:
             view_count=clip_dict["viewCount"],
             duration_seconds=clip_dict["durationSeconds"],
             broadcaster=clip_dict["broadcaster"]["login"],
-            quality=clip_dict.get(
-                "videoQualities",
-                default_quality_dict.get("videoQualities"),
-            )[0].get("quality"),
-            framerate=int(
-                clip_dict.get(
-                    "videoQualities",
-                    default_quality_dict.get("videoQualities"),
-                )[0].get("frameRate"),
-            ),
+            quality=video_qualities[0].get("quality"),
+            framerate=round(float(video_qualities[0].get("frameRate"))),
+            video_qualities=self._parse_video_qualities(video_qualities),
+        )
+
+    @staticmethod
+    def _parse_video_qualities(
+        video_qualities: list[dict],
+    ) -> list[tuple[int, int]]:
+        parsed_qualities = []
+        for video_quality in video_qualities:
+            try:
+                parsed_quality = (
+                    int(video_quality["quality"]),
+                    round(float(video_quality["frameRate"])),
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+            if parsed_quality not in parsed_qualities:
+                parsed_qualities.append(parsed_quality)
+        return parsed_qualities
+
+    def select_quality(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+    ) -> ClipInfo:
+        """Pick the cheapest rendition meeting the output type target.
+
+        Falls back to the best available rendition when none of them
+        meets the target.
+        """
+        target = (
+            self.quality_policy.vertical
+            if is_vertical
+            else self.quality_policy.horizontal
         )
+        if target is None or not clip_info.video_qualities:
+            return clip_info
+        suitable_qualities = [
+            (height, framerate)
+            for height, framerate in clip_info.video_qualities
+            if height >= target.min_height
+            and (
+                target.min_framerate is None
+                or framerate >= target.min_framerate
+            )
+        ]
+        if suitable_qualities:
+            height, framerate = min(suitable_qualities)
+        else:
+            height, framerate = max(clip_info.video_qualities)
+        if height != int(clip_info.quality) or (
+            framerate != clip_info.framerate
+        ):
+            self.logger.log(
+                f"Selected {height}p{framerate} source for clip "
+                f"{clip_info.slug} (was {clip_info.quality}p"
+                f"{clip_info.framerate})",
+            )
+        return replace(clip_info, quality=str(height), framerate=framerate)
 
     def generate_clips_info(self, clips_json: list[dict]) -> list[ClipInfo]:
         self.logger.log("Generating clips info...")
@@ -167,19 +942,35 @@ class TwitchClipsDownloader:
         self,
         clips_info: list[ClipInfo],
         used_titles: list[str],
+        title_index: MinHashTitleIndex | None = None,
+        seen_titles: set[str] | None = None,
+        new_titles_index: MinHashTitleIndex | None = None,
     ) -> tuple[list[ClipInfo], list[str]]:
+        """Drop clips with used titles or titles kept earlier.
+
+        Clips arriving in chunks share `seen_titles` (lowercase titles)
+        and `new_titles_index` between calls, which add the titles they
+        keep, so each clip is only checked once.
+        """
         self.logger.log("Filtering clips by used titles...")
         new_used_titles = []
+        used_titles_set = set() if seen_titles is None else seen_titles
+        used_titles_set.update(
+            used_title.lower() for used_title in used_titles
+        )
+        if new_titles_index is None and title_index is not None:
+            new_titles_index = title_index.empty_copy()
 
         def is_used_title(clip_info: ClipInfo) -> bool:
-            if clip_info.title.lower() in [
-                used_title.lower() for used_title in used_titles
-            ]:
-                return False
-            if clip_info.title.lower() in [
-                new_used_title.lower() for new_used_title in new_used_titles
-            ]:
+            if clip_info.title.lower() in used_titles_set:
                 return False
+            if title_index is not None and new_titles_index is not None:
+                if title_index.find_similar(clip_info.title) is not None:
+                    return False
+                if new_titles_index.find_similar(clip_info.title) is not None:
+                    return False
+                new_titles_index.add(clip_info.title)
+            used_titles_set.add(clip_info.title.lower())
             new_used_titles.append(clip_info.title)
             return True
 
@@ -209,11 +1000,155 @@ class TwitchClipsDownloader:
         )
         return sorted_clips_info
 
+    def get_clip_source_url(self, clip_info: ClipInfo) -> str:
+        """Get an authenticated URL of the selected clip rendition.
+
+        The URL can be read by ffmpeg directly, so the clip never has
+        to be written to disk before conversion.
+        """
+        access_token = self.retry_policy.call(
+            endpoint="twitch gql",
+            operation=lambda: twitch.get_clip_access_token(clip_info.slug),
+        )
+        if not access_token or not access_token.get("videoQualities"):
+            clip_not_found_error = f"Clip not found: {clip_info.slug}"
+            raise RuntimeError(clip_not_found_error)
+        video_qualities = access_token["videoQualities"]
+        matching_qualities = [
+            video_quality
+            for video_quality in video_qualities
+            if video_quality["quality"] == clip_info.quality
+        ]
+        matching_qualities.sort(
+            key=lambda video_quality: abs(
+                float(video_quality["frameRate"]) - clip_info.framerate,
+            ),
+        )
+        source = (matching_qualities or video_qualities)[0]
+        query = urlencode(
+            {
+                "sig": access_token["playbackAccessToken"]["signature"],
+                "token": access_token["playbackAccessToken"]["value"],
+            },
+        )
+        return f"{source['sourceURL']}?{query}"
+
     def download_clip(
         self,
         clip_info: ClipInfo,
         clip_format: str | None = None,
+        folder_path: Path | None = None,
+    ) -> Path:
+        file_path, command = self._prepare_download(
+            clip_info,
+            clip_format,
+            folder_path,
+        )
+        reservation = (
+            self.disk_budget.reservation(
+                key=clip_info.id,
+                path=file_path,
+                estimated_bytes=self._estimate_download_bytes(clip_info),
+            )
+            if self.disk_budget is not None and folder_path is None
+            else nullcontext()
+        )
+        try:
+            with reservation:
+                if self.bandwidth_limiter is not None:
+                    self._download_throttled(clip_info, file_path)
+                else:
+                    self._call_twitch_dl(
+                        endpoint="twitch-dl download",
+                        command=command,
+                        timeout_seconds=self.download_timeout_seconds,
+                        slots=self.download_slots,
+                    )
+        except BaseException:
+            self._remove_partial_download(file_path)
+            raise
+        self.logger.log(f"Downloaded clip: {clip_info.title}")
+        return Path(file_path)
+
+    async def adownload_clip(
+        self,
+        clip_info: ClipInfo,
+        clip_format: str | None = None,
+        folder_path: Path | None = None,
     ) -> Path:
+        """Download a clip like `download_clip`, without blocking.
+
+        Bandwidth-limited downloads run `download_clip` in a worker
+        thread, which finishes the current attempt when cancelled and
+        is tracked by `thread_work` until then.
+        """
+        if self.bandwidth_limiter is not None:
+            return await self.thread_work.to_thread(
+                self.download_clip,
+                clip_info,
+                clip_format,
+                folder_path,
+            )
+        file_path, command = self._prepare_download(
+            clip_info,
+            clip_format,
+            folder_path,
+        )
+        is_reserved = self.disk_budget is not None and folder_path is None
+        try:
+            if is_reserved:
+                await self._areserve(clip_info.id, file_path, clip_info)
+            try:
+                await self._acall_twitch_dl(
+                    endpoint="twitch-dl download",
+                    command=command,
+                    timeout_seconds=self.download_timeout_seconds,
+                    slots=self.download_slots,
+                )
+            finally:
+                if is_reserved:
+                    self.disk_budget.release(clip_info.id)
+        except BaseException:
+            self._remove_partial_download(file_path)
+            raise
+        self.logger.log(f"Downloaded clip: {clip_info.title}")
+        return Path(file_path)
+
+    async def _areserve(
+        self,
+        key: str,
+        file_path: Path,
+        clip_info: ClipInfo,
+    ) -> None:
+        """Reserve disk budget in a worker thread.
+
+        A reservation made after cancellation is released right away.
+        """
+        reserve_task = asyncio.ensure_future(
+            asyncio.to_thread(
+                self.disk_budget.reserve,
+                key=key,
+                path=file_path,
+                estimated_bytes=self._estimate_download_bytes(clip_info),
+            ),
+        )
+        try:
+            await asyncio.shield(reserve_task)
+        except asyncio.CancelledError:
+            reserve_task.add_done_callback(
+                lambda task: task.cancelled()
+                or task.exception() is not None
+                or self.disk_budget.release(key),
+            )
+            raise
+
+    def _prepare_download(
+        self,
+        clip_info: ClipInfo,
+        clip_format: str | None = None,
+        folder_path: Path | None = None,
+    ) -> tuple[Path, list]:
+        """Get output path and twitch-dl command of a clip download."""
         self.logger.log(
             f'Downloading clip "{clip_info.title}" from: https://www.twitch.tv'
             f"/{clip_info.broadcaster}/clip/{clip_info.slug} ...",
@@ -221,7 +1156,8 @@ class TwitchClipsDownloader:
         if not clip_format:
             clip_format = "mp4"
         file_path = Path(
-            f"{self.clips_folder_path}/{clip_info.id}.{clip_format}",
+            f"{folder_path or self.clips_folder_path}/"
+            f"{clip_info.id}.{clip_format}",
         )
         command = [
             "twitch-dl",
@@ -233,9 +1169,75 @@ class TwitchClipsDownloader:
             "-o",
             file_path,
         ]
-        subprocess.check_output(command)
-        self.logger.log(f"Downloaded clip: {clip_info.title}")
-        return Path(file_path)
+        return file_path, command
+
+    @staticmethod
+    def _estimate_download_bytes(clip_info: ClipInfo) -> int:
+        return ClipsDiskBudget.estimate_clip_bytes(
+            duration_seconds=clip_info.duration_seconds,
+            height=int(clip_info.quality),
+        )
+
+    @staticmethod
+    def _remove_partial_download(file_path: Path) -> None:
+        # twitch-dl writes to `<path>.tmp` and renames it when done
+        for partial_path in (file_path, Path(f"{file_path}.tmp")):
+            partial_path.unlink(missing_ok=True)
+
+    def _download_throttled(
+        self,
+        clip_info: ClipInfo,
+        file_path: Path,
+    ) -> None:
+        """Stream the clip rendition through the bandwidth limiter.
+
+        twitch-dl can't be throttled, so the authenticated source URL is
+        read directly, in chunks taken from the limiter.
+
+        :raises TwitchDlTimeoutError: if the deadline passes
+        """
+        deadline = time.monotonic() + self.download_timeout_seconds
+        temporary_path = Path(f"{file_path}.tmp")
+
+        def download() -> None:
+            if self._cancelled:
+                cancelled_error = "Downloader was cancelled"
+                raise RuntimeError(cancelled_error)
+            source_url = self.get_clip_source_url(clip_info)
+            with (
+                self.download_slots or nullcontext(),
+                self.bandwidth_limiter.transfer(),
+                httpx.stream(
+                    "GET",
+                    source_url,
+                    timeout=30,
+                    follow_redirects=True,
+                ) as response,
+            ):
+                response.raise_for_status()
+                with Path.open(temporary_path, "wb") as file:
+                    for chunk in self.bandwidth_limiter.throttle(
+                        response.iter_bytes(self._DOWNLOAD_CHUNK_SIZE),
+                    ):
+                        if self._cancelled:
+                            cancelled_error = "Downloader was cancelled"
+                            raise RuntimeError(cancelled_error)
+                        if time.monotonic() > deadline:
+                            timeout_error = (
+                                f"Download of {clip_info.slug} timed out "
+                                f"after {self.download_timeout_seconds:.0f}s"
+                            )
+                            raise TwitchDlTimeoutError(timeout_error)
+                        file.write(chunk)
+            temporary_path.replace(file_path)
+
+        self.retry_policy.call(
+            endpoint="twitch download",
+            operation=download,
+            deadline_seconds=self.download_timeout_seconds,
+            is_retryable=self._is_retryable_error,
+            is_transient=self._is_transient_error,
+        )
 
     def download_multiple_clips(
         self,
@@ -258,26 +1260,50 @@ class TwitchClipsDownloader:
 
     def delete_clip_by_path(self, path: Path) -> tuple[bool, str]:
         self.logger.log(f"Deleting clip {path}...")
+        if self.disk_budget is not None:
+            self.disk_budget.forget(path)
         if path.exists():
             Path.unlink(path)
             log_info = f"Clip deleted: {path}"
             self.logger.log(log_info)
             return True, log_info
         log_info = f"Clip not found: {path}"
-        self.logger.log(log_info)
+        self.logger.log(
+            log_info,
+            level=LogLevelEnum.WARNING,
+        )
         return False, log_info
 
-    def delete_all_clips(self) -> None:
+    def delete_all_clips(self, folder_path: Path | None = None) -> None:
+        """Delete clip files, keeping files of clips other runs lease."""
         self.logger.log("Cleaning clips folder...")
-        for dirs, _, files in os.walk(self.clips_folder_path):
-            for file in files:
-                file_path = Path(dirs) / file
-                self.delete_clip_by_path(path=Path(file_path))
+        folder_lock = self.folder_lock if folder_path is None else None
+        for file_path in self._walk_clip_files(
+            folder_path or self.clips_folder_path,
+        ):
+            with (
+                folder_lock.artifact(file_path)
+                if folder_lock is not None
+                else nullcontext(True)
+            ) as is_owned:
+                if not is_owned:
+                    self.logger.log(
+                        f"Keeping {file_path}, used by another run",
+                    )
+                    continue
+                self.delete_clip_by_path(path=file_path)
         self.logger.log("Clips folder cleaned!")
 
+    @staticmethod
+    def _walk_clip_files(folder_path: Path) -> Iterator[Path]:
+        for dirs, folders, files in os.walk(folder_path):
+            folders[:] = [
+                folder
+                for folder in folders
+                if folder != ClipsFolderLock.CONTROL_FOLDER_NAME
+            ]
+            for file in files:
+                yield Path(dirs) / file
+
     def _count_downloaded_clips(self) -> int:
-        counter = 0
-        for _, _, files in os.walk(self.clips_folder_path):
-            for _ in files:
-                counter += 1
-        return counter
+        return sum(1 for _ in self._walk_clip_files(self.clips_folder_path))
@@ -1,18 +1,66 @@
 import argparse
-from dataclasses import dataclass
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from contextlib import (
+    AbstractContextManager,
+    aclosing,
+    closing,
+    contextmanager,
+    nullcontext,
+)
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from pathlib import Path
+from typing import Callable, Iterator
 
+from .AdaptiveConcurrencyLimiter import AdaptiveConcurrencyLimiter
+from .BandwidthLimiter import BandwidthLimiter
 from .BaseYoutubeUploader import (
     BaseLanguageEnum,
     BaseLicenseEnum,
     BasePrivacyEnum,
     BaseUploader,
+    PublishSchedule,
     VideoInfo,
 )
+from .ChannelPollScheduler import ChannelPollScheduler
+from .ChannelUploadsIndex import ChannelUploadsIndex, UploadedVideo
+from .ClipCostModel import (
+    BudgetKindEnum,
+    ClipCost,
+    ClipCostModel,
+    RunBudget,
+)
+from .ClipHistoryStore import ClipHistoryStore
+from .ClipsDiskBudget import ClipsDiskBudget
+from .ClipsFolderLock import ClipsFolderLock
+from .ConversionPlanner import ConversionPlanner
 from .CookieFormatter import JSONNetScapeFormatter, StdinNetScapeFormatter
-from .Logger import BaseLogger, Logger
-from .TwitchClipsDownloader import ClipInfo, TwitchClipsDownloader, TwitchData
-from .VerticalVideoConverter import VerticalVideoConverter
+from .CpuMeter import CpuMeter, CpuUsage
+from .Logger import BaseLogger, Logger, LogLevelEnum
+from .RetryPolicy import RetryPolicy
+from .StageProfiler import ProfilingSettings, StageProfiler
+from .ThreadWorkTracker import ThreadWorkTracker
+from .TitleIndex import MinHashTitleIndex
+from .TwitchClipsDownloader import (
+    ClipInfo,
+    ClipsDiscoveryCache,
+    TwitchClipsDownloader,
+    TwitchData,
+    TwitchDlTimeoutError,
+)
+from .VerticalVideoConverter import (
+    EncodeSettings,
+    VerticalModeEnum,
+    VerticalVideoConverter,
+)
+from .VideoFingerprintIndex import VideoFingerprinter, VideoFingerprintIndex
+from .WorkQueue import BaseWorkQueue, QueueJob
 from .YoutubeUploaderViaCookies import (
     CookiesUploaderSettings,
     YoutubeUploaderViaCookies,
@@ -37,48 +85,132 @@ class CustomVideoMetadata:
     video_properties: VideoProperties | None = None
 
 
+@dataclass
+class StreamingSettings:
+    """Feed vertical conversions from the clip stream URL.
+
+    Intermediate files (fallback downloads, horizontal clips) go to a
+    per-run scratch folder, created under `scratch_folder_path` or
+    under `/dev/shm` (tmpfs) when available.
+    """
+
+    scratch_folder_path: Path | None = None
+
+
+@dataclass
+class SharedResources:
+    """Resources shared by pipelines running in one process."""
+
+    clips_cache: ClipsDiscoveryCache | None = None
+    download_slots: (
+        threading.Semaphore | AdaptiveConcurrencyLimiter | None
+    ) = None
+    conversion_slots: (
+        threading.Semaphore | AdaptiveConcurrencyLimiter | None
+    ) = None
+    retry_policy: RetryPolicy | None = None
+    download_bandwidth: BandwidthLimiter | None = None
+    upload_bandwidth: BandwidthLimiter | None = None
+
+
 @dataclass
 class VerticalVideoRange:
     min_duration: int
     max_duration: int
 
 
+@dataclass
+class _ClipSelection:
+    """Clips kept by a selection filtering discovered clips in chunks."""
+
+    seen_titles: set[str]
+    new_titles_index: MinHashTitleIndex | None
+    filtered_clips: list[ClipInfo] = field(default_factory=list)
+    filtered_count: int = 0
+
+
 class TwitchClipsToYoutube:
     def __init__(
         self,
         max_videos_to_upload: int,
         twitch_data: TwitchData,
-        cookies_settings: CookiesUploaderSettings,
+        cookies_settings: CookiesUploaderSettings | None = None,
         custom_metadata: CustomVideoMetadata | None = None,
         logger: BaseLogger | None = None,
+        vertical_mode: VerticalModeEnum | None = None,
+        streaming_settings: StreamingSettings | None = None,
+        fingerprint_index: VideoFingerprintIndex | None = None,
+        title_index: MinHashTitleIndex | None = None,
+        uploader: BaseUploader | None = None,
+        use_stdin_cookies: bool | None = None,
+        shared_resources: SharedResources | None = None,
+        publish_schedule: PublishSchedule | None = None,
+        uploads_index: ChannelUploadsIndex | None = None,
+        conversion_planner: ConversionPlanner | None = None,
+        profiling_settings: ProfilingSettings | None = None,
+        poll_scheduler: ChannelPollScheduler | None = None,
+        encode_settings: EncodeSettings | None = None,
+        clip_history: ClipHistoryStore | None = None,
+        cost_model: ClipCostModel | None = None,
+        run_budget: RunBudget | None = None,
     ) -> None:
-        self.logger = logger or Logger()
+        """Create pipeline.
 
-        parser = argparse.ArgumentParser()
-        parser.add_argument(
-            "--cookies",
-            "-c",
-            action="store_true",
-            help="Use cookies from stdin",
-            dest="use_stdin_cookies",
+        Command line arguments are only parsed when neither `uploader`
+        nor `use_stdin_cookies` is given, so the pipeline can be built
+        as a library (e.g. by `MultiTenantRunner`).
+
+        Stages are profiled when `profiling_settings` is given or the
+        `TWITCH_CLIPS_PROFILE_DIR` environment variable is set.
+
+        With a `run_budget`, runs publish the clips of the most views
+        predicted by `cost_model` to fit the budget.
+        """
+        self.logger = (logger or Logger()).get_child("pipeline")
+        self.profiler = (
+            StageProfiler(profiling_settings, logger=self.logger)
+            if profiling_settings is not None
+            else StageProfiler.from_environment(logger=self.logger)
         )
-        self.args = parser.parse_args()
 
         self.max_videos = max_videos_to_upload
         if not self.max_videos > 0:
             max_videos_error = "Max videos must be at least 1"
             raise ValueError(max_videos_error)
 
-        self.cookies_folder_path = cookies_settings.cookies_folder_path
-        self.retries = cookies_settings.cookies_validation_retries
-        self.json_cookies_path = Path(
-            f"{self.cookies_folder_path}/cookies.json",
-        )
-        self.cookies_path = Path(f"{self.cookies_folder_path}/cookies.txt")
+        self.shared_resources = shared_resources or SharedResources()
 
-        self.yt_uploader = self._get_uploader()
+        if uploader is not None:
+            self.use_stdin_cookies = bool(use_stdin_cookies)
+            self.yt_uploader = uploader
+        else:
+            if cookies_settings is None:
+                no_uploader_error = "Uploader or cookies settings required"
+                raise ValueError(no_uploader_error)
+            self.use_stdin_cookies = (
+                use_stdin_cookies
+                if use_stdin_cookies is not None
+                else self._parse_cli_args().use_stdin_cookies
+            )
+            self.cookies_folder_path = cookies_settings.cookies_folder_path
+            self.retries = cookies_settings.cookies_validation_retries
+            self.json_cookies_path = Path(
+                f"{self.cookies_folder_path}/cookies.json",
+            )
+            self.cookies_path = Path(
+                f"{self.cookies_folder_path}/cookies.txt",
+            )
+            self.yt_uploader = self._get_uploader()
 
         self.custom_metadata = custom_metadata
+        self.publish_schedule = publish_schedule
+
+        self.vertical_mode = vertical_mode or VerticalModeEnum.LETTERBOX
+        self.conversion_planner = conversion_planner
+        self.encode_settings = encode_settings
+
+        self.fingerprint_index = fingerprint_index
+        self._frame_hashes: dict[str, list[int]] = {}
 
         self.vertical_video_range = VerticalVideoRange(
             min_duration=3,
@@ -97,24 +229,108 @@ class TwitchClipsToYoutube:
 
         self.clips_folder_path = twitch_data.clips_folder_path
         self._create_clips_folder(clips_folder=self.clips_folder_path)
+        self.folder_lock = ClipsFolderLock(
+            clips_folder_path=self.clips_folder_path,
+            logger=self.logger,
+            single_flight=twitch_data.single_flight_runs,
+        )
+        self.streaming_settings = streaming_settings
+        self.scratch_folder_path = (
+            self._create_scratch_folder(streaming_settings)
+            if streaming_settings is not None
+            else None
+        )
 
         self.twitch_urls = twitch_data.channels_urls
         self.twitch_clips_period = twitch_data.clips_period
         self.clips_limit = twitch_data.clips_per_channel_limit
+        self.candidates_per_video = twitch_data.candidates_per_video or 3
         self.unsupported_words = twitch_data.unsupported_words_for_title or []
         self.used_titles = twitch_data.used_titles or []
+        self.title_index = title_index
+        if self.title_index is not None:
+            self.title_index.sync(self.used_titles)
+        self.uploads_index = uploads_index
+        self.clip_history = clip_history
+        self.run_budget = run_budget
+        self.cost_model = (
+            cost_model
+            if cost_model is not None or run_budget is None
+            else ClipCostModel(logger=self.logger)
+        )
+        self._budget_started_at = (0.0, 0.0)
+
+        self.disk_budget = (
+            ClipsDiskBudget(
+                folder_path=self.clips_folder_path,
+                budget_bytes=twitch_data.clips_folder_budget_bytes,
+                folder_lock=self.folder_lock,
+                logger=self.logger,
+            )
+            if twitch_data.clips_folder_budget_bytes
+            else None
+        )
 
         self.twitch_downloader = TwitchClipsDownloader(
             twitch_urls=twitch_data.channels_urls,
             clips_folder_path=twitch_data.clips_folder_path,
             logger=self.logger,
+            quality_policy=twitch_data.quality_policy,
+            disk_budget=self.disk_budget,
+            clips_cache=self.shared_resources.clips_cache,
+            download_slots=self.shared_resources.download_slots,
+            retry_policy=self.shared_resources.retry_policy,
+            clips_timeout_seconds=twitch_data.clips_timeout_seconds,
+            download_timeout_seconds=twitch_data.download_timeout_seconds,
+            bandwidth_limiter=self.shared_resources.download_bandwidth,
+            poll_scheduler=poll_scheduler,
+            folder_lock=self.folder_lock,
+        )
+        self.thread_work = ThreadWorkTracker()
+        # Taken last, as nothing releases it if the constructor fails
+        self.folder_lock.acquire_run()
+
+    @staticmethod
+    def _parse_cli_args() -> argparse.Namespace:
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--cookies",
+            "-c",
+            action="store_true",
+            help="Use cookies from stdin",
+            dest="use_stdin_cookies",
         )
+        args, _ = parser.parse_known_args()
+        return args
+
+    def _profile_stage(
+        self,
+        name: str,
+    ) -> AbstractContextManager[None]:
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
 
     def _create_clips_folder(self, clips_folder: Path) -> None:
         if not clips_folder.exists():
             self.logger.log("Clips folder doesn't exist. Creating new one...")
             clips_folder.mkdir(parents=True, exist_ok=True)
 
+    @staticmethod
+    def _create_scratch_folder(streaming_settings: StreamingSettings) -> Path:
+        parent_folder = streaming_settings.scratch_folder_path
+        if parent_folder is None:
+            shm_folder = Path("/dev/shm")
+            parent_folder = (
+                shm_folder
+                if shm_folder.is_dir() and os.access(shm_folder, os.W_OK)
+                else Path(tempfile.gettempdir())
+            )
+        parent_folder.mkdir(parents=True, exist_ok=True)
+        return Path(
+            tempfile.mkdtemp(prefix="twitch_clips_", dir=parent_folder),
+        )
+
     def _get_cookies_uploader(
         self,
     ) -> tuple[YoutubeUploaderViaCookies | None, bool]:
@@ -123,17 +339,21 @@ class TwitchClipsToYoutube:
                 cookies_path=self.cookies_path,
                 retries=self.retries,
                 logger=self.logger,
+                bandwidth_limiter=self.shared_resources.upload_bandwidth,
             )
             if cookies_uploader.has_valid_cookies():
                 self.logger.log("Cookies-Uploader initialized.")
                 return cookies_uploader, True
-            self.logger.log("Invalid cookies.")
+            self.logger.log(
+                "Invalid cookies.",
+                level=LogLevelEnum.WARNING,
+            )
             return cookies_uploader, False
         except Exception:
             return None, False
 
     def _stdin_to_cookies(self) -> None:
-        if self.args.use_stdin_cookies:
+        if self.use_stdin_cookies:
             try:
                 StdinNetScapeFormatter(logger=self.logger).save(
                     formatted_cookies_file_path=self.cookies_path,
@@ -187,11 +407,45 @@ class TwitchClipsToYoutube:
                     return True
                 except Exception:
                     pass
-            self.logger.log("Cookies file doesn't exist.")
+            self.logger.log(
+                "Cookies file doesn't exist.",
+                level=LogLevelEnum.WARNING,
+            )
             return False
         return True
 
-    def _filter_clips(self, clips: list[ClipInfo]) -> list[ClipInfo]:
+    def _start_selection(self) -> _ClipSelection:
+        return _ClipSelection(
+            seen_titles={title.lower() for title in self.used_titles},
+            new_titles_index=(
+                self.title_index.empty_copy()
+                if self.title_index is not None
+                else None
+            ),
+        )
+
+    def _filter_new_clips(
+        self,
+        selection: _ClipSelection,
+        discovered_clips: list[ClipInfo],
+    ) -> list[ClipInfo]:
+        """Filter clips discovered since the last call.
+
+        Titles kept by earlier chunks stay in `selection`, so every
+        clip is filtered once and discovery stays linear.
+        """
+        new_clips = discovered_clips[selection.filtered_count :]
+        selection.filtered_count = len(discovered_clips)
+        selection.filtered_clips.extend(
+            self._filter_clips(new_clips, selection),
+        )
+        return selection.filtered_clips
+
+    def _filter_clips(
+        self,
+        clips: list[ClipInfo],
+        selection: _ClipSelection,
+    ) -> list[ClipInfo]:
         filtered_clips_info = (
             self.twitch_downloader.filter_clips_by_unsupported_words(
                 clips_info=clips,
@@ -204,17 +458,80 @@ class TwitchClipsToYoutube:
         filtered_clips_info, _ = (
             self.twitch_downloader.filter_clips_by_used_titles(
                 clips_info=filtered_clips_info,
-                used_titles=self.used_titles,
+                used_titles=[],
+                title_index=self.title_index,
+                seen_titles=selection.seen_titles,
+                new_titles_index=selection.new_titles_index,
             )
         )
+        if self.uploads_index is not None:
+            filtered_clips_info = [
+                clip_info
+                for clip_info in filtered_clips_info
+                if not self.uploads_index.has_clip(clip_info.id)
+                and not self.uploads_index.has_title(clip_info.title)
+            ]
         return filtered_clips_info
 
+    def _sync_uploads_index(self) -> None:
+        if self.uploads_index is None:
+            return
+        try:
+            self.yt_uploader.sync_uploads_index(self.uploads_index)
+        except RuntimeError as e:
+            self.logger.log(
+                f"Failed to sync channel uploads: {e}",
+                level=LogLevelEnum.WARNING,
+            )
+
+    def _mark_title_used(self, title: str) -> None:
+        self.used_titles.append(title)
+        if self.title_index is not None:
+            self.title_index.add(title)
+
     def _download_clip(self, clip_info: ClipInfo) -> Path:
+        started_at = time.monotonic()
+        try:
+            clip_path = self.twitch_downloader.download_clip(
+                clip_info=clip_info,
+                folder_path=self.scratch_folder_path,
+            )
+        except TwitchDlTimeoutError:
+            raise
+        except Exception as e:
+            download_error = f"Failed to download clip: {clip_info.slug}"
+            raise RuntimeError(download_error) from e
+        self._record_download(clip_info, clip_path, started_at)
+        return clip_path
+
+    async def _adownload_clip(self, clip_info: ClipInfo) -> Path:
+        started_at = time.monotonic()
         try:
-            return self.twitch_downloader.download_clip(clip_info=clip_info)
+            clip_path = await self.twitch_downloader.adownload_clip(
+                clip_info=clip_info,
+                folder_path=self.scratch_folder_path,
+            )
+        except TwitchDlTimeoutError:
+            raise
         except Exception as e:
             download_error = f"Failed to download clip: {clip_info.slug}"
             raise RuntimeError(download_error) from e
+        self._record_download(clip_info, clip_path, started_at)
+        return clip_path
+
+    def _record_download(
+        self,
+        clip_info: ClipInfo,
+        clip_path: Path,
+        started_at: float,
+    ) -> None:
+        if self.cost_model is None:
+            return
+        self.cost_model.record_download(
+            clip_info,
+            size_bytes=clip_path.stat().st_size,
+            seconds=time.monotonic() - started_at,
+        )
 
     def _generate_video_metadata(
         self,
@@ -224,6 +541,8 @@ class TwitchClipsToYoutube:
         title = f"{clip_info.title}"
         description = ""
         tags = [f"{clip_info.broadcaster}"]
+        if self.uploads_index is not None:
+            tags.append(ChannelUploadsIndex.clip_tag(clip_info.id))
         if self.custom_metadata is not None:
             if self.custom_metadata.streamer_tag_in_title:
                 title += f" #{clip_info.broadcaster}"
@@ -256,141 +575,1102 @@ class TwitchClipsToYoutube:
             raise RuntimeError(title_length_error)
         return title, description, tags
 
+    def _predict_encode_bytes(self, clip_info: ClipInfo) -> int | None:
+        """Predict size of the bitrate-targeted encode of a clip.
+
+        :returns: `None` without encode settings or if the clip can't
+            fit them
+        """
+        if self.encode_settings is None:
+            return None
+        try:
+            return VerticalVideoConverter.predict_size_bytes(
+                self.encode_settings,
+                clip_info.duration_seconds,
+            )
+        except ValueError:
+            return None
+
+    def _fits_encode_settings(self, clip_info: ClipInfo) -> bool:
+        if self.encode_settings is None:
+            return True
+        try:
+            VerticalVideoConverter.get_bitrates(
+                self.encode_settings,
+                clip_info.duration_seconds,
+            )
+        except ValueError as e:
+            self.logger.log(f"Skipping clip {clip_info.slug}: {e}")
+            return False
+        return True
+
     def _convert_clip_to_vertical(
         self,
-        clip_path: Path,
+        clip_path: Path | str,
         clip_info: ClipInfo,
     ) -> Path:
+        output_path = Path(
+            f"{self.clips_folder_path}/{clip_info.id}_vertical.mp4",
+        )
         try:
-            background_file_path = (
-                VerticalVideoConverter.create_background_file(
-                    output_file_path=Path(
-                        f"{self.clips_folder_path}/{clip_info.id}"
-                        "_background.mp4",
+            if self.disk_budget is not None:
+                self.disk_budget.reserve(
+                    key=f"{clip_info.id}_vertical",
+                    path=output_path,
+                    estimated_bytes=(
+                        self._predict_encode_bytes(clip_info)
+                        or ClipsDiskBudget.estimate_clip_bytes(
+                            duration_seconds=clip_info.duration_seconds,
+                            height=1080,
+                        )
                     ),
-                    duration=clip_info.duration_seconds,
-                    framerate=clip_info.framerate,
                 )
+            with self.shared_resources.conversion_slots or nullcontext():
+                started_at = time.monotonic()
+                with CpuMeter.measure() as cpu_usage:
+                    vertical_video_path = self._run_conversion(
+                        clip_path=clip_path,
+                        output_path=output_path,
+                    )
+                if vertical_video_path != clip_path:
+                    self._record_encode(
+                        clip_info,
+                        vertical_video_path,
+                        started_at,
+                        cpu_usage,
+                    )
+        except Exception as e:
+            raise RuntimeError(e) from e
+        finally:
+            if self.disk_budget is not None:
+                self.disk_budget.release(f"{clip_info.id}_vertical")
+        if isinstance(clip_path, Path) and vertical_video_path != clip_path:
+            deletion_status, log_info = (
+                self.twitch_downloader.delete_clip_by_path(path=clip_path)
             )
-            vertical_video_path = VerticalVideoConverter.create_vertical_video(
+            if not deletion_status:
+                self.logger.log(f"{log_info}")
+        return vertical_video_path
+
+    def _run_conversion(
+        self,
+        clip_path: Path | str,
+        output_path: Path,
+    ) -> Path:
+        if (
+            self.conversion_planner is not None
+            and self.vertical_mode == VerticalModeEnum.LETTERBOX
+        ):
+            return self._convert_with_planner(
+                clip_path=clip_path,
+                output_path=output_path,
+            )
+        if self.vertical_mode == VerticalModeEnum.SMART_CROP:
+            return VerticalVideoConverter.create_smart_crop_video(
                 clip_path=clip_path,
-                background_path=background_file_path,
-                output_path=Path(
-                    f"{self.clips_folder_path}/{clip_info.id}_vertical.mp4",
-                ),
-            )
-            for path in (background_file_path, clip_path):
-                deletion_status, log_info = (
-                    self.twitch_downloader.delete_clip_by_path(path=path)
+                output_path=output_path,
+                encode_settings=self.encode_settings,
+            )
+        return VerticalVideoConverter.create_vertical_video(
+            clip_path=clip_path,
+            background_path=None,
+            output_path=output_path,
+            encode_settings=self.encode_settings,
+        )
+
+    def _record_encode(
+        self,
+        clip_info: ClipInfo,
+        vertical_video_path: Path,
+        started_at: float,
+        cpu_usage: CpuUsage,
+    ) -> None:
+        """Record encode cost.
+
+        CPU time is only recorded when the encode ran its ffmpeg
+        processes through `CpuMeter`, moviepy's aren't measured.
+        """
+        if self.cost_model is None:
+            return
+        self.cost_model.record_encode(
+            output_seconds=clip_info.duration_seconds,
+            size_bytes=Path(vertical_video_path).stat().st_size,
+            seconds=time.monotonic() - started_at,
+            cpu_seconds=cpu_usage.seconds if cpu_usage.processes else None,
+        )
+
+    def _convert_with_planner(
+        self,
+        clip_path: Path | str,
+        output_path: Path,
+    ) -> Path:
+        plan = self.conversion_planner.plan(
+            self.conversion_planner.probe(clip_path),
+        )
+        if plan.probe.duration >= self.vertical_video_range.max_duration:
+            duration_error = (
+                f"Clip is too long for a vertical video: "
+                f"{plan.probe.duration:.1f}s"
+            )
+            raise RuntimeError(duration_error)
+        return self.conversion_planner.execute(
+            plan=plan,
+            source=clip_path,
+            output_path=output_path,
+            encode_settings=self.encode_settings,
+        )
+
+    def _get_clip_source(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+    ) -> Path | str:
+        if is_vertical and self.streaming_settings is not None:
+            try:
+                return self.twitch_downloader.get_clip_source_url(clip_info)
+            except Exception as e:
+                self.logger.log(
+                    f"Failed to get clip stream, downloading it instead: {e}",
+                    level=LogLevelEnum.WARNING,
                 )
-                if not deletion_status:
-                    self.logger.log(f"{log_info}")
-            return vertical_video_path
-        except Exception as e:
-            raise RuntimeError(e) from e
+        return self._download_clip(clip_info)
+
+    async def _aget_clip_source(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+    ) -> Path | str:
+        if is_vertical and self.streaming_settings is not None:
+            try:
+                return await self.thread_work.to_thread(
+                    self.twitch_downloader.get_clip_source_url,
+                    clip_info,
+                )
+            except Exception as e:
+                self.logger.log(
+                    f"Failed to get clip stream, downloading it instead: {e}",
+                    level=LogLevelEnum.WARNING,
+                )
+        return await self._adownload_clip(clip_info)
+
+    def _prepare_vertical_clip(
+        self,
+        clip_source: Path | str,
+        clip_info: ClipInfo,
+    ) -> tuple[Path, bool]:
+        try:
+            return self._convert_clip_to_vertical(clip_source, clip_info), True
+        except RuntimeError as e:
+            self.logger.log(
+                f"{e}",
+                level=LogLevelEnum.WARNING,
+            )
+        if isinstance(clip_source, str):
+            self.logger.log(
+                "Streaming conversion failed, downloading clip...",
+                level=LogLevelEnum.WARNING,
+            )
+            return self._prepare_vertical_clip(
+                self._download_clip(clip_info),
+                clip_info,
+            )
+        return clip_source, False
+
+    def _is_duplicate_video(
+        self,
+        clip_info: ClipInfo,
+        clip_source: Path | str,
+    ) -> bool:
+        if self.fingerprint_index is None:
+            return False
+        try:
+            frame_hashes = VideoFingerprinter.fingerprint(clip_source)
+        except RuntimeError as e:
+            self.logger.log(
+                f"{e}",
+                level=LogLevelEnum.WARNING,
+            )
+            return False
+        duplicate_clip_id = self.fingerprint_index.find_duplicate(
+            frame_hashes,
+        )
+        if duplicate_clip_id is not None:
+            self.logger.log(
+                f"Clip {clip_info.slug} duplicates already uploaded clip "
+                f"{duplicate_clip_id}",
+            )
+            return True
+        self._frame_hashes[clip_info.id] = frame_hashes
+        return False
+
+    def _get_video_metadata(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+    ) -> tuple[str, str, list[str]] | None:
+        try:
+            return self._generate_video_metadata(clip_info, is_vertical)
+        except RuntimeError as e:
+            self.logger.log(
+                f"{e}",
+                level=LogLevelEnum.WARNING,
+            )
+            self._mark_title_used(clip_info.title)
+            return None
+
+    def _skip_duplicate_clip(
+        self,
+        clip_info: ClipInfo,
+        clip_source: Path | str,
+    ) -> None:
+        self._mark_title_used(clip_info.title)
+        if isinstance(clip_source, Path):
+            self.twitch_downloader.delete_clip_by_path(clip_source)
+
+    def _build_video_info(
+        self,
+        clip_path: Path,
+        metadata: tuple[str, str, list[str]],
+        publish_at: datetime | None = None,
+    ) -> VideoInfo:
+        title, description, tags = metadata
+        video_properties = (
+            self.custom_metadata.video_properties
+            if self.custom_metadata
+            else None
+        )
+        return VideoInfo(
+            video_path=clip_path,
+            title=title,
+            description=description,
+            tags=tags,
+            made_for_kids=(
+                video_properties.made_for_kids if video_properties else None
+            ),
+            privacy=video_properties.privacy if video_properties else None,
+            language=video_properties.language if video_properties else None,
+            license_=video_properties.license_ if video_properties else None,
+            publish_at=publish_at,
+        )
+
+    @staticmethod
+    def _strip_shorts_tag(
+        metadata: tuple[str, str, list[str]],
+    ) -> tuple[str, str, list[str]]:
+        title, description, tags = metadata
+        return title.replace(" #shorts", ""), description, tags
+
+    def _finish_publish(
+        self,
+        clip_info: ClipInfo,
+        video_info: VideoInfo,
+    ) -> None:
+        """Record an uploaded clip and delete its video."""
+        self.folder_lock.mark_published(clip_info.id)
+        self._mark_title_used(clip_info.title)
+        if self.twitch_downloader.poll_scheduler is not None:
+            self.twitch_downloader.poll_scheduler.record_upload(
+                clip_info.broadcaster,
+            )
+        if self.uploads_index is not None:
+            self.uploads_index.add(
+                [
+                    UploadedVideo(
+                        video_id=None,
+                        title=video_info.title,
+                        duration_seconds=clip_info.duration_seconds,
+                        clip_id=clip_info.id,
+                    ),
+                ],
+            )
+        if self.fingerprint_index is not None:
+            self.fingerprint_index.add(
+                clip_info.id,
+                self._frame_hashes.pop(clip_info.id, []),
+            )
+        clip_path = Path(video_info.video_path)
+        if self.disk_budget is not None:
+            self.disk_budget.mark_completed(clip_path)
+        deletion_status, log_info = (
+            self.twitch_downloader.delete_clip_by_path(
+                clip_path,
+            )
+        )
+        if not deletion_status:
+            self.logger.log(log_info)
+
+    def _lease_clip(self, clip_info: ClipInfo) -> bool:
+        if not self.folder_lock.try_lease(clip_info.id):
+            self.logger.log(
+                f"Skipping clip {clip_info.slug}: leased by another run",
+            )
+            return False
+        # Checked under the lease, as runs mark clips before releasing
+        if self.folder_lock.is_published(clip_info.id):
+            self.folder_lock.release_lease(clip_info.id)
+            self.logger.log(
+                f"Skipping clip {clip_info.slug}: published by another run",
+            )
+            return False
+        return True
 
     def _publish_clip(
         self,
         clip_info: ClipInfo,
         is_vertical: bool | None = None,
+        publish_at: datetime | None = None,
+        raise_timeouts: bool | None = None,
+        on_uploaded: Callable[[], None] | None = None,
     ) -> bool:
+        """Publish a clip no other run sharing the clips folder has.
+
+        Published clips are marked in the clips folder, so no run
+        publishes them again. Their leases are kept until the run
+        ends, so the run still owns their files.
+
+        :param raise_timeouts: raise `TwitchDlTimeoutError` instead
+            of skipping the clip
+        :param on_uploaded: called as soon as the video is uploaded
+        """
+        if not self._lease_clip(clip_info):
+            return False
+        cost = self._predict_cost(clip_info, is_vertical)
+        started_at = (time.monotonic(), ClipCostModel.cpu_seconds())
+        is_published = False
         try:
-            clip_path = self._download_clip(clip_info)
-            try:
-                title, description, tags = self._generate_video_metadata(
+            is_published = self._publish_leased_clip(
+                clip_info,
+                is_vertical,
+                publish_at,
+                raise_timeouts,
+                on_uploaded,
+            )
+        finally:
+            if not is_published:
+                self.folder_lock.release_lease(clip_info.id)
+        if is_published:
+            self._log_clip_cost(clip_info, cost, started_at)
+        return is_published
+
+    def _publish_leased_clip(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+        publish_at: datetime | None = None,
+        raise_timeouts: bool | None = None,
+        on_uploaded: Callable[[], None] | None = None,
+    ) -> bool:
+        try:
+            clip_info = self.twitch_downloader.select_quality(
+                clip_info,
+                is_vertical=is_vertical,
+            )
+            if is_vertical and not self._fits_encode_settings(clip_info):
+                return False
+            metadata = self._get_video_metadata(clip_info, is_vertical)
+            if metadata is None:
+                return False
+            with self._profile_stage("clip_source"):
+                clip_source = self._get_clip_source(clip_info, is_vertical)
+            with self._profile_stage("dedup"):
+                is_duplicate = self._is_duplicate_video(
                     clip_info,
-                    is_vertical,
+                    clip_source,
                 )
-            except RuntimeError as e:
-                self.logger.log(f"{e}")
-                self.used_titles.append(clip_info.title)
+            if is_duplicate:
+                self._skip_duplicate_clip(clip_info, clip_source)
                 return False
             if is_vertical:
-                try:
-                    clip_path = self._convert_clip_to_vertical(
-                        clip_path,
+                with self._profile_stage("vertical_conversion"):
+                    clip_path, is_converted = self._prepare_vertical_clip(
+                        clip_source,
                         clip_info,
                     )
-                except RuntimeError as e:
-                    self.logger.log(f"{e}")
-                    title = title.replace(" #shorts", "")
-            self.yt_uploader.upload(
-                VideoInfo(
-                    video_path=clip_path,
-                    title=title,
-                    description=description,
-                    tags=tags,
-                    made_for_kids=(
-                        self.custom_metadata.video_properties.made_for_kids
-                        if self.custom_metadata
-                        and self.custom_metadata.video_properties
-                        else None
-                    ),
-                    privacy=(
-                        self.custom_metadata.video_properties.privacy
-                        if self.custom_metadata
-                        and self.custom_metadata.video_properties
-                        else None
-                    ),
-                    language=(
-                        self.custom_metadata.video_properties.language
-                        if self.custom_metadata
-                        and self.custom_metadata.video_properties
-                        else None
-                    ),
-                    license_=(
-                        self.custom_metadata.video_properties.license_
-                        if self.custom_metadata
-                        and self.custom_metadata.video_properties
-                        else None
-                    ),
-                ),
+                if not is_converted:
+                    metadata = self._strip_shorts_tag(metadata)
+            else:
+                clip_path = Path(clip_source)
+            video_info = self._build_video_info(
+                clip_path,
+                metadata,
+                publish_at,
             )
-            self.used_titles.append(clip_info.title)
-            deletion_status, log_info = (
-                self.twitch_downloader.delete_clip_by_path(
-                    clip_path,
+            with self._profile_stage("upload"):
+                self._upload_video(video_info)
+            if on_uploaded is not None:
+                on_uploaded()
+            self._finish_publish(clip_info, video_info)
+            return True
+        except TwitchDlTimeoutError as e:
+            if raise_timeouts:
+                raise
+            self.logger.log(f"Skipping clip {clip_info.slug}: {e}")
+            return False
+        except RuntimeError as e:
+            self.logger.log(
+                "An error occurred while publishing the clip.",
+                level=LogLevelEnum.ERROR,
+            )
+            self.logger.log(
+                f"Error details: {e}",
+                level=LogLevelEnum.ERROR,
+            )
+            raise e
+
+    async def _apublish_clip(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+        publish_at: datetime | None = None,
+    ) -> bool:
+        """Publish a clip like `_publish_clip`, without blocking.
+
+        Fingerprinting and conversion run in worker threads.
+        """
+        if not self._lease_clip(clip_info):
+            return False
+        cost = self._predict_cost(clip_info, is_vertical)
+        started_at = (time.monotonic(), ClipCostModel.cpu_seconds())
+        is_published = False
+        try:
+            is_published = await self._apublish_leased_clip(
+                clip_info,
+                is_vertical,
+                publish_at,
+            )
+        finally:
+            if not is_published:
+                self.folder_lock.release_lease(clip_info.id)
+        if is_published:
+            self._log_clip_cost(clip_info, cost, started_at)
+        return is_published
+
+    def _predict_cost(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+    ) -> ClipCost | None:
+        if self.cost_model is None:
+            return None
+        clip_info = self.twitch_downloader.select_quality(
+            clip_info,
+            is_vertical=is_vertical,
+        )
+        return self.cost_model.predict(
+            clip_info,
+            is_vertical=is_vertical,
+            is_streamed=bool(
+                is_vertical and self.streaming_settings is not None,
+            ),
+            output_bytes=(
+                self._predict_encode_bytes(clip_info) if is_vertical else None
+            ),
+        )
+
+    def _log_clip_cost(
+        self,
+        clip_info: ClipInfo,
+        cost: ClipCost | None,
+        started_at: tuple[float, float],
+    ) -> None:
+        if cost is None:
+            return
+        started_wall_seconds, started_cpu_seconds = started_at
+        self.logger.log(
+            f"Clip {clip_info.slug} cost: predicted "
+            f"{cost.wall_seconds:.1f}s wall, {cost.cpu_seconds:.1f}s CPU; "
+            f"actual {time.monotonic() - started_wall_seconds:.1f}s wall, "
+            f"{ClipCostModel.cpu_seconds() - started_cpu_seconds:.1f}s "
+            "process CPU",
+        )
+
+    def _start_budget(self) -> None:
+        self._budget_started_at = (
+            time.monotonic(),
+            ClipCostModel.cpu_seconds(),
+        )
+
+    def _get_budget_kind(self) -> BudgetKindEnum:
+        return self.run_budget.kind or BudgetKindEnum.WALL_CLOCK
+
+    def _get_remaining_budget_seconds(self) -> float:
+        started_wall_seconds, started_cpu_seconds = self._budget_started_at
+        if self._get_budget_kind() == BudgetKindEnum.CPU:
+            spent_seconds = ClipCostModel.cpu_seconds() - started_cpu_seconds
+        else:
+            spent_seconds = time.monotonic() - started_wall_seconds
+        return self.run_budget.seconds - spent_seconds
+
+    def _plan_within_budget(self, clips: list[ClipInfo]) -> list[ClipInfo]:
+        """Put first the clips of the most views fitting the budget.
+
+        The other clips follow as replacements for clips that fail or
+        get skipped.
+        """
+        if self.run_budget is None or not clips:
+            return clips
+        remaining_seconds = self._get_remaining_budget_seconds()
+        costs = [
+            self._predict_cost(
+                clip_info,
+                is_vertical=self._is_vertical(clip_info),
+            ).get_seconds(self._get_budget_kind())
+            for clip_info in clips
+        ]
+        picked_indexes = ClipCostModel.select_within_budget(
+            costs=costs,
+            values=[clip_info.view_count for clip_info in clips],
+            budget=remaining_seconds,
+            max_count=self.max_videos,
+        )
+        self.logger.log(
+            f"Planned {len(picked_indexes)} clips with "
+            f"{sum(clips[index].view_count for index in picked_indexes)} "
+            f"views, predicted to take "
+            f"{sum(costs[index] for index in picked_indexes):.1f}s of "
+            f"{remaining_seconds:.1f}s {self._get_budget_kind().value} "
+            f"budget",
+        )
+        picked_indexes_set = set(picked_indexes)
+        return [clips[index] for index in picked_indexes] + [
+            clip_info
+            for index, clip_info in enumerate(clips)
+            if index not in picked_indexes_set
+        ]
+
+    def _fits_budget(self, clip_info: ClipInfo) -> bool:
+        if self.run_budget is None:
+            return True
+        remaining_seconds = self._get_remaining_budget_seconds()
+        predicted_seconds = self._predict_cost(
+            clip_info,
+            is_vertical=self._is_vertical(clip_info),
+        ).get_seconds(self._get_budget_kind())
+        if predicted_seconds <= remaining_seconds:
+            return True
+        self.logger.log(
+            f"Skipping clip {clip_info.slug}: predicted to take "
+            f"{predicted_seconds:.1f}s, {remaining_seconds:.1f}s of "
+            f"budget left",
+        )
+        return False
+
+    async def _apublish_leased_clip(
+        self,
+        clip_info: ClipInfo,
+        is_vertical: bool | None = None,
+        publish_at: datetime | None = None,
+    ) -> bool:
+        try:
+            clip_info = self.twitch_downloader.select_quality(
+                clip_info,
+                is_vertical=is_vertical,
+            )
+            if is_vertical and not self._fits_encode_settings(clip_info):
+                return False
+            metadata = self._get_video_metadata(clip_info, is_vertical)
+            if metadata is None:
+                return False
+            clip_source = await self._aget_clip_source(clip_info, is_vertical)
+            is_duplicate = await self.thread_work.to_thread(
+                self._is_duplicate_video,
+                clip_info,
+                clip_source,
+            )
+            if is_duplicate:
+                self._skip_duplicate_clip(clip_info, clip_source)
+                return False
+            if is_vertical:
+                clip_path, is_converted = await self.thread_work.to_thread(
+                    self._prepare_vertical_clip,
+                    clip_source,
+                    clip_info,
                 )
+                if not is_converted:
+                    metadata = self._strip_shorts_tag(metadata)
+            else:
+                clip_path = Path(clip_source)
+            video_info = self._build_video_info(
+                clip_path,
+                metadata,
+                publish_at,
             )
-            if not deletion_status:
-                self.logger.log(log_info)
+            await self._aupload_video(video_info)
+            self._finish_publish(clip_info, video_info)
             return True
+        except TwitchDlTimeoutError as e:
+            self.logger.log(f"Skipping clip {clip_info.slug}: {e}")
+            return False
         except RuntimeError as e:
-            self.logger.log("An error occurred while publishing the clip.")
-            self.logger.log(f"Error details: {e}")
+            self.logger.log(
+                "An error occurred while publishing the clip.",
+                level=LogLevelEnum.ERROR,
+            )
+            self.logger.log(
+                f"Error details: {e}",
+                level=LogLevelEnum.ERROR,
+            )
             raise e
 
-    def run(self) -> None:
-        all_clips_json = self.twitch_downloader.get_clips(
-            period=self.twitch_clips_period,
-            clips_limit=self.clips_limit,
+    def _get_uplink_bytes_per_second(self) -> float | None:
+        """Get upload throughput measured so far, or the configured one."""
+        upload_bandwidth = self.shared_resources.upload_bandwidth
+        if upload_bandwidth is not None:
+            transfer_metrics = upload_bandwidth.metrics()
+            if transfer_metrics.bytes_per_second:
+                return transfer_metrics.bytes_per_second
+            if transfer_metrics.rate_limit:
+                return transfer_metrics.rate_limit
+        if self.encode_settings is not None:
+            return self.encode_settings.uplink_bytes_per_second
+        return None
+
+    def _log_upload_prediction(self, video_info: VideoInfo) -> int:
+        """Log predicted upload time of a video.
+
+        :returns: size of the video in bytes
+        """
+        size_bytes = Path(video_info.video_path).stat().st_size
+        uplink_bytes_per_second = self._get_uplink_bytes_per_second()
+        if uplink_bytes_per_second:
+            predicted_seconds = VerticalVideoConverter.predict_upload_seconds(
+                size_bytes,
+                uplink_bytes_per_second,
+            )
+            self.logger.log(
+                f"Predicted upload time of {size_bytes} bytes: "
+                f"{predicted_seconds:.1f}s "
+                f"at {uplink_bytes_per_second:.0f} B/s",
+            )
+        return size_bytes
+
+    def _upload_video(self, video_info: VideoInfo) -> None:
+        size_bytes = self._log_upload_prediction(video_info)
+        started_at = time.monotonic()
+        self.yt_uploader.upload(video_info)
+        self._record_upload(size_bytes, started_at)
+
+    async def _aupload_video(self, video_info: VideoInfo) -> None:
+        size_bytes = self._log_upload_prediction(video_info)
+        started_at = time.monotonic()
+        await self.thread_work.run(self.yt_uploader.aupload(video_info))
+        self._record_upload(size_bytes, started_at)
+
+    def _record_upload(self, size_bytes: int, started_at: float) -> None:
+        upload_seconds = time.monotonic() - started_at
+        self.logger.log(
+            f"Upload of {size_bytes} bytes took {upload_seconds:.1f}s",
         )
-        all_clips_info = self.twitch_downloader.generate_clips_info(
-            clips_json=all_clips_json,
+        if self.cost_model is not None:
+            self.cost_model.record_upload(size_bytes, upload_seconds)
+
+    def _select_clips(self) -> list[ClipInfo]:
+        """Discover the most viewed clips passing the filters.
+
+        Discovery stops once `candidates_per_video` candidates per
+        video to upload pass the filters, leaving the rest of the
+        channel listings unfetched.
+        """
+        with self._profile_stage("sync_uploads_index"):
+            self._sync_uploads_index()
+        needed_candidates = self.max_videos * self.candidates_per_video
+        selection = self._start_selection()
+        discovered_clips: list[ClipInfo] = []
+        filtered_clips: list[ClipInfo] = []
+        with closing(
+            self.twitch_downloader.discover_clips(
+                period=self.twitch_clips_period,
+                clips_limit=self.clips_limit,
+            ),
+        ) as clips:
+            for clip_info in clips:
+                discovered_clips.append(clip_info)
+                if len(discovered_clips) % needed_candidates == 0:
+                    with self._profile_stage("filter_clips"):
+                        filtered_clips = self._filter_new_clips(
+                            selection,
+                            discovered_clips,
+                        )
+                    if len(filtered_clips) >= needed_candidates:
+                        break
+            else:
+                with self._profile_stage("filter_clips"):
+                    filtered_clips = self._filter_new_clips(
+                        selection,
+                        discovered_clips,
+                    )
+        return self._finish_selection(filtered_clips, discovered_clips)
+
+    async def _aselect_clips(self) -> list[ClipInfo]:
+        """Discover clips like `_select_clips`, without blocking.
+
+        The index sync and filters run in worker threads.
+        """
+        await self.thread_work.to_thread(self._sync_uploads_index)
+        needed_candidates = self.max_videos * self.candidates_per_video
+        selection = self._start_selection()
+        discovered_clips: list[ClipInfo] = []
+        filtered_clips: list[ClipInfo] = []
+        async with aclosing(
+            self.twitch_downloader.adiscover_clips(
+                period=self.twitch_clips_period,
+                clips_limit=self.clips_limit,
+            ),
+        ) as clips:
+            async for clip_info in clips:
+                discovered_clips.append(clip_info)
+                if len(discovered_clips) % needed_candidates == 0:
+                    filtered_clips = await self.thread_work.to_thread(
+                        self._filter_new_clips,
+                        selection,
+                        discovered_clips,
+                    )
+                    if len(filtered_clips) >= needed_candidates:
+                        break
+            else:
+                filtered_clips = await self.thread_work.to_thread(
+                    self._filter_new_clips,
+                    selection,
+                    discovered_clips,
+                )
+        return self._finish_selection(filtered_clips, discovered_clips)
+
+    def _finish_selection(
+        self,
+        filtered_clips: list[ClipInfo],
+        discovered_clips: list[ClipInfo],
+    ) -> list[ClipInfo]:
+        if self.twitch_downloader.poll_scheduler is not None:
+            self.twitch_downloader.poll_scheduler.record_candidates(
+                [clip_info.broadcaster for clip_info in filtered_clips],
+            )
+        self.logger.log(
+            f"Selected {len(filtered_clips)} of "
+            f"{len(discovered_clips)} discovered clips",
         )
-        filtered_clips = self._filter_clips(clips=all_clips_info)
-        sorted_clips_info_by_views = self.twitch_downloader.sort_by_views(
+        if self.clip_history is not None:
+            self.clip_history.append(discovered_clips)
+            return self.clip_history.rank(filtered_clips)
+        return self.twitch_downloader.sort_by_views(
             clips_info=filtered_clips,
         )
+
+    def _is_vertical(self, clip_info: ClipInfo) -> bool:
+        return (
+            self.vertical_video_range.min_duration
+            <= clip_info.duration_seconds
+            < self.vertical_video_range.max_duration
+        )
+
+    def _get_publish_slots(self) -> list[datetime]:
+        return (
+            self.publish_schedule.get_slots(count=self.max_videos)
+            if self.publish_schedule is not None
+            else []
+        )
+
+    def _clean_up_run(self) -> None:
+        with self._profile_stage("clean_up"):
+            self._delete_run_files()
+        self.folder_lock.release_leases()
+        if self.uploads_index is not None:
+            self.uploads_index.save()
+        if self.profiler is not None:
+            self.profiler.write_summary()
+
+    def _delete_run_files(self) -> None:
+        self.twitch_downloader.delete_all_clips()
+        if self.disk_budget is not None:
+            metrics = self.disk_budget.metrics()
+            self.logger.log(
+                f"Clips folder usage: {metrics.used_bytes}/"
+                f"{metrics.budget_bytes} bytes, "
+                f"free: {metrics.free_bytes} bytes, "
+                f"evicted: {metrics.evicted_bytes} bytes, "
+                f"blocked: {metrics.blocked_seconds}s",
+            )
+        for bandwidth_limiter in (
+            self.shared_resources.download_bandwidth,
+            self.shared_resources.upload_bandwidth,
+        ):
+            if bandwidth_limiter is None:
+                continue
+            transfer_metrics = bandwidth_limiter.metrics()
+            self.logger.log(
+                f"Bandwidth of {bandwidth_limiter.name}: "
+                f"{transfer_metrics.transferred_bytes} bytes "
+                f"in {transfer_metrics.active_seconds}s, "
+                f"achieved: {transfer_metrics.bytes_per_second} B/s, "
+                f"limit: {transfer_metrics.rate_limit or 'none'} B/s, "
+                f"throttled: {transfer_metrics.throttled_seconds}s",
+            )
+        for slots in (
+            self.shared_resources.download_slots,
+            self.shared_resources.conversion_slots,
+        ):
+            if not isinstance(slots, AdaptiveConcurrencyLimiter):
+                continue
+            concurrency_metrics = slots.metrics()
+            self.logger.log(
+                f"Concurrency of {slots.name}: "
+                f"{concurrency_metrics.limit} "
+                f"(peak: {concurrency_metrics.peak_limit}), "
+                f"throughput: {concurrency_metrics.tasks_per_second} "
+                f"tasks/s, errors: {concurrency_metrics.errors}/"
+                f"{concurrency_metrics.completed}, "
+                f"overloads: {concurrency_metrics.overloads}",
+            )
+        if self.scratch_folder_path is not None:
+            self.twitch_downloader.delete_all_clips(
+                folder_path=self.scratch_folder_path,
+            )
+
+    def run(self) -> int:
+        self._start_budget()
+        try:
+            with self._profile_stage("select_clips"):
+                sorted_clips_info_by_views = self._plan_within_budget(
+                    self._select_clips(),
+                )
+            publish_slots = self._get_publish_slots()
+            posted_videos = 0
+            for clip_info in sorted_clips_info_by_views:
+                if not self._fits_budget(clip_info):
+                    continue
+                try:
+                    with self._profile_stage("publish_clip"):
+                        success = self._publish_clip(
+                            clip_info=clip_info,
+                            is_vertical=self._is_vertical(clip_info),
+                            publish_at=(
+                                publish_slots[posted_videos]
+                                if publish_slots
+                                else None
+                            ),
+                        )
+                    if success:
+                        posted_videos += 1
+                except RuntimeError:
+                    break
+                if posted_videos >= self.max_videos:
+                    break
+        finally:
+            self._clean_up_run()
+        return posted_videos
+
+    async def arun(self) -> int:
+        """Run the pipeline like `run`, without blocking the event loop.
+
+        Stages aren't profiled. Run files are also cleaned up when the
+        run is cancelled, once work left running in threads finished.
+        """
+        self._start_budget()
+        try:
+            sorted_clips_info_by_views = self._plan_within_budget(
+                await self._aselect_clips(),
+            )
+            publish_slots = self._get_publish_slots()
+            posted_videos = 0
+            for clip_info in sorted_clips_info_by_views:
+                if not self._fits_budget(clip_info):
+                    continue
+                try:
+                    success = await self._apublish_clip(
+                        clip_info=clip_info,
+                        is_vertical=self._is_vertical(clip_info),
+                        publish_at=(
+                            publish_slots[posted_videos]
+                            if publish_slots
+                            else None
+                        ),
+                    )
+                    if success:
+                        posted_videos += 1
+                except RuntimeError:
+                    break
+                if posted_videos >= self.max_videos:
+                    break
+        finally:
+            await self.thread_work.wait()
+            await self.twitch_downloader.thread_work.wait()
+            await asyncio.to_thread(self._clean_up_run)
+        return posted_videos
+
+    def enqueue_clips(
+        self,
+        work_queue: BaseWorkQueue,
+        max_jobs: int | None = None,
+    ) -> int:
+        """Queue the best candidate clips for worker nodes.
+
+        Clips are keyed by id, so clips queued by earlier runs are
+        skipped.
+
+        :returns: number of queued clips
+        :rtype: int
+        """
+        with self._profile_stage("select_clips"):
+            selected_clips = self._select_clips()
+        selected_clips = selected_clips[: max_jobs or self.max_videos]
+        queued_clips = sum(
+            work_queue.enqueue(clip_info.id, asdict(clip_info))
+            for clip_info in selected_clips
+        )
+        self.logger.log(
+            f"Queued {queued_clips} of {len(selected_clips)} selected clips",
+        )
+        return queued_clips
+
+    @staticmethod
+    def _clip_info_from_payload(payload: dict) -> ClipInfo:
+        return ClipInfo(
+            **{
+                **payload,
+                "video_qualities": [
+                    tuple(video_quality)
+                    for video_quality in payload.get("video_qualities", [])
+                ],
+            },
+        )
+
+    @staticmethod
+    @contextmanager
+    def _lease_heartbeat(
+        work_queue: BaseWorkQueue,
+        job: QueueJob,
+        visibility_timeout: float,
+    ) -> Iterator[None]:
+        stopped = threading.Event()
+
+        def extend_lease() -> None:
+            while not stopped.wait(visibility_timeout / 3):
+                if not work_queue.extend_lease(job, visibility_timeout):
+                    return
+
+        heartbeat = threading.Thread(target=extend_lease, daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+    def run_worker(
+        self,
+        work_queue: BaseWorkQueue,
+        worker_id: str | None = None,
+        visibility_timeout: float | None = None,
+    ) -> int:
+        """Publish queued clips until the queue is drained.
+
+        Leases are extended while a clip is processed. Skipped clips
+        complete their job and timed out ones are retried. On upload
+        errors the job is released for another worker and this worker
+        stops, as `run` does. Publish slots are claimed through the
+        queue, so workers never schedule videos at the same time.
+        Uploads are marked in the queue before the job completes, so
+        jobs taken over from a dead worker aren't uploaded twice.
+
+        :returns: number of posted videos
+        :rtype: int
+        """
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        visibility_timeout = visibility_timeout or 1800
         posted_videos = 0
-        for clip_info in sorted_clips_info_by_views:
-            is_vertical = (
-                self.vertical_video_range.min_duration
-                <= clip_info.duration_seconds
-                < self.vertical_video_range.max_duration
+        while posted_videos < self.max_videos:
+            job = work_queue.lease(
+                worker_id=worker_id,
+                visibility_timeout=visibility_timeout,
             )
+            if job is None:
+                break
+            clip_info = self._clip_info_from_payload(job.payload)
+            if self._is_uploaded_job(job, clip_info):
+                self.logger.log(
+                    f"Clip {clip_info.slug} was already uploaded",
+                )
+                self.folder_lock.mark_published(clip_info.id)
+                work_queue.complete(job)
+                continue
+            publish_at = self._claim_publish_slot(work_queue)
+            success = False
             try:
-                success = self._publish_clip(
-                    clip_info=clip_info,
-                    is_vertical=is_vertical,
+                with self._lease_heartbeat(
+                    work_queue=work_queue,
+                    job=job,
+                    visibility_timeout=visibility_timeout,
+                ), self._profile_stage("publish_clip"):
+                    success = self._publish_clip(
+                        clip_info=clip_info,
+                        is_vertical=self._is_vertical(clip_info),
+                        publish_at=publish_at,
+                        raise_timeouts=True,
+                        on_uploaded=lambda: self._mark_job_uploaded(
+                            work_queue,
+                            job,
+                        ),
+                    )
+            except TwitchDlTimeoutError as e:
+                self.logger.log(
+                    f"Retrying clip {clip_info.slug} later: {e}",
+                    level=LogLevelEnum.WARNING,
                 )
-                if success:
-                    posted_videos += 1
-            except RuntimeError:
-                break
-            if posted_videos >= self.max_videos:
+                work_queue.fail(job, error=str(e), retry_delay=60)
+                continue
+            except RuntimeError as e:
+                work_queue.fail(job, error=str(e))
                 break
-        self.twitch_downloader.delete_all_clips()
+            finally:
+                if publish_at is not None and not success:
+                    work_queue.release_publish_slot(publish_at)
+            if not work_queue.complete(job):
+                self.logger.log(
+                    f"Lease of job {job.job_id} was lost before completion",
+                    level=LogLevelEnum.WARNING,
+                )
+            if success:
+                posted_videos += 1
+        self._clean_up_run()
+        return posted_videos
+
+    def _is_uploaded_job(self, job: QueueJob, clip_info: ClipInfo) -> bool:
+        """Check if a worker uploaded the clip but didn't complete."""
+        return job.is_uploaded or (
+            self.uploads_index is not None
+            and self.uploads_index.has_clip(clip_info.id)
+        )
+
+    def _mark_job_uploaded(
+        self,
+        work_queue: BaseWorkQueue,
+        job: QueueJob,
+    ) -> None:
+        if not work_queue.mark_uploaded(job):
+            self.logger.log(
+                f"Lease of job {job.job_id} was lost before its upload",
+                level=LogLevelEnum.WARNING,
+            )
+
+    def _claim_publish_slot(
+        self,
+        work_queue: BaseWorkQueue,
+    ) -> datetime | None:
+        if self.publish_schedule is None:
+            return None
+        count = self.max_videos
+        while True:
+            publish_at = work_queue.claim_publish_slot(
+                self.publish_schedule.get_slots(count=count),
+            )
+            if publish_at is not None:
+                return publish_at
+            count *= 2
 
     def close_session(self) -> None:
+        if self.profiler is not None:
+            self.profiler.close()
+        self.twitch_downloader.cancel()
         self.yt_uploader.close_session()
+        self.folder_lock.release_run()
+        if self.scratch_folder_path is not None:
+            shutil.rmtree(self.scratch_folder_path, ignore_errors=True)
@@ -1,58 +1,433 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Tuple
 
-from moviepy.editor import ColorClip, CompositeVideoClip, VideoFileClip
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from moviepy.editor import CompositeVideoClip, VideoFileClip
+
+from .CpuMeter import CpuMeter
+
+
+class VerticalModeEnum(str, Enum):
+    LETTERBOX = "letterbox"
+    SMART_CROP = "smart_crop"
+
+
+@dataclass
+class EncodeSettings:
+    """Bitrate-targeted encode of vertical videos.
+
+    `max_bytes_per_second` caps every second of the output and
+    `target_bytes` the whole file, the lower of the two wins. Audio is
+    encoded at `audio_bytes_per_second` out of that budget.
+    `uplink_bytes_per_second` is only used to predict upload times.
+    `timeout_seconds` bounds every ffmpeg pass.
+    """
+
+    max_bytes_per_second: int | None = None
+    target_bytes: int | None = None
+    audio_bytes_per_second: int | None = None
+    two_pass: bool | None = None
+    preset: str | None = None
+    uplink_bytes_per_second: int | None = None
+    timeout_seconds: float | None = None
 
 
 class VerticalVideoConverter:
+    # Video bitrate floor, below which encodes aren't worth uploading
+    _MIN_VIDEO_BITS_PER_SECOND = 200_000
+    _ENCODE_TIMEOUT_SECONDS = 300
+
     @staticmethod
-    def create_background_file(
-        output_file_path: Path,
-        duration: int,
-        framerate: int,
+    def get_bitrates(
+        encode_settings: EncodeSettings,
+        duration: float,
+    ) -> tuple[int, int]:
+        """Get video and audio bitrates in bits per second.
+
+        :raises ValueError: if the budget leaves the video less than
+            the bitrate floor
+        """
+        budgets = [
+            budget
+            for budget in (
+                encode_settings.max_bytes_per_second,
+                (
+                    encode_settings.target_bytes / max(duration, 1)
+                    if encode_settings.target_bytes
+                    else None
+                ),
+            )
+            if budget
+        ]
+        if not budgets:
+            no_target_error = "Encode settings need a size or bitrate target"
+            raise ValueError(no_target_error)
+        audio_bitrate = (encode_settings.audio_bytes_per_second or 16_000) * 8
+        video_bitrate = int(min(budgets) * 8) - audio_bitrate
+        min_video_bitrate = VerticalVideoConverter._MIN_VIDEO_BITS_PER_SECOND
+        if video_bitrate < min_video_bitrate:
+            budget_error = (
+                f"Encode budget leaves {video_bitrate} b/s of video for "
+                f"{duration:.0f}s, under the {min_video_bitrate} b/s floor"
+            )
+            raise ValueError(budget_error)
+        return video_bitrate, audio_bitrate
+
+    @staticmethod
+    def predict_size_bytes(
+        encode_settings: EncodeSettings,
+        duration: float,
+    ) -> int:
+        video_bitrate, audio_bitrate = VerticalVideoConverter.get_bitrates(
+            encode_settings,
+            duration,
+        )
+        return int((video_bitrate + audio_bitrate) * duration / 8)
+
+    @staticmethod
+    def predict_upload_seconds(
+        size_bytes: int,
+        uplink_bytes_per_second: float,
+    ) -> float:
+        return size_bytes / uplink_bytes_per_second
+
+    @staticmethod
+    def get_rate_arguments(
+        encode_settings: EncodeSettings,
+        duration: float,
+    ) -> list[str]:
+        """Get ffmpeg x264 arguments of the bitrate-targeted encode.
+
+        The VBV buffer holds one second at the max rate, which caps the
+        size of every output second.
+        """
+        video_bitrate, _ = VerticalVideoConverter.get_bitrates(
+            encode_settings,
+            duration,
+        )
+        return [
+            "-c:v",
+            "libx264",
+            "-preset",
+            encode_settings.preset or "veryfast",
+            "-b:v",
+            str(video_bitrate),
+            "-maxrate",
+            str(video_bitrate),
+            "-bufsize",
+            str(video_bitrate),
+            "-pix_fmt",
+            "yuv420p",
+        ]
+
+    @staticmethod
+    def run_ffmpeg_encode(
+        source: Path | str,
+        output_path: Path,
+        video_arguments: list[str],
+        audio_arguments: list[str],
+        two_pass: bool | None = None,
+        ffmpeg_path: str | None = None,
+        timeout_seconds: float | None = None,
+    ) -> Path:
+        """Encode with ffmpeg, in two passes when asked.
+
+        The first pass only writes the rate control log, so the second
+        one can spend the bitrate where the video needs it. Every pass
+        is killed after `timeout_seconds`, and its CPU time is counted
+        by `CpuMeter`.
+        """
+        ffmpeg_path = ffmpeg_path or FFMPEG_BINARY
+        timeout_seconds = (
+            timeout_seconds or VerticalVideoConverter._ENCODE_TIMEOUT_SECONDS
+        )
+        command = [ffmpeg_path, "-y", "-v", "error", "-i", str(source)]
+        with tempfile.TemporaryDirectory(
+            prefix="passlog_",
+            dir=Path(output_path).parent,
+        ) as passlog_folder:
+            passlog_path = str(Path(passlog_folder) / "x264")
+            if two_pass:
+                CpuMeter.run(
+                    [
+                        *command,
+                        *video_arguments,
+                        "-pass",
+                        "1",
+                        "-passlogfile",
+                        passlog_path,
+                        "-an",
+                        "-f",
+                        "mp4",
+                        os.devnull,
+                    ],
+                    timeout_seconds=timeout_seconds,
+                )
+            CpuMeter.run(
+                [
+                    *command,
+                    *video_arguments,
+                    *(
+                        ["-pass", "2", "-passlogfile", passlog_path]
+                        if two_pass
+                        else []
+                    ),
+                    *audio_arguments,
+                    "-movflags",
+                    "+faststart",
+                    str(output_path),
+                ],
+                timeout_seconds=timeout_seconds,
+            )
+        return Path(output_path)
+
+    @staticmethod
+    def create_vertical_video(
+        clip_path: Path | str,
+        background_path: Path | None,
+        output_path: Path,
         size: Tuple[int, int] | None = None,
         color: Tuple[int, int, int] | None = None,
+        encode_settings: EncodeSettings | None = None,
     ) -> Path:
+        """Letterbox the clip onto a vertical canvas.
+
+        Without `background_path` the canvas is filled in memory with
+        `color`, so no background file is written. `clip_path` may be
+        any source ffmpeg can read, including a stream URL.
+
+        With `encode_settings` the output is encoded to their bitrate
+        target. Two-pass encodes letterbox with ffmpeg filters, so they
+        ignore `background_path`.
+        """
         if color is None:
             color = (0, 0, 0)
         if size is None:
             size = (1080, 1920)
         try:
-            ColorClip(
-                size=size,
-                color=color,
-                duration=duration,
-            ).write_videofile(
-                str(output_file_path),
-                fps=framerate,
+            clip = VideoFileClip(str(clip_path))
+            if encode_settings is not None and encode_settings.two_pass:
+                duration = clip.duration
+                clip.close()
+                return VerticalVideoConverter._encode_letterbox_two_pass(
+                    clip_path=clip_path,
+                    output_path=output_path,
+                    size=size,
+                    color=color,
+                    encode_settings=encode_settings,
+                    duration=duration,
+                )
+            clip = clip.subclip(0, clip.duration)
+            resized_clip = clip.resize(width=size[0])
+            centered_resized_clip = resized_clip.with_position(
+                ("center", "center"),
+            )
+            if background_path is None:
+                video = CompositeVideoClip(
+                    [centered_resized_clip],
+                    size=size,
+                    bg_color=color,
+                )
+            else:
+                background = VideoFileClip(str(background_path))
+                video = CompositeVideoClip(
+                    [background, centered_resized_clip],
+                )
+            video.write_videofile(
+                str(output_path),
+                fps=clip.fps,
+                audio_codec="aac",
                 logger=None,
+                **VerticalVideoConverter._get_write_arguments(
+                    encode_settings,
+                    clip.duration,
+                ),
             )
-            return Path(output_file_path)
+            return output_path
         except Exception as e:
-            file_creation_error = "Failed to create background file"
+            file_creation_error = "Failed to create vertical video"
             raise RuntimeError(file_creation_error) from e
 
     @staticmethod
-    def create_vertical_video(
-        clip_path: Path,
-        background_path: Path,
+    def _get_write_arguments(
+        encode_settings: EncodeSettings | None,
+        duration: float,
+    ) -> dict:
+        """Get `write_videofile` arguments of a single-pass encode."""
+        if encode_settings is None:
+            return {}
+        video_bitrate, audio_bitrate = VerticalVideoConverter.get_bitrates(
+            encode_settings,
+            duration,
+        )
+        return {
+            "bitrate": str(video_bitrate),
+            "audio_bitrate": str(audio_bitrate),
+            "preset": encode_settings.preset or "veryfast",
+            "ffmpeg_params": [
+                "-maxrate",
+                str(video_bitrate),
+                "-bufsize",
+                str(video_bitrate),
+            ],
+        }
+
+    @staticmethod
+    def _encode_letterbox_two_pass(
+        clip_path: Path | str,
         output_path: Path,
+        size: Tuple[int, int],
+        color: Tuple[int, int, int],
+        encode_settings: EncodeSettings,
+        duration: float,
     ) -> Path:
+        width, height = size
+        _, audio_bitrate = VerticalVideoConverter.get_bitrates(
+            encode_settings,
+            duration,
+        )
+        return VerticalVideoConverter.run_ffmpeg_encode(
+            source=clip_path,
+            output_path=output_path,
+            video_arguments=[
+                "-vf",
+                f"scale={width}:{height}:force_original_aspect_ratio=decrease"
+                ":force_divisible_by=2,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:"
+                f"color=0x{color[0]:02x}{color[1]:02x}{color[2]:02x},"
+                "setsar=1",
+                *VerticalVideoConverter.get_rate_arguments(
+                    encode_settings,
+                    duration,
+                ),
+            ],
+            audio_arguments=["-c:a", "aac", "-b:a", str(audio_bitrate)],
+            two_pass=True,
+            timeout_seconds=encode_settings.timeout_seconds,
+        )
+
+    @staticmethod
+    def compute_crop_path(
+        sample_frame: Callable[[float], np.ndarray],
+        duration: float,
+        frame_width: int,
+        crop_width: int,
+        samples: int | None = None,
+        analysis_width: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Compute a smoothed crop window path from sampled frames.
+
+        Frames are reduced to roughly `analysis_width` columns of
+        luminance. Each sample is weighted by inter-frame motion and
+        by contrast against the frame mean, and the weighted column
+        centroid is taken as the region of interest.
+
+        :returns: sample times and crop window left offsets in pixels
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        samples = max(2, samples or 12)
+        analysis_width = analysis_width or 160
+        step = max(1, frame_width // analysis_width)
+        times = (np.arange(samples) + 0.5) * duration / samples
+        luma_weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        reduced_frames = np.stack(
+            [
+                sample_frame(float(time))[::step, ::step, :3].astype(
+                    np.float32,
+                )
+                @ luma_weights
+                for time in times
+            ],
+        )
+        motion = np.abs(np.diff(reduced_frames, axis=0))
+        motion = np.concatenate([motion[:1], motion], axis=0)
+        saliency = np.abs(
+            reduced_frames
+            - reduced_frames.mean(axis=(1, 2), keepdims=True),
+        )
+        column_energy = motion.sum(axis=1) + 0.25 * saliency.sum(axis=1)
+        columns = (np.arange(column_energy.shape[1]) + 0.5) * step
+        total_energy = column_energy.sum(axis=1)
+        centers = np.where(
+            total_energy > 0,
+            (column_energy * columns).sum(axis=1)
+            / np.maximum(total_energy, 1e-6),
+            frame_width / 2,
+        )
+        window = max(1, samples // 4)
+        padded_centers = np.pad(centers, window // 2, mode="edge")
+        smoothed_centers = np.convolve(
+            padded_centers,
+            np.ones(window) / window,
+            mode="valid",
+        )[:samples]
+        left_offsets = np.clip(
+            smoothed_centers - crop_width / 2,
+            0,
+            frame_width - crop_width,
+        )
+        return times, left_offsets
+
+    @staticmethod
+    def create_smart_crop_video(
+        clip_path: Path | str,
+        output_path: Path,
+        size: Tuple[int, int] | None = None,
+        samples: int | None = None,
+        analysis_width: int | None = None,
+        encode_settings: EncodeSettings | None = None,
+    ) -> Path:
+        """Crop the clip to 9:16 following its region of interest.
+
+        Frames are cropped in Python, so `encode_settings` always
+        encode a single pass.
+        """
+        if size is None:
+            size = (1080, 1920)
         try:
             clip = VideoFileClip(str(clip_path))
-            clip = clip.subclip(0, clip.duration)
-            resized_clip = clip.resize(width=1080)
-            centered_resized_clip = resized_clip.with_position(
+            frame_width, frame_height = clip.size
+            crop_width = min(
+                frame_width,
+                round(frame_height * size[0] / size[1] / 2) * 2,
+            )
+            times, left_offsets = VerticalVideoConverter.compute_crop_path(
+                sample_frame=clip.get_frame,
+                duration=clip.duration,
+                frame_width=frame_width,
+                crop_width=crop_width,
+                samples=samples,
+                analysis_width=analysis_width,
+            )
+
+            def crop_frame(
+                get_frame: Callable[[float], np.ndarray],
+                time: float,
+            ) -> np.ndarray:
+                left = int(np.interp(time, times, left_offsets))
+                return get_frame(time)[:, left : left + crop_width]
+
+            cropped_clip = clip.transform(crop_frame, apply_to=[])
+            resized_clip = cropped_clip.resize(height=size[1]).with_position(
                 ("center", "center"),
             )
-            background = VideoFileClip(str(background_path))
-            video = CompositeVideoClip([background, centered_resized_clip])
+            video = CompositeVideoClip([resized_clip], size=size)
             video.write_videofile(
                 str(output_path),
+                fps=clip.fps,
                 audio_codec="aac",
                 logger=None,
+                **VerticalVideoConverter._get_write_arguments(
+                    encode_settings,
+                    clip.duration,
+                ),
             )
             return output_path
         except Exception as e:
-            file_creation_error = "Failed to create vertical video"
+            file_creation_error = "Failed to create smart crop video"
             raise RuntimeError(file_creation_error) from e
@@ -0,0 +1,248 @@
+import math
+from collections import Counter
+from itertools import combinations
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from moviepy.editor import VideoFileClip
+
+from .Logger import BaseLogger, Logger
+
+
+class VideoFingerprinter:
+    _HASH_SIZE = 8
+    _DCT_SIZE = 32
+    # Luma deviation under which a frame is too flat to tell apart
+    _MIN_FRAME_STD = 4
+    # Bits within which a frame repeats the previous one (static scene)
+    _STATIC_DISTANCE = 4
+
+    @staticmethod
+    def _dct_matrix(size: int) -> np.ndarray:
+        positions = np.arange(size)
+        angles = (
+            np.pi * (2 * positions[None, :] + 1) * positions[:, None]
+        ) / (2 * size)
+        return np.cos(angles).astype(np.float32)
+
+    @staticmethod
+    def frame_hash(frame: np.ndarray) -> int | None:
+        """Compute a 64-bit DCT perceptual hash of a frame.
+
+        Returns None for nearly uniform frames (e.g. black screens or
+        fades), which would match each other regardless of content.
+        """
+        dct_size = VideoFingerprinter._DCT_SIZE
+        hash_size = VideoFingerprinter._HASH_SIZE
+        step = max(1, min(frame.shape[:2]) // (dct_size * 4))
+        luma = frame[::step, ::step, :3].astype(np.float32) @ np.array(
+            [0.299, 0.587, 0.114],
+            dtype=np.float32,
+        )
+        height = luma.shape[0] - luma.shape[0] % dct_size
+        width = luma.shape[1] - luma.shape[1] % dct_size
+        if height == 0 or width == 0:
+            return None
+        reduced = (
+            luma[:height, :width]
+            .reshape(dct_size, height // dct_size, dct_size, width // dct_size)
+            .mean(axis=(1, 3))
+        )
+        if reduced.std() < VideoFingerprinter._MIN_FRAME_STD:
+            return None
+        dct = VideoFingerprinter._dct_matrix(dct_size)
+        coefficients = (dct @ reduced @ dct.T)[:hash_size, :hash_size]
+        low_frequencies = coefficients.flatten()
+        bits = low_frequencies > np.median(low_frequencies[1:])
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    @staticmethod
+    def frame_hashes(
+        sample_frame: Callable[[float], np.ndarray],
+        duration: float,
+        interval_seconds: float | None = None,
+        max_samples: int | None = None,
+    ) -> list[int]:
+        """Hash frames sampled every `interval_seconds`.
+
+        Sampling at absolute times, unlike at fractions of the duration,
+        keeps clips cut from a stream at different offsets within half
+        an interval of each other. Longer videos skip grid points to
+        stay under `max_samples`. Frames repeating the previous hash are
+        dropped, so a static scene counts as a single frame.
+        """
+        interval_seconds = interval_seconds or 0.5
+        max_samples = max_samples or 40
+        grid_points = max(int(duration / interval_seconds), 1)
+        stride = math.ceil(grid_points / max_samples)
+        frame_hashes: list[int] = []
+        for grid_point in range(0, grid_points, stride):
+            frame_hash = VideoFingerprinter.frame_hash(
+                sample_frame((grid_point + 0.5) * interval_seconds),
+            )
+            if frame_hash is None or (
+                frame_hashes
+                and (frame_hash ^ frame_hashes[-1]).bit_count()
+                <= VideoFingerprinter._STATIC_DISTANCE
+            ):
+                continue
+            frame_hashes.append(frame_hash)
+        return frame_hashes
+
+    @staticmethod
+    def fingerprint(
+        video_source: Path | str,
+        interval_seconds: float | None = None,
+        max_samples: int | None = None,
+    ) -> list[int]:
+        """Hash frames of a video file or stream, see `frame_hashes`."""
+        try:
+            clip = VideoFileClip(str(video_source), audio=False)
+            try:
+                return VideoFingerprinter.frame_hashes(
+                    sample_frame=clip.get_frame,
+                    duration=clip.duration,
+                    interval_seconds=interval_seconds,
+                    max_samples=max_samples,
+                )
+            finally:
+                clip.close()
+        except Exception as e:
+            fingerprint_error = f"Failed to fingerprint video: {video_source}"
+            raise RuntimeError(fingerprint_error) from e
+
+
+class MultiIndexHashTable:
+    """Multi-index hash table over 64-bit hashes.
+
+    Hashes are split into `chunks` substrings, each indexed in its own
+    table. Two hashes within `radius` bits share at least one substring
+    within `radius // chunks` bits, so a lookup only probes those
+    substring neighbours instead of scanning every stored hash.
+    """
+
+    _HASH_BITS = 64
+
+    def __init__(self, chunks: int | None = None) -> None:
+        self.chunks = chunks or 4
+        self._chunk_bits = self._HASH_BITS // self.chunks
+        self._chunk_mask = (1 << self._chunk_bits) - 1
+        self._hashes: list[int] = []
+        self._values: list[str] = []
+        self._tables: list[dict[int, list[int]]] = [
+            {} for _ in range(self.chunks)
+        ]
+        self._flip_masks: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _split(self, hash_: int) -> list[int]:
+        return [
+            (hash_ >> (chunk * self._chunk_bits)) & self._chunk_mask
+            for chunk in range(self.chunks)
+        ]
+
+    def _get_flip_masks(self, radius: int) -> list[int]:
+        if radius not in self._flip_masks:
+            self._flip_masks[radius] = [
+                sum(1 << bit for bit in bits)
+                for flipped_bits in range(radius + 1)
+                for bits in combinations(range(self._chunk_bits), flipped_bits)
+            ]
+        return self._flip_masks[radius]
+
+    def add(self, hash_: int, value: str) -> None:
+        position = len(self._hashes)
+        self._hashes.append(hash_)
+        self._values.append(value)
+        for table, chunk in zip(self._tables, self._split(hash_)):
+            table.setdefault(chunk, []).append(position)
+
+    def search(self, hash_: int, radius: int) -> list[tuple[int, str]]:
+        """Find values within `radius` bits of `hash_`."""
+        flip_masks = self._get_flip_masks(radius // self.chunks)
+        candidates = set()
+        for table, chunk in zip(self._tables, self._split(hash_)):
+            for flip_mask in flip_masks:
+                candidates.update(table.get(chunk ^ flip_mask, ()))
+        found = []
+        for position in candidates:
+            distance = (self._hashes[position] ^ hash_).bit_count()
+            if distance <= radius:
+                found.append((distance, self._values[position]))
+        return found
+
+
+class VideoFingerprintIndex:
+    """Persistent near-duplicate index of uploaded clips.
+
+    Frame hashes are kept in a multi-index hash table and appended to
+    `index_path` as `<clip id> <hash>` lines, so the table is rebuilt
+    on load and adding a clip costs one small write. Clips with fewer
+    than `min_matching_frames` distinct frames (e.g. static scenes)
+    are neither matched nor indexed, as any clip showing the same
+    scene would match them.
+    """
+
+    def __init__(
+        self,
+        index_path: Path,
+        max_distance: int | None = None,
+        min_matching_frames: int | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.index_path = index_path
+        self.max_distance = 10 if max_distance is None else max_distance
+        self.min_matching_frames = min_matching_frames or 3
+        self.logger = (logger if logger else Logger()).get_child(
+            "fingerprints",
+        )
+        self.hash_table = MultiIndexHashTable()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        with Path.open(self.index_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    clip_id, frame_hash = line.split()
+                    self.hash_table.add(int(frame_hash, 16), clip_id)
+                except ValueError:
+                    continue
+        self.logger.log(f"Loaded {len(self.hash_table)} video fingerprints")
+
+    def find_duplicate(self, frame_hashes: list[int]) -> str | None:
+        """Get id of an indexed clip matching enough of the frames."""
+        if len(frame_hashes) < self.min_matching_frames:
+            return None
+        matching_frames: Counter = Counter()
+        for frame_hash in frame_hashes:
+            matching_frames.update(
+                {
+                    clip_id
+                    for _, clip_id in self.hash_table.search(
+                        frame_hash,
+                        self.max_distance,
+                    )
+                },
+            )
+        for clip_id, matches in matching_frames.most_common(1):
+            if matches >= self.min_matching_frames:
+                return clip_id
+        return None
+
+    def add(self, clip_id: str, frame_hashes: list[int]) -> None:
+        if len(frame_hashes) < self.min_matching_frames:
+            self.logger.log(
+                f"Not indexing clip {clip_id}: only {len(frame_hashes)} "
+                "distinct frames",
+            )
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with Path.open(self.index_path, "a", encoding="utf-8") as file:
+            for frame_hash in frame_hashes:
+                self.hash_table.add(frame_hash, clip_id)
+                file.write(f"{clip_id} {frame_hash:016x}\n")
@@ -0,0 +1,346 @@
+import json
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+
+from .Logger import BaseLogger, Logger
+
+
+class JobStatusEnum(str, Enum):
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class QueueJob:
+    job_id: str
+    payload: dict
+    attempts: int
+    lease_token: str
+    is_uploaded: bool = False
+
+
+class BaseWorkQueue(ABC):
+    @abstractmethod
+    def enqueue(self, job_id: str, payload: dict) -> bool:
+        """Add a job, ignoring ids that were already enqueued.
+
+        :returns: whether the job was added
+        :rtype: bool
+        """
+
+    @abstractmethod
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout: float,
+    ) -> QueueJob | None:
+        """Take an available job, hiding it for `visibility_timeout`.
+
+        Jobs whose lease expired become available again.
+        """
+
+    @abstractmethod
+    def extend_lease(self, job: QueueJob, visibility_timeout: float) -> bool:
+        """Push back the lease expiry, False if the lease was lost."""
+
+    @abstractmethod
+    def complete(self, job: QueueJob) -> bool:
+        """Mark a job done.
+
+        Completing a job twice, or after its lease was lost, is a
+        no-op.
+
+        :returns: whether this call completed the job
+        :rtype: bool
+        """
+
+    @abstractmethod
+    def mark_uploaded(self, job: QueueJob) -> bool:
+        """Record that the video of a job was uploaded.
+
+        The mark outlives the lease, so a worker taking over a job
+        whose worker died before completing it doesn't upload the
+        video again.
+
+        :returns: whether the lease was still held
+        :rtype: bool
+        """
+
+    @abstractmethod
+    def fail(
+        self,
+        job: QueueJob,
+        error: str,
+        retry_delay: float | None = None,
+    ) -> None:
+        """Release a job for another attempt or give up on it."""
+
+    @abstractmethod
+    def claim_publish_slot(self, slots: list[datetime]) -> datetime | None:
+        """Take the first of `slots` no worker has claimed yet.
+
+        :returns: the claimed slot, `None` if all are claimed
+        """
+
+    @abstractmethod
+    def release_publish_slot(self, slot: datetime) -> None:
+        """Give back a claimed slot that wasn't used."""
+
+    @abstractmethod
+    def counts(self) -> dict[JobStatusEnum, int]:
+        """Get number of jobs by status."""
+
+
+class SQLiteWorkQueue(BaseWorkQueue):
+    """Work queue stored in a SQLite database.
+
+    Leases are taken in an immediate transaction, so workers sharing
+    the database file never get the same job at once. Jobs are failed
+    after `max_attempts` leases. Publish slots are claimed in the same
+    database, so workers never schedule videos at the same time.
+    """
+
+    def __init__(
+        self,
+        database_path: Path,
+        max_attempts: int | None = None,
+        logger: BaseLogger | None = None,
+    ) -> None:
+        self.database_path = database_path
+        self.max_attempts = max_attempts or 3
+        self.logger = (logger if logger else Logger()).get_child("queue")
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker_id TEXT, "
+                "lease_token TEXT, "
+                "lease_expires_at REAL, "
+                "available_at REAL NOT NULL, "
+                "last_error TEXT, "
+                "uploaded_at REAL, "
+                "created_at REAL NOT NULL)",
+            )
+            columns = {
+                row[1]
+                for row in connection.execute("PRAGMA table_info(jobs)")
+            }
+            if "uploaded_at" not in columns:
+                connection.execute(
+                    "ALTER TABLE jobs ADD COLUMN uploaded_at REAL",
+                )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status "
+                "ON jobs (status, available_at)",
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS publish_slots ("
+                "publish_at REAL PRIMARY KEY, "
+                "claimed_at REAL NOT NULL)",
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.database_path,
+            timeout=30,
+            isolation_level=None,
+        )
+        connection.execute("PRAGMA busy_timeout=30000")
+        return connection
+
+    def enqueue(self, job_id: str, payload: dict) -> bool:
+        now = time.time()
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(job_id, payload, status, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    json.dumps(payload, ensure_ascii=False),
+                    JobStatusEnum.PENDING.value,
+                    now,
+                    now,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def lease(
+        self,
+        worker_id: str,
+        visibility_timeout: float,
+    ) -> QueueJob | None:
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                connection.execute(
+                    "UPDATE jobs SET status = ?, lease_token = NULL, "
+                    "last_error = 'Lease expired' "
+                    "WHERE status = ? AND lease_expires_at <= ? "
+                    "AND attempts >= ?",
+                    (
+                        JobStatusEnum.FAILED.value,
+                        JobStatusEnum.LEASED.value,
+                        now,
+                        self.max_attempts,
+                    ),
+                )
+                row = connection.execute(
+                    "SELECT job_id, payload, attempts, uploaded_at "
+                    "FROM jobs "
+                    "WHERE (status = ? AND available_at <= ?) "
+                    "OR (status = ? AND lease_expires_at <= ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (
+                        JobStatusEnum.PENDING.value,
+                        now,
+                        JobStatusEnum.LEASED.value,
+                        now,
+                    ),
+                ).fetchone()
+                if row is None:
+                    connection.execute("COMMIT")
+                    return None
+                job_id, payload, attempts, uploaded_at = row
+                lease_token = uuid.uuid4().hex
+                connection.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, "
+                    "worker_id = ?, lease_token = ?, lease_expires_at = ? "
+                    "WHERE job_id = ?",
+                    (
+                        JobStatusEnum.LEASED.value,
+                        attempts + 1,
+                        worker_id,
+                        lease_token,
+                        now + visibility_timeout,
+                        job_id,
+                    ),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return QueueJob(
+            job_id=job_id,
+            payload=json.loads(payload),
+            attempts=attempts + 1,
+            lease_token=lease_token,
+            is_uploaded=uploaded_at is not None,
+        )
+
+    def extend_lease(self, job: QueueJob, visibility_timeout: float) -> bool:
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_token = ?",
+                (
+                    time.time() + visibility_timeout,
+                    job.job_id,
+                    JobStatusEnum.LEASED.value,
+                    job.lease_token,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job: QueueJob) -> bool:
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, lease_token = NULL "
+                "WHERE job_id = ? AND status = ? AND lease_token = ?",
+                (
+                    JobStatusEnum.DONE.value,
+                    job.job_id,
+                    JobStatusEnum.LEASED.value,
+                    job.lease_token,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def mark_uploaded(self, job: QueueJob) -> bool:
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET uploaded_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_token = ?",
+                (
+                    time.time(),
+                    job.job_id,
+                    JobStatusEnum.LEASED.value,
+                    job.lease_token,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def fail(
+        self,
+        job: QueueJob,
+        error: str,
+        retry_delay: float | None = None,
+    ) -> None:
+        status = (
+            JobStatusEnum.FAILED
+            if job.attempts >= self.max_attempts
+            else JobStatusEnum.PENDING
+        )
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = ?, lease_token = NULL, "
+                "available_at = ?, last_error = ? "
+                "WHERE job_id = ? AND status = ? AND lease_token = ?",
+                (
+                    status.value,
+                    time.time() + (retry_delay or 0),
+                    error,
+                    job.job_id,
+                    JobStatusEnum.LEASED.value,
+                    job.lease_token,
+                ),
+            )
+        if cursor.rowcount == 1 and status == JobStatusEnum.FAILED:
+            self.logger.log(
+                f"Job {job.job_id} failed after {job.attempts} attempts: "
+                f"{error}",
+            )
+
+    def claim_publish_slot(self, slots: list[datetime]) -> datetime | None:
+        with closing(self._connect()) as connection:
+            for slot in slots:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO publish_slots "
+                    "(publish_at, claimed_at) VALUES (?, ?)",
+                    (slot.timestamp(), time.time()),
+                )
+                if cursor.rowcount == 1:
+                    return slot
+        return None
+
+    def release_publish_slot(self, slot: datetime) -> None:
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "DELETE FROM publish_slots WHERE publish_at = ?",
+                (slot.timestamp(),),
+            )
+
+    def counts(self) -> dict[JobStatusEnum, int]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status",
+            ).fetchall()
+        job_counts = {status: 0 for status in JobStatusEnum}
+        for status, count in rows:
+            job_counts[JobStatusEnum(status)] = count
+        return job_counts
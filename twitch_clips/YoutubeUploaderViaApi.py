@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+import os
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 
 import httplib2
@@ -6,13 +8,21 @@ import pytz
 from googleapiclient import discovery
 from googleapiclient.discovery import Resource
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import HttpRequest, MediaFileUpload
 from oauth2client.client import Credentials, flow_from_clientsecrets
 from oauth2client.file import Storage
 from oauth2client.tools import run_flow
 
-from .BaseYoutubeUploader import BasePrivacyEnum, BaseUploader, VideoInfo
+from .BandwidthLimiter import BandwidthLimiter
+from .BaseYoutubeUploader import (
+    BasePrivacyEnum,
+    BaseUploader,
+    PublishSchedule,
+    VideoInfo,
+)
+from .ChannelUploadsIndex import ChannelUploadsIndex, UploadedVideo
 from .Logger import BaseLogger, Logger
+from .RetryPolicy import RetryPolicy
 
 
 @dataclass
@@ -21,29 +31,66 @@ class ApiUploaderSettings:
 
 
 class YoutubeUploaderViaApi(BaseUploader):
+    # Max ids per videos.list call and calls per batch request
+    _VIDEOS_PER_REQUEST = 50
+    _REQUESTS_PER_BATCH = 50
+    # Resumable uploads send chunks in multiples of 256 KiB
+    _UPLOAD_CHUNK_SIZE = 4 * 256 * 1024
+
     def __init__(
         self,
         client_secret: str,
         logger: BaseLogger | None = None,
+        retry_policy: RetryPolicy | None = None,
+        bandwidth_limiter: BandwidthLimiter | None = None,
     ) -> None:
         self.client_secret = client_secret
-        self.logger = logger if logger else Logger()
+        self.bandwidth_limiter = bandwidth_limiter
+        self.logger = (logger if logger else Logger()).get_child(
+            "uploader",
+        )
+        self.retry_policy = retry_policy or RetryPolicy(
+            is_retryable=self._is_retryable_error,
+            logger=self.logger,
+        )
+
+    @staticmethod
+    def _is_retryable_error(error: Exception) -> bool:
+        # Quota and permission errors (403) won't pass on retry
+        if isinstance(error, HttpError):
+            return error.resp.status in {429, 500, 502, 503, 504}
+        return RetryPolicy.is_retryable_error(error)
+
+    def _execute(self, request: HttpRequest) -> dict:
+        return self.retry_policy.call(
+            endpoint="youtube data api",
+            operation=request.execute,
+        )
 
     @staticmethod
-    def get_schedule_datetime(days: int = 0) -> datetime:
-        # Set the publish time to 2 PM Eastern Time (US) on the next day
-        eastern_tz = pytz.timezone("America/Los_Angeles")
-        publish_time = datetime.now(eastern_tz)
+    def get_schedule_datetime(
+        days: int = 0,
+        hour: int = 14,
+        minute: int = 0,
+        timezone: str = "America/Los_Angeles",
+    ) -> datetime:
+        # Set the publish time to 2 PM Los Angeles time by default
+        local_tz = pytz.timezone(timezone)
+        publish_time = datetime.now(local_tz)
         if days > 0:
-            publish_time = datetime.now(eastern_tz) + timedelta(days)
+            publish_time = datetime.now(local_tz) + timedelta(days)
         publish_time = publish_time.replace(
-            hour=14,
-            minute=0,
+            hour=hour,
+            minute=minute,
             second=0,
             microsecond=0,
         )
 
         # Set the publish time in the UTC timezone
+        return YoutubeUploaderViaApi._format_publish_datetime(publish_time)
+
+    @staticmethod
+    def _format_publish_datetime(publish_time: datetime) -> str:
         return publish_time.astimezone(pytz.utc).strftime(
             "%Y-%m-%dT%H:%M:%S.%fZ",
         )
@@ -78,6 +125,34 @@ class YoutubeUploaderViaApi(BaseUploader):
     def upload(
         self,
         video_info: VideoInfo,
+    ) -> None:
+        self._insert_video(
+            youtube=self.get_youtube_service(),
+            video_info=video_info,
+        )
+
+    def upload_batch(
+        self,
+        videos_info: list[VideoInfo],
+        schedule: PublishSchedule,
+    ) -> list[datetime]:
+        slots = schedule.get_slots(count=len(videos_info))
+        youtube = self.get_youtube_service()
+        for video_info, slot in zip(videos_info, slots):
+            self._insert_video(
+                youtube=youtube,
+                video_info=replace(
+                    video_info,
+                    privacy=BasePrivacyEnum.PRIVATE,
+                    publish_at=slot,
+                ),
+            )
+        return slots
+
+    def _insert_video(
+        self,
+        youtube: Resource,
+        video_info: VideoInfo,
     ) -> None:
         day = 0
 
@@ -91,13 +166,14 @@ class YoutubeUploaderViaApi(BaseUploader):
         else:
             tags = video_info.tags
 
-        if video_info.privacy is None:
+        if video_info.publish_at is not None:
+            privacy = BasePrivacyEnum.PRIVATE
+        elif video_info.privacy is None:
             privacy = BasePrivacyEnum.PUBLIC
         else:
             privacy = video_info.privacy
 
         self.logger.log("Uploading...")
-        youtube = self.get_youtube_service()
         try:
             # Define the video resource object
             body = {
@@ -108,17 +184,20 @@ class YoutubeUploaderViaApi(BaseUploader):
                 },
                 "status": {"privacyStatus": privacy},
             }
-            if privacy == "private":
+            if video_info.publish_at is not None:
+                body["status"]["publishAt"] = self._format_publish_datetime(
+                    video_info.publish_at,
+                )
+            elif privacy == "private":
                 body["status"]["publishAt"] = self.get_schedule_datetime(day)
-            # Define the media file object
-            media_file = MediaFileUpload(video_info.video_path)
             # Call the API's videos.insert method to upload the video
-            videos = youtube.videos()
-            response = videos.insert(
-                part="snippet,status",
-                body=body,
-                media_body=media_file,
-            ).execute()
+            response = self._upload_media(
+                youtube.videos().insert(
+                    part="snippet,status",
+                    body=body,
+                    media_body=self._get_media_body(video_info.video_path),
+                ),
+            )
             # Print the response after the video has been uploaded
             self.logger.log("Video uploaded successfully!")
             self.logger.log(f'Title: {response["snippet"]["title"]}')
@@ -140,5 +219,222 @@ class YoutubeUploaderViaApi(BaseUploader):
                 msg,
             ) from e
 
+    def _get_media_body(self, video_path: str) -> MediaFileUpload:
+        if self.bandwidth_limiter is None:
+            return MediaFileUpload(video_path, resumable=True)
+        return MediaFileUpload(
+            video_path,
+            chunksize=self._UPLOAD_CHUNK_SIZE,
+            resumable=True,
+        )
+
+    def _upload_media(self, request: HttpRequest) -> dict:
+        """Execute a resumable upload chunk by chunk.
+
+        Only failed chunks are retried, within the same upload session.
+        A retried chunk first asks how many bytes the session got, so a
+        response lost after YouTube created the video returns the video
+        instead of uploading it again as a duplicate.
+        """
+        file_size = os.path.getsize(request.resumable.filename())
+        sent_bytes = 0
+        response = None
+        transfer = (
+            self.bandwidth_limiter.transfer()
+            if self.bandwidth_limiter is not None
+            else nullcontext()
+        )
+        with transfer:
+            while response is None:
+                status, response = self.retry_policy.call(
+                    endpoint="youtube upload",
+                    operation=request.next_chunk,
+                )
+                if self.bandwidth_limiter is None:
+                    continue
+                total_bytes = (
+                    status.resumable_progress if status else file_size
+                )
+                self.bandwidth_limiter.consume(total_bytes - sent_bytes)
+                sent_bytes = total_bytes
+        return response
+
+    def sync_uploads_index(self, index: ChannelUploadsIndex) -> int:
+        """Add channel uploads missing from the index.
+
+        The uploads playlist is paged newest first until a page with an
+        indexed video, and past it while videos a previous sync failed
+        to fetch weren't listed again. Details of the new videos are
+        fetched with batched `videos.list` calls of 50 ids each, ids
+        whose call failed are kept as unsynced for the next sync.
+        """
+        youtube = self.get_youtube_service()
+        try:
+            new_video_ids = self._get_new_upload_ids(
+                youtube=youtube,
+                index=index,
+            )
+            uploaded_videos = self._get_uploaded_videos(
+                youtube=youtube,
+                video_ids=new_video_ids,
+            )
+        except HttpError as e:
+            msg = (
+                f"An HTTP error {e.resp.status} occurred: "
+                f"{e.content.decode('utf-8')}"
+            )
+            raise RuntimeError(
+                msg,
+            ) from e
+        fetched_video_ids = {video.video_id for video in uploaded_videos}
+        unsynced_video_ids = [
+            video_id
+            for video_id in new_video_ids
+            if video_id not in fetched_video_ids
+        ]
+        index.add(uploaded_videos, unsynced_video_ids=unsynced_video_ids)
+        index.save()
+        self.logger.log(
+            f"Synced channel uploads: {len(uploaded_videos)} new, "
+            f"{len(unsynced_video_ids)} unsynced, {len(index)} total",
+        )
+        return len(uploaded_videos)
+
+    def _get_new_upload_ids(
+        self,
+        youtube: Resource,
+        index: ChannelUploadsIndex,
+    ) -> list[str]:
+        channels = self._execute(
+            youtube.channels().list(
+                part="contentDetails",
+                mine=True,
+                fields="items/contentDetails/relatedPlaylists/uploads",
+            ),
+        )
+        if not channels.get("items"):
+            self.logger.log("The account has no YouTube channel to sync")
+            return []
+        uploads_playlist_id = channels["items"][0]["contentDetails"][
+            "relatedPlaylists"
+        ]["uploads"]
+        # Unsynced videos aren't indexed, so they're new once listed
+        unlisted_video_ids = set(index.unsynced_video_ids)
+        new_video_ids: list[str] = []
+        page_token = None
+        while True:
+            response = self._execute(
+                youtube.playlistItems().list(
+                    part="contentDetails",
+                    playlistId=uploads_playlist_id,
+                    maxResults=self._VIDEOS_PER_REQUEST,
+                    pageToken=page_token,
+                    fields="nextPageToken,items/contentDetails/videoId",
+                ),
+            )
+            page_video_ids = [
+                item["contentDetails"]["videoId"]
+                for item in response.get("items", [])
+            ]
+            unknown_video_ids = [
+                video_id
+                for video_id in page_video_ids
+                if video_id not in index
+            ]
+            new_video_ids.extend(unknown_video_ids)
+            unlisted_video_ids.difference_update(page_video_ids)
+            page_token = response.get("nextPageToken")
+            if not page_token or (
+                len(unknown_video_ids) < len(page_video_ids)
+                and not unlisted_video_ids
+            ):
+                return new_video_ids
+
+    def _get_uploaded_videos(
+        self,
+        youtube: Resource,
+        video_ids: list[str],
+    ) -> list[UploadedVideo]:
+        """Fetch details of videos with batched `videos.list` calls.
+
+        A batch is executed once, as retrying it would run callbacks of
+        the calls that succeeded again. Failed calls are retried one by
+        one, videos still failing are left out.
+        """
+        uploaded_videos: list[UploadedVideo] = []
+        fetched_request_ids: set[str] = set()
+
+        def add_videos(
+            request_id: str,
+            response: dict,
+            exception: HttpError | None,
+        ) -> None:
+            if exception is not None:
+                self.logger.log(f"Failed to get uploaded videos: {exception}")
+                return
+            fetched_request_ids.add(request_id)
+            uploaded_videos.extend(self._parse_uploaded_videos(response))
+
+        chunks = [
+            video_ids[position : position + self._VIDEOS_PER_REQUEST]
+            for position in range(
+                0,
+                len(video_ids),
+                self._VIDEOS_PER_REQUEST,
+            )
+        ]
+        for batch_start in range(0, len(chunks), self._REQUESTS_PER_BATCH):
+            batch = youtube.new_batch_http_request(callback=add_videos)
+            for position in range(
+                batch_start,
+                min(batch_start + self._REQUESTS_PER_BATCH, len(chunks)),
+            ):
+                batch.add(
+                    self._list_videos(youtube, chunks[position]),
+                    request_id=str(position),
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                self.logger.log(f"Failed to get uploaded videos: {e}")
+        for position, chunk in enumerate(chunks):
+            if str(position) in fetched_request_ids:
+                continue
+            try:
+                response = self._execute(self._list_videos(youtube, chunk))
+            except HttpError as e:
+                self.logger.log(f"Failed to get uploaded videos: {e}")
+                continue
+            uploaded_videos.extend(self._parse_uploaded_videos(response))
+        return uploaded_videos
+
+    def _list_videos(
+        self,
+        youtube: Resource,
+        video_ids: list[str],
+    ) -> HttpRequest:
+        return youtube.videos().list(
+            part="snippet,contentDetails",
+            id=",".join(video_ids),
+            maxResults=self._VIDEOS_PER_REQUEST,
+            fields="items(id,snippet(title,tags),contentDetails/duration)",
+        )
+
+    @staticmethod
+    def _parse_uploaded_videos(response: dict) -> list[UploadedVideo]:
+        return [
+            UploadedVideo(
+                video_id=item["id"],
+                title=item["snippet"]["title"],
+                duration_seconds=ChannelUploadsIndex.parse_duration(
+                    item["contentDetails"]["duration"],
+                ),
+                clip_id=ChannelUploadsIndex.parse_clip_id(
+                    item["snippet"].get("tags", []),
+                ),
+            )
+            for item in response.get("items", [])
+        ]
+
     def close_session(self) -> None:
         pass
@@ -1,7 +1,7 @@
-import time
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
-from random import randint
+from typing import Callable
 
 from youtube_up import (
     AllowCommentsEnum,
@@ -12,6 +12,7 @@ from youtube_up import (
     YTUploaderSession,
 )
 
+from .BandwidthLimiter import BandwidthLimiter
 from .BaseYoutubeUploader import (
     BaseLanguageEnum,
     BaseLicenseEnum,
@@ -20,6 +21,7 @@ from .BaseYoutubeUploader import (
     VideoInfo,
 )
 from .Logger import BaseLogger, Logger
+from .RetryPolicy import RetryPolicy
 
 
 @dataclass
@@ -34,45 +36,61 @@ class YoutubeUploaderViaCookies(BaseUploader):
         cookies_path: Path,
         retries: int | None = None,
         logger: BaseLogger | None = None,
+        retry_policy: RetryPolicy | None = None,
+        bandwidth_limiter: BandwidthLimiter | None = None,
     ) -> None:
-        self.logger = logger if logger else Logger()
+        self.logger = (logger if logger else Logger()).get_child(
+            "uploader",
+        )
         self.cookies_path = str(cookies_path)
         self.retries = retries if retries else 3
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=self.retries,
+            base_delay=2,
+            is_retryable=self._is_retryable_error,
+            logger=self.logger,
+        )
+        self.bandwidth_limiter = bandwidth_limiter
         self.uploader = self._get_uploader()
 
+    @staticmethod
+    def _is_retryable_error(error: Exception) -> bool:
+        if "Daily limit" in str(error):
+            return False
+        return RetryPolicy.is_retryable_error(error)
+
     def _get_uploader(self) -> YTUploaderSession:
-        for retry in range(self.retries):
-            try:
-                return YTUploaderSession.from_cookies_txt(
+        try:
+            return self.retry_policy.call(
+                endpoint="youtube session",
+                operation=lambda: YTUploaderSession.from_cookies_txt(
                     cookies_txt_path=self.cookies_path,
-                )
-
-            except Exception:
-                self.logger.log(
-                    "Failed to get Cookie-Uploader. "
-                    f"Attempt: {retry + 1}/{self.retries}",
-                )
-        get_uploader_error = (
-            f"Failed to get Cookie-Uploader after {self.retries} attempts"
-        )
-        raise RuntimeError(get_uploader_error)
+                ),
+            )
+        except Exception as e:
+            get_uploader_error = (
+                f"Failed to get Cookie-Uploader after {self.retries} attempts"
+            )
+            raise RuntimeError(get_uploader_error) from e
 
     def has_valid_cookies(self) -> bool:
         """Check if the provided cookies file is valid."""
         self.logger.log("Validating cookies...")
-        is_valid = False
-        for retry in range(self.retries):
+
+        def validate_cookies() -> None:
             if not self.uploader.has_valid_cookies():
-                self.logger.log(
-                    "Invalid cookies provided, or cookies file not found. "
-                    f"Attempt: {retry + 1}/{self.retries}",
+                invalid_cookies_error = (
+                    "Invalid cookies provided, or cookies file not found"
                 )
-                is_valid = False
-                time.sleep(randint(0, 2))
-                continue
-            is_valid = True
-            break
-        if not is_valid:
+                raise RuntimeError(invalid_cookies_error)
+
+        try:
+            self.retry_policy.call(
+                endpoint="youtube session",
+                operation=validate_cookies,
+            )
+        except Exception as e:
+            self.logger.log(f"{e}")
             return False
         self.logger.log("Cookies validated!")
         return True
@@ -94,6 +112,8 @@ class YoutubeUploaderViaCookies(BaseUploader):
                 privacy_status = PrivacyEnum.PRIVATE
             if video_info.privacy == BasePrivacyEnum.PUBLIC:
                 privacy_status = PrivacyEnum.PUBLIC
+        if video_info.publish_at is not None:
+            privacy_status = PrivacyEnum.PRIVATE
 
         language = LanguageEnum.RUSSIAN
         if video_info.language is None:
@@ -132,28 +152,88 @@ class YoutubeUploaderViaCookies(BaseUploader):
             audio_language=language,
             license=license_,
             made_for_kids=video_info.made_for_kids or False,
+            scheduled_upload=video_info.publish_at,
         )
 
-        for attempt in range(self.retries):
-            try:
+        # Once the file is sent the session creates the video, which
+        # may succeed even if its response is lost, so a retry from
+        # there could upload the video twice
+        committed_percent = self.uploader._progress_steps["upload_video"]
+        reached_percent = 0.0
+
+        def upload() -> None:
+            bandwidth_callback = self._get_progress_callback(
+                Path(video_info.video_path),
+            )
+
+            def progress_callback(step: str, percent: float) -> None:
+                nonlocal reached_percent
+                reached_percent = max(reached_percent, percent)
+                bandwidth_callback(step, percent)
+
+            transfer = (
+                self.bandwidth_limiter.transfer()
+                if self.bandwidth_limiter is not None
+                else nullcontext()
+            )
+            with transfer:
                 self.uploader.upload(
                     file_path=str(video_info.video_path),
                     metadata=video_metadata,
+                    progress_callback=progress_callback,
                 )
-                self.logger.log(f"Video uploaded: {video_info.title}")
+
+        def is_retryable(error: Exception) -> bool:
+            return reached_percent < committed_percent and (
+                self.retry_policy.is_retryable(error)
+            )
+
+        try:
+            self.retry_policy.call(
+                endpoint="youtube upload",
+                operation=upload,
+                is_retryable=is_retryable,
+                is_transient=(
+                    self.retry_policy.is_transient
+                    or self.retry_policy.is_retryable
+                ),
+            )
+        except Exception as e:
+            upload_error = f"Failed to upload video: {video_info.title} ({e})"
+            raise RuntimeError(upload_error) from e
+        self.logger.log(f"Video uploaded: {video_info.title}")
+
+    def _get_progress_callback(
+        self,
+        video_path: Path,
+    ) -> Callable[[str, float], None]:
+        """Take the bytes sent so far from the bandwidth limiter.
+
+        The session reports upload progress after every chunk it reads
+        from the file, as a percentage between two of its progress
+        steps, so blocking here throttles the upload.
+        """
+        if self.bandwidth_limiter is None:
+            return lambda step, percent: None
+        file_size = video_path.stat().st_size
+        start_percent = self.uploader._progress_steps["get_upload_url"]
+        end_percent = self.uploader._progress_steps["upload_video"]
+        sent_bytes = 0
+
+        def progress_callback(step: str, percent: float) -> None:
+            nonlocal sent_bytes
+            if step != "upload_video":
                 return
-            except Exception as e:
-                if attempt < self.retries - 1 and "Daily limit" not in str(e):
-                    self.logger.log(
-                        f"Error uploading video: {video_info.title}. "
-                        f"Retrying... ({e})",
-                    )
-                    time.sleep(randint(3, 10))
-                    continue
-                upload_error = (
-                    f"Failed to upload video: {video_info.title} ({e})"
-                )
-                raise RuntimeError(upload_error) from e
+            total_bytes = int(
+                file_size
+                * (percent - start_percent)
+                / (end_percent - start_percent),
+            )
+            if total_bytes > sent_bytes:
+                self.bandwidth_limiter.consume(total_bytes - sent_bytes)
+                sent_bytes = total_bytes
+
+        return progress_callback
 
     def close_session(self) -> None:
         self.uploader._session.close()
@@ -1,27 +1,95 @@
+from .AdaptiveConcurrencyLimiter import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyMetrics,
+    ConcurrencySettings,
+)
+from .BandwidthLimiter import (
+    BandwidthLimiter,
+    BandwidthSettings,
+    RateWindow,
+    TransferMetrics,
+)
 from .BaseYoutubeUploader import (
     BaseLanguageEnum,
     BaseLicenseEnum,
     BasePrivacyEnum,
     BaseUploader,
+    PublishSchedule,
     VideoInfo,
 )
+from .ChannelPollScheduler import ChannelPollScheduler, ChannelStats
+from .ChannelUploadsIndex import ChannelUploadsIndex, UploadedVideo
+from .ClipCostModel import (
+    BudgetKindEnum,
+    ClipCost,
+    ClipCostModel,
+    CostStats,
+    RunBudget,
+)
+from .ClipHistoryStore import ClipHistoryStore
+from .ClipsDiskBudget import (
+    ClipsDiskBudget,
+    DiskBudgetExceededError,
+    DiskUsageMetrics,
+)
+from .ClipsFolderLock import ClipsFolderLock
+from .ConversionPlanner import (
+    ConversionActionEnum,
+    ConversionPlan,
+    ConversionPlanner,
+    MediaProbe,
+)
 from .CookieFormatter import (
     BaseCookieFormatter,
     JSONNetScapeFormatter,
     StdinNetScapeFormatter,
 )
-from .Logger import BaseLogger, Logger
+from .CpuMeter import CpuMeter, CpuUsage
+from .Logger import (
+    BaseLogger,
+    DropPolicyEnum,
+    JsonLinesLogger,
+    Logger,
+    LogLevelEnum,
+    RotatingFileSettings,
+)
+from .MultiTenantRunner import MultiTenantRunner, TenantConfig, TenantResult
+from .RetryPolicy import CircuitBreaker, CircuitOpenError, RetryPolicy
+from .StageProfiler import ProfilerModeEnum, ProfilingSettings, StageProfiler
+from .ThreadWorkTracker import ThreadWorkTracker
+from .TitleIndex import MinHashTitleIndex
 from .TwitchClipsDownloader import (
+    ClipsDiscoveryCache,
     PeriodEnum,
+    QualityPolicy,
+    QualityTarget,
     TwitchClipsDownloader,
     TwitchData,
+    TwitchDlTimeoutError,
 )
 from .TwitchClipsToYoutube import (
     CustomVideoMetadata,
+    SharedResources,
+    StreamingSettings,
     TwitchClipsToYoutube,
     VideoProperties,
 )
-from .VerticalVideoConverter import VerticalVideoConverter
+from .VerticalVideoConverter import (
+    EncodeSettings,
+    VerticalModeEnum,
+    VerticalVideoConverter,
+)
+from .VideoFingerprintIndex import (
+    MultiIndexHashTable,
+    VideoFingerprinter,
+    VideoFingerprintIndex,
+)
+from .WorkQueue import (
+    BaseWorkQueue,
+    JobStatusEnum,
+    QueueJob,
+    SQLiteWorkQueue,
+)
 from .YoutubeUploaderViaApi import ApiUploaderSettings, YoutubeUploaderViaApi
 from .YoutubeUploaderViaCookies import (
     CookiesUploaderSettings,
@@ -29,23 +97,81 @@ from .YoutubeUploaderViaCookies import (
 )
 
 __all__ = [
+    "AdaptiveConcurrencyLimiter",
+    "ConcurrencyMetrics",
+    "ConcurrencySettings",
+    "BandwidthLimiter",
+    "BandwidthSettings",
+    "RateWindow",
+    "TransferMetrics",
     "BaseLanguageEnum",
     "BaseLicenseEnum",
     "BasePrivacyEnum",
     "BaseUploader",
+    "PublishSchedule",
     "VideoInfo",
+    "ChannelPollScheduler",
+    "ChannelStats",
+    "ChannelUploadsIndex",
+    "UploadedVideo",
+    "BudgetKindEnum",
+    "ClipCost",
+    "ClipCostModel",
+    "CostStats",
+    "RunBudget",
+    "ClipHistoryStore",
+    "ClipsDiskBudget",
+    "DiskBudgetExceededError",
+    "DiskUsageMetrics",
+    "ClipsFolderLock",
+    "ConversionActionEnum",
+    "ConversionPlan",
+    "ConversionPlanner",
+    "MediaProbe",
     "BaseCookieFormatter",
     "JSONNetScapeFormatter",
     "StdinNetScapeFormatter",
+    "CpuMeter",
+    "CpuUsage",
     "BaseLogger",
     "Logger",
+    "JsonLinesLogger",
+    "LogLevelEnum",
+    "DropPolicyEnum",
+    "RotatingFileSettings",
+    "MultiTenantRunner",
+    "TenantConfig",
+    "TenantResult",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "RetryPolicy",
+    "ProfilerModeEnum",
+    "ProfilingSettings",
+    "StageProfiler",
+    "ThreadWorkTracker",
+    "MinHashTitleIndex",
+    "ClipsDiscoveryCache",
     "PeriodEnum",
+    "QualityPolicy",
+    "QualityTarget",
     "TwitchClipsDownloader",
     "TwitchData",
+    "TwitchDlTimeoutError",
     "TwitchClipsToYoutube",
     "CustomVideoMetadata",
+    "SharedResources",
+    "StreamingSettings",
     "VideoProperties",
+    "EncodeSettings",
+    "VerticalModeEnum",
     "VerticalVideoConverter",
+    "MultiIndexHashTable",
+    "VideoFingerprinter",
+    "VideoFingerprintIndex",
+    "BaseWorkQueue",
+    "JobStatusEnum",
+    "QueueJob",
+    "SQLiteWorkQueue",
     "ApiUploaderSettings",
     "YoutubeUploaderViaApi",
     "CookiesUploaderSettings",